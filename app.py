@@ -1,24 +1,58 @@
 import os
+import posixpath
 import json
 import base64
-import csv
+import hashlib
+import random
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response, send_from_directory, g, make_response
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-import google.generativeai as genai
 from PIL import Image
 import io
 from dotenv import load_dotenv
 import config
 import firebase_admin
 from firebase_admin import credentials, auth, firestore, storage
-from functools import wraps
+from functools import partial, wraps
 import uuid
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from ocr_cache import OCRCache
+from ocr_jobs import OCRJobQueue, QueueFullError
+from ocr_client import GeminiClient, OCRUnavailableError
+from ocr_backends import create_ocr_backend
+from storage_backends import StorageBackend, create_storage_backend
+from direct_uploads import DirectUploads
+from duplicate_index import DuplicateIndex, claim_key, vendor_key
+from vendor_index import VendorIndex
+from claim_repository import create_local_repository, FirestoreClaimRepository, CLAIM_STATUSES, claim_employee_email
+from bill_rasterizer import rasterize_pdf
+from pdf_text import PARSER_VERSION as PDF_TEXT_PARSER_VERSION, compare_extractions, extract_bill_from_pdf
+from image_preprocess import normalize_image
+from stage_stats import stage_stats
+from request_trace import RequestTracer
+from request_profiler import ProfileStore, RequestProfiler
+from employee_directory import EmployeeDirectory, REPORTING_LEVELS
+from approval_inbox import create_approval_inbox
+from spend_rollups import create_spend_rollups
+from bill_blobs import create_bill_blob_refs
+from claim_export import iter_export_rows, stream_csv, stream_xlsx
+from claim_cache import ClaimReadCache, claim_scope, claim_scopes, owner_scope
+from log_config import configure_logging
+import metrics
 
 # Load environment variables
 load_dotenv()
 
+configure_logging(config.LOG_LEVEL, config.LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+# Every pipeline stage sample also feeds the Prometheus histograms served at /metrics
+stage_stats.add_observer(metrics.observe_stage)
+
 app = Flask(__name__)
 CORS(app)
 
@@ -30,6 +64,10 @@ app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Optional request trace capture (see benchmarks/replay.py)
+if config.TRACE_CAPTURE_PATH:
+    RequestTracer(config.TRACE_CAPTURE_PATH).init_app(app)
+
 # Initialize Firebase Admin SDK
 try:
     if not firebase_admin._apps:
@@ -37,67 +75,46 @@ try:
         firebase_admin.initialize_app(cred, {
             'storageBucket': 'optimal-analogy-394213.firebasestorage.app'
         })
-    print("Firebase Admin SDK initialized successfully")
+    logger.info("Firebase Admin SDK initialized successfully")
     
     # Initialize Firestore
     db = firestore.client()
-    print("Firestore client initialized successfully")
+    logger.info("Firestore client initialized successfully")
     
     # Initialize Storage
     bucket = storage.bucket()
-    print(f"Firebase Storage bucket initialized successfully: {bucket.name}")
+    logger.info("Firebase Storage bucket initialized successfully: %s", bucket.name)
     
 except Exception as e:
-    print(f"Warning: Firebase initialization failed: {e}")
-    print("Firebase features will not be available")
+    logger.warning("Firebase initialization failed, Firebase features will not be available: %s", e)
     db = None
     bucket = None
 
 class FirebaseStorageService:
-    """Service class for handling Firebase Storage and Firestore operations"""
+    """Service class for storing bill files and claims.
     
-    def __init__(self, db, bucket):
-        self.db = db
-        self.bucket = bucket
+    Backed by Firebase Storage and Firestore in production, or by local
+    disk and a local claim store when STORAGE_BACKEND is `local`.
+    """
+    
+    def __init__(self, storage_backend, claims):
+        self.storage = storage_backend
+        self.claims = claims
     
     def upload_file_to_storage(self, file_data, filename, content_type):
-        """Upload file to Firebase Storage and return download URL"""
+        """Upload file to storage and return download URL"""
         try:
-            if not self.bucket:
+            if not self.storage:
                 raise Exception("Firebase Storage not initialized")
             
-            # Generate unique filename
-            file_extension = filename.split('.')[-1] if '.' in filename else 'bin'
-            unique_filename = f"claims/{uuid.uuid4()}.{file_extension}"
-            
-            print(f"Uploading file to bucket: {self.bucket.name}")
-            print(f"File path: {unique_filename}")
-            print(f"File size: {len(file_data)} bytes")
-            print(f"Content type: {content_type}")
-            
-            # Create blob and upload
-            blob = self.bucket.blob(unique_filename)
-            blob.upload_from_string(
-                file_data,
-                content_type=content_type
-            )
-            
-            # Make the blob publicly readable (adjust based on your security requirements)
-            blob.make_public()
-            
-            print(f"File uploaded successfully to Storage: {unique_filename}")
-            print(f"Public URL: {blob.public_url}")
+            with stage_stats.time('storage_upload', backend=self.storage.name, bytes=len(file_data)):
+                result = self.storage.upload(file_data, filename, content_type)
             
-            return {
-                'success': True,
-                'file_url': blob.public_url,
-                'file_path': unique_filename,
-                'file_size': len(file_data)
-            }
+            result['success'] = True
+            return result
             
         except Exception as e:
-            print(f"Storage upload error: {e}")
-            print(f"Bucket name: {self.bucket.name if self.bucket else 'None'}")
+            logger.error("Storage upload error: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -106,25 +123,20 @@ class FirebaseStorageService:
     def save_claim_to_firestore(self, claim_data):
         """Save claim data to Firestore"""
         try:
-            if not self.db:
+            if not self.claims:
                 raise Exception("Firestore not initialized")
             
-            # Add timestamp
-            claim_data['created_at'] = firestore.SERVER_TIMESTAMP
-            claim_data['updated_at'] = firestore.SERVER_TIMESTAMP
+            with stage_stats.time('claim_persist', backend=self.claims.name):
+                document_id = self.claims.add_claim(claim_data)
             
-            # Save to Firestore
-            doc_ref = self.db.collection('reimbursement_claims').add(claim_data)
-            document_id = doc_ref[1].id
-            
-            print(f"Claim saved to Firestore with ID: {document_id}")
+            logger.debug("Claim saved", extra={'document_id': document_id, 'backend': self.claims.name})
             return {
                 'success': True,
                 'document_id': document_id
             }
             
         except Exception as e:
-            print(f"Firestore save error: {e}")
+            logger.error("Firestore save error: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -133,57 +145,181 @@ class FirebaseStorageService:
     def get_claims_from_firestore(self, user_email=None):
         """Retrieve claims from Firestore"""
         try:
-            if not self.db:
+            if not self.claims:
                 raise Exception("Firestore not initialized")
             
-            query = self.db.collection('reimbursement_claims')
-            
-            if user_email:
-                query = query.where('employee_details.employee_email', '==', user_email)
-            
-            docs = query.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
-            
-            claims = []
-            for doc in docs:
-                claim_data = doc.to_dict()
-                claim_data['id'] = doc.id
-                claims.append(claim_data)
-            
-            return claims
+            return self.claims.list_claims(user_email)
             
         except Exception as e:
-            print(f"Firestore retrieval error: {e}")
+            logger.error("Firestore retrieval error: %s", e)
             return []
 
-# Initialize Firebase services
-firebase_service = FirebaseStorageService(db, bucket) if db and bucket else None
+# Initialize storage services: Firebase, or local disk standing in for it offline
+if config.STORAGE_BACKEND == 'local':
+    os.makedirs(config.LOCAL_CLAIM_STORE_DIR, exist_ok=True)
+    firebase_service = FirebaseStorageService(
+        create_storage_backend(
+            'local',
+            root=config.LOCAL_STORAGE_DIR,
+            base_url='/local-storage',
+            latency_ms=config.LOCAL_STORAGE_LATENCY_MS,
+            secret=config.SECRET_KEY
+        ),
+        create_local_repository(
+            config.CLAIM_STORE_BACKEND,
+            json_path=os.path.join(config.LOCAL_CLAIM_STORE_DIR, 'claims.json'),
+            sqlite_path=os.path.join(config.LOCAL_CLAIM_STORE_DIR, 'claims.db'),
+            compact_bytes=config.CLAIM_LOG_COMPACT_BYTES
+        )
+    )
+elif db and bucket:
+    firebase_service = FirebaseStorageService(
+        create_storage_backend('firebase', bucket=bucket),
+        FirestoreClaimRepository(db)
+    )
+else:
+    firebase_service = None
 
-# Configure Gemini AI
-genai.configure(api_key=config.GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.0-flash-exp')
-genai.configure(api_key=config.GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash')
+# Configure the OCR model: Gemini, or the deterministic offline stand-in
+GEMINI_MODEL_NAME = 'gemini-2.5-flash'
+model = create_ocr_backend(
+    config.OCR_BACKEND,
+    model_name=GEMINI_MODEL_NAME,
+    api_key=config.GEMINI_API_KEY,
+    latency_ms=config.FAKE_OCR_LATENCY_MS,
+    latency_sigma=config.FAKE_OCR_LATENCY_SIGMA,
+    per_image_ms=config.FAKE_OCR_PER_IMAGE_MS,
+    error_rate=config.FAKE_OCR_ERROR_RATE,
+    seed=config.FAKE_OCR_SEED
+)
 
-# Load Employee Data
-EMPLOYEE_DATA_PATH = os.path.join(os.path.dirname(__file__), "employee_data.csv")
+# All extraction calls go through this client: deadlines, retries, rate limit, circuit breaker
+gemini_client = GeminiClient(
+    model,
+    timeout=config.GEMINI_TIMEOUT,
+    deadline=config.GEMINI_DEADLINE,
+    max_attempts=config.GEMINI_MAX_ATTEMPTS,
+    backoff_base=config.GEMINI_BACKOFF_BASE,
+    backoff_max=config.GEMINI_BACKOFF_MAX,
+    rate_per_minute=config.GEMINI_RATE_PER_MINUTE,
+    burst=config.GEMINI_RATE_BURST,
+    breaker_threshold=config.GEMINI_BREAKER_THRESHOLD,
+    breaker_reset=config.GEMINI_BREAKER_RESET,
+    workers=config.GEMINI_CALL_WORKERS
+)
 
-def load_employee_data():
-    """Load employee data from CSV file"""
-    employee_dict = {}
-    try:
-        with open(EMPLOYEE_DATA_PATH, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                email = row.get("Employee Email ID", "").strip().lower()
-                if email:
-                    employee_dict[email] = row
-        print(f"Loaded {len(employee_dict)} employee records")
-        return employee_dict
-    except Exception as e:
-        print(f"Error loading employee data: {e}")
-        return {}
+# Prompts used for OCR extraction. Any change here (or to the model name or
+# OCR_PIPELINE_VERSION) changes the OCR cache fingerprint automatically.
+OCR_PROMPT = """
+Analyze this document (bill/receipt/invoice/document) and extract the following information in JSON format:
+{
+    "bill_number": "extracted bill/invoice number",
+    "bill_date": "YYYY-MM-DD format",
+    "vendor_name": "merchant/vendor name",
+    "transaction_category": "category like Travel, Food, Office Supplies, etc.",
+    "purpose": "inferred purpose from bill type",
+    "amount": numeric_amount_only,
+    "currency": "INR or other currency",
+    "product": "product/service category",
+    "cluster_location": "location if mentioned",
+    "confidence_score": confidence_percentage_as_number
+}
 
-EMPLOYEE_DATA = load_employee_data()
+Rules:
+- Extract exact text as visible
+- Use YYYY-MM-DD for dates
+- Amount should be numeric only (no currency symbols)
+- If information is unclear, use null
+- Provide confidence score (0-100) for overall extraction
+- Handle any file format including images, PDFs, documents
+"""
+
+PDF_OCR_PROMPT = """
+Analyze this PDF document (bill/receipt/invoice) and extract the following information in JSON format:
+{
+    "bill_number": "extracted bill/invoice number",
+    "bill_date": "YYYY-MM-DD format",
+    "vendor_name": "merchant/vendor name",
+    "transaction_category": "category like Travel, Food, Office Supplies, etc.",
+    "purpose": "inferred purpose from bill type",
+    "amount": numeric_amount_only,
+    "currency": "INR or other currency",
+    "product": "product/service category",
+    "cluster_location": "location if mentioned",
+    "confidence_score": confidence_percentage_as_number
+}
+
+Rules:
+- Extract exact text as visible
+- Use YYYY-MM-DD for dates
+- Amount should be numeric only (no currency symbols)
+- If information is unclear, use null
+- Provide confidence score (0-100) for overall extraction
+"""
+
+MULTI_PAGE_PROMPT = """
+The following images are consecutive pages of ONE document. Combine them into a
+single extraction; the total amount is usually on the last page.
+"""
+
+BATCH_OCR_PROMPT = """
+The following {count} images are SEPARATE bills/receipts/invoices, each preceded by
+its label "Image <index>:" (indexes 0 to {last}). Extract every bill independently and
+return a JSON array with exactly one object per image:
+[
+    {{
+        "index": image_index_as_number,
+        "bill_number": "extracted bill/invoice number",
+        "bill_date": "YYYY-MM-DD format",
+        "vendor_name": "merchant/vendor name",
+        "transaction_category": "category like Travel, Food, Office Supplies, etc.",
+        "purpose": "inferred purpose from bill type",
+        "amount": numeric_amount_only,
+        "currency": "INR or other currency",
+        "product": "product/service category",
+        "cluster_location": "location if mentioned",
+        "confidence_score": confidence_percentage_as_number
+    }}
+]
+
+Rules:
+- Never merge or mix details between images
+- Extract exact text as visible
+- Use YYYY-MM-DD for dates
+- Amount should be numeric only (no currency symbols)
+- If information is unclear, use null
+- Provide confidence score (0-100) for each extraction
+"""
+
+# Bump when the rasterization/preprocessing pipeline changes in a way that
+# affects extraction output, so cached results are not reused
+OCR_PIPELINE_VERSION = '4'
+OCR_CACHE_FINGERPRINT = '|'.join([
+    config.OCR_BACKEND, GEMINI_MODEL_NAME, OCR_PIPELINE_VERSION, OCR_PROMPT, PDF_OCR_PROMPT, MULTI_PAGE_PROMPT, BATCH_OCR_PROMPT,
+    str(config.PDF_MAX_PAGES), str(config.PDF_TARGET_PIXELS),
+    str(config.IMAGE_MAX_EDGE), str(config.IMAGE_GRAYSCALE), str(config.IMAGE_CROP_BORDERS),
+    str(config.IMAGE_JPEG_QUALITY),
+    str(config.PDF_TEXT_FAST_PATH), str(config.PDF_TEXT_MIN_CHARS), str(config.PDF_TEXT_MIN_CONFIDENCE),
+    PDF_TEXT_PARSER_VERSION
+])
+
+# Samples of fast-path PDF extractions are re-run through Gemini here to measure their accuracy
+pdf_text_shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-text-shadow')
+
+# Shared OCR result cache so /process-bill and /submit-claim never OCR the same bytes twice
+ocr_cache = OCRCache(
+    config.OCR_CACHE_DIR,
+    memory_entries=config.OCR_CACHE_MEMORY_ENTRIES,
+    disk_max_bytes=config.OCR_CACHE_DISK_MAX_BYTES
+)
+
+# Employee directory: indexed by email (across domain aliases), ID and reporting chain; reloads on CSV change
+EMPLOYEE_DATA_PATH = os.path.join(os.path.dirname(__file__), "employee_data.csv")
+employee_directory = EmployeeDirectory(
+    EMPLOYEE_DATA_PATH,
+    domain_aliases=config.EMPLOYEE_EMAIL_DOMAINS,
+    check_interval=config.EMPLOYEE_DIRECTORY_CHECK_INTERVAL
+)
 
 # Allow common image formats that work reliably with Gemini
 ALLOWED_EXTENSIONS = {
@@ -191,7 +327,7 @@ ALLOWED_EXTENSIONS = {
     'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'tiff',
     # Documents (basic support)
     'pdf', 'txt',
-    # Note: PDF requires poppler-utils to be installed
+    # Note: PDFs are rasterized in-process with PyMuPDF
 }
 
 def allowed_file(filename):
@@ -202,6 +338,16 @@ def allowed_file(filename):
     extension = filename.rsplit('.', 1)[1].lower()
     return extension in ALLOWED_EXTENSIONS
 
+# Signed browser-to-storage uploads; the bills then reach the app only as upload tokens
+direct_uploads = DirectUploads(
+    firebase_service.storage if firebase_service else None,
+    config.SECRET_KEY,
+    allowed_file,
+    config.MAX_CONTENT_LENGTH,
+    url_ttl=config.UPLOAD_URL_TTL,
+    token_ttl=config.UPLOAD_TOKEN_TTL
+)
+
 # Authentication decorator
 def login_required(f):
     @wraps(f)
@@ -211,136 +357,231 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def is_admin_user():
+    """Whether the logged-in user is listed in ADMIN_EMAILS"""
+    email = (session.get('user') or {}).get('email') or ''
+    return email.strip().lower() in config.ADMIN_EMAILS
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user' not in session:
+            return redirect(url_for('login'))
+        if not is_admin_user():
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Opt-in request profiling: sampled requests over the threshold, or admin requests with X-Profile
+profile_store = ProfileStore(config.PROFILE_DIR, max_profiles=config.PROFILE_MAX_PROFILES)
+RequestProfiler(
+    profile_store,
+    sample_rate=config.PROFILE_SAMPLE_RATE,
+    threshold_ms=config.PROFILE_THRESHOLD_MS,
+    mode=config.PROFILE_MODE,
+    interval_ms=config.PROFILE_INTERVAL_MS,
+    is_admin=is_admin_user
+).init_app(app)
+
 def verify_firebase_token(id_token):
     """Verify Firebase ID token and return user info"""
     try:
-        print(f"Attempting to verify token: {id_token[:20]}...")
         decoded_token = auth.verify_id_token(id_token)
-        print(f"Token verified successfully for user: {decoded_token.get('email')}")
+        logger.debug("Token verified", extra={'uid': decoded_token.get('uid')})
         return decoded_token
     except Exception as e:
-        print(f"Token verification failed: {e}")
-        print(f"Error type: {type(e).__name__}")
+        logger.warning("Token verification failed: %s: %s", type(e).__name__, e)
         return None
 
 class ReimbursementProcessor:
-    def __init__(self):
-        self.data_file = 'claims_data.json'
-        self.processed_claims = self.load_claims()
+    def __init__(self, repository=None):
+        self.duplicate_index = DuplicateIndex()
+        self.vendor_index = VendorIndex(
+            threshold=config.VENDOR_MATCH_THRESHOLD,
+            min_bills=config.VENDOR_CATEGORY_MIN_BILLS,
+            min_share=config.VENDOR_CATEGORY_MIN_SHARE
+        )
+        self.repository = repository or create_local_repository(
+            config.CLAIM_STORE_BACKEND,
+            json_path='claims_data.json',
+            sqlite_path=config.CLAIM_STORE_SQLITE_PATH,
+            compact_bytes=config.CLAIM_LOG_COMPACT_BYTES,
+            listeners=[self.duplicate_index, self.vendor_index]
+        )
+        self.duplicate_index.build(self.repository.iter_claims())
+        self.vendor_index.build(self.repository.iter_claims())
     
-    def load_claims(self):
-        """Load claims from JSON file"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error loading claims data: {e}")
-            return []
+    def extract_bill_details(self, file_data, filename=None):
+        """Extract bill details, serving repeat uploads of the same bytes from the OCR cache.
+        
+        The cache holds what the model read; vendor knowledge is applied
+        to a copy afterwards so it always reflects the current claims.
+        """
+        cache_key = OCRCache.make_key(file_data, OCR_CACHE_FINGERPRINT)
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("OCR cache hit for %s", filename)
+            return self._apply_vendor_knowledge(dict(cached))
+        
+        result = self._extract_bill_details_uncached(file_data, filename)
+        
+        # Only cache real extractions; failures should be retried next time
+        if result.get('confidence_score', 0) > 0:
+            ocr_cache.put(cache_key, result)
+        return self._apply_vendor_knowledge(dict(result))
+    
+    def extract_bills_batch(self, files, batch_size=None):
+        """Extract several bills with as few Gemini calls as possible.
+        
+        `files` is a list of (file_data, filename). Cached bills are served
+        from the OCR cache, image bills are sent `batch_size` at a time in a
+        single request, and PDFs (which may span pages) or any bill missing
+        from a batch response go through the single-bill path. Returns one
+        result per file, in order.
+        """
+        if batch_size is None:
+            batch_size = config.OCR_BATCH_SIZE
+        
+        results = [None] * len(files)
+        cache_keys = [OCRCache.make_key(file_data, OCR_CACHE_FINGERPRINT) for file_data, _filename in files]
+        batchable = []
+        
+        for position, (file_data, filename) in enumerate(files):
+            cached = ocr_cache.get(cache_keys[position])
+            if cached is not None:
+                logger.debug("OCR cache hit for %s", filename)
+                results[position] = cached
+            elif batch_size > 1 and not (filename and filename.lower().endswith('.pdf')):
+                batchable.append(position)
+        
+        # A lone image gains nothing from the batch prompt
+        if len(batchable) > 1:
+            payloads = {}
+            for position in batchable:
+                try:
+                    payloads[position] = self._preprocess_image(files[position][0])
+                except Exception as e:
+                    logger.warning("Error opening file as image: %s", e)
+            
+            positions = list(payloads)
+            for start in range(0, len(positions), batch_size):
+                chunk = positions[start:start + batch_size]
+                if len(chunk) < 2:
+                    continue
+                try:
+                    extracted = self._extract_batch_chunk([payloads[position] for position in chunk])
+                except OCRUnavailableError as e:
+                    logger.warning("OCR unavailable: %s", e)
+                    for position in chunk:
+                        results[position] = self._ocr_unavailable_result(e)
+                    continue
+                for offset, position in enumerate(chunk):
+                    if offset in extracted:
+                        results[position] = extracted[offset]
+                        if extracted[offset].get('confidence_score', 0) > 0:
+                            ocr_cache.put(cache_keys[position], extracted[offset])
+        
+        # Single-bill path for PDFs, undecodable images and failed batch elements; it applies vendor knowledge itself
+        for position, (file_data, filename) in enumerate(files):
+            if results[position] is None:
+                results[position] = self.extract_bill_details(file_data, filename)
+            else:
+                results[position] = self._apply_vendor_knowledge(dict(results[position]))
+        
+        return results
     
-    def save_claims(self):
-        """Save claims to JSON file"""
+    def _extract_batch_chunk(self, payloads):
+        """Send preprocessed JPEG payloads in one request; returns {offset: validated_data}"""
+        contents = [BATCH_OCR_PROMPT.format(count=len(payloads), last=len(payloads) - 1)]
+        for index, payload in enumerate(payloads):
+            contents.append(f"Image {index}:")
+            contents.append({'mime_type': 'image/jpeg', 'data': payload})
+        
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.processed_claims, f, indent=2, ensure_ascii=False)
-        except IOError as e:
-            print(f"Error saving claims data: {e}")
+            logger.debug("Sending batch of %d bills to Gemini", len(payloads))
+            with stage_stats.time('gemini_call', method='batch', images=len(payloads)):
+                response = gemini_client.generate_content(contents)
+            extracted_text = response.text.strip()
+        except OCRUnavailableError:
+            # Retrying each bill on its own would only wait on the same unhealthy upstream
+            raise
+        except Exception as e:
+            logger.error("Batch OCR error: %s", e)
+            return {}
+        
+        with stage_stats.time('response_parse', method='batch'):
+            extracted = self._process_gemini_batch_response(extracted_text, len(payloads))
+        stage_stats.increment('batch_bills_extracted', len(extracted))
+        stage_stats.increment('batch_bills_fallback', len(payloads) - len(extracted))
+        return extracted
     
-    def extract_bill_details(self, file_data, filename=None):
-        """Extract bill details using Gemini Vision API - supports any file format"""
+    def _extract_bill_details_uncached(self, file_data, filename=None, text_layer=True):
+        """Extract bill details using Gemini Vision API - supports any file format.
+        
+        Born-digital PDFs are parsed from their text layer without calling
+        Gemini when that finds the required fields (`text_layer=False` skips it).
+        """
         try:
-            import io  # Import io module at the beginning
-            
             # For PDF files, we need to handle them differently
             if filename and filename.lower().endswith('.pdf'):
-                print(f"Processing PDF file: {filename}")
+                logger.debug("Processing PDF file: %s", filename)
                 
-                # Try multiple approaches for PDF processing
-                image = None
+                if text_layer and config.PDF_TEXT_FAST_PATH:
+                    fast_result = self._extract_pdf_text(file_data, filename)
+                    if fast_result is not None:
+                        return fast_result
                 
-                # Method 1: Try pdf2image first
+                # Rasterize in-process with PyMuPDF: every page up to the limit, one document handle;
+                # each page is normalized to its JPEG payload before the next one is rendered
+                images = []
                 try:
-                    from pdf2image import convert_from_bytes
-                    print("Attempting PDF conversion with pdf2image...")
-                    images = convert_from_bytes(file_data, first_page=1, last_page=1, dpi=200)
-                    if images:
-                        image = images[0]
-                        print("PDF successfully converted to image using pdf2image")
+                    with stage_stats.time('pdf_rasterize') as fields:
+                        images, timings = rasterize_pdf(
+                            file_data,
+                            max_pages=config.PDF_MAX_PAGES,
+                            target_pixels=config.PDF_TARGET_PIXELS,
+                            transform=self._preprocess_image
+                        )
+                        fields['pages'] = len(images)
+                        fields['page_count'] = timings['page_count']
+                    logger.debug("PDF rasterized with PyMuPDF: %s", timings)
                 except ImportError:
-                    print("pdf2image not available, trying PyMuPDF...")
+                    logger.warning("PyMuPDF not available")
                 except Exception as e:
-                    print(f"pdf2image failed: {e}, trying PyMuPDF...")
-                
-                # Method 2: Try PyMuPDF as fallback
-                if image is None:
-                    try:
-                        import fitz  # PyMuPDF
-                        print("Attempting PDF conversion with PyMuPDF...")
-                        pdf_document = fitz.open(stream=file_data, filetype="pdf")
-                        page = pdf_document[0]  # Get first page
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0))  # High resolution
-                        img_data = pix.tobytes("png")
-                        image = Image.open(io.BytesIO(img_data))
-                        pdf_document.close()
-                        print("PDF successfully converted to image using PyMuPDF")
-                    except ImportError:
-                        print("PyMuPDF not available")
-                    except Exception as e:
-                        print(f"PyMuPDF failed: {e}")
+                    logger.warning("PyMuPDF failed: %s", e)
+                if images:
+                    metrics.pdf_methods.inc(method='pymupdf')
                 
-                # Method 3: Try direct PDF processing with Gemini (if supported)
-                if image is None:
+                # Fallback: try direct PDF processing with Gemini (if supported)
+                if not images:
                     try:
-                        print("Attempting direct PDF processing with Gemini...")
+                        logger.debug("Attempting direct PDF processing with Gemini")
                         # Create a file-like object for Gemini
                         pdf_file = io.BytesIO(file_data)
                         pdf_file.name = filename or "document.pdf"
                         
                         # Try to upload the PDF directly to Gemini
-                        response = model.generate_content([
-                            """
-                            Analyze this PDF document (bill/receipt/invoice) and extract the following information in JSON format:
-                            {
-                                "bill_number": "extracted bill/invoice number",
-                                "bill_date": "YYYY-MM-DD format",
-                                "vendor_name": "merchant/vendor name",
-                                "transaction_category": "category like Travel, Food, Office Supplies, etc.",
-                                "purpose": "inferred purpose from bill type",
-                                "amount": numeric_amount_only,
-                                "currency": "INR or other currency",
-                                "product": "product/service category",
-                                "cluster_location": "location if mentioned",
-                                "confidence_score": confidence_percentage_as_number
-                            }
-                            
-                            Rules:
-                            - Extract exact text as visible
-                            - Use YYYY-MM-DD for dates
-                            - Amount should be numeric only (no currency symbols)
-                            - If information is unclear, use null
-                            - Provide confidence score (0-100) for overall extraction
-                            """,
-                            pdf_file
-                        ])
+                        with stage_stats.time('gemini_call', method='direct_pdf'):
+                            response = gemini_client.generate_content([
+                                PDF_OCR_PROMPT,
+                                pdf_file
+                            ])
                         
                         extracted_text = response.text.strip()
-                        print("PDF processed directly with Gemini")
+                        metrics.pdf_methods.inc(method='direct_pdf')
                         
                         # Process the response
-                        return self._process_gemini_response(extracted_text)
+                        with stage_stats.time('response_parse'):
+                            return self._process_gemini_response(extracted_text)
                         
+                    except OCRUnavailableError:
+                        raise
                     except Exception as e:
-                        print(f"Direct PDF processing with Gemini failed: {e}")
-                
-                # If we have an image from PDF conversion, continue with normal processing
-                if image is not None:
-                    # Convert to RGB if necessary
-                    if image.mode != 'RGB':
-                        image = image.convert('RGB')
-                else:
+                        logger.warning("Direct PDF processing with Gemini failed: %s", e)
+                    
                     # All PDF processing methods failed
-                    print("All PDF processing methods failed")
+                    metrics.pdf_methods.inc(method='failed')
+                    logger.warning("All PDF processing methods failed for %s", filename)
                     return {
                         "bill_number": None,
                         "bill_date": None,
@@ -354,15 +595,11 @@ class ReimbursementProcessor:
                         "confidence_score": 0
                     }
             else:
-                # For non-PDF files (images), process directly
+                # For non-PDF files (images), decode (at reduced scale where possible) and normalize
                 try:
-                    image = Image.open(io.BytesIO(file_data))
-                    # Convert to RGB if necessary
-                    if image.mode != 'RGB':
-                        image = image.convert('RGB')
-                    print(f"Image file processed: {filename}")
+                    images = [self._preprocess_image(file_data)]
                 except Exception as e:
-                    print(f"Error opening file as image: {e}")
+                    logger.warning("Error opening file as image: %s", e)
                     return {
                         "bill_number": None,
                         "bill_date": None,
@@ -376,41 +613,25 @@ class ReimbursementProcessor:
                         "confidence_score": 0
                     }
             
-            # Prepare prompt for OCR extraction
-            prompt = """
-            Analyze this document (bill/receipt/invoice/document) and extract the following information in JSON format:
-            {
-                "bill_number": "extracted bill/invoice number",
-                "bill_date": "YYYY-MM-DD format",
-                "vendor_name": "merchant/vendor name",
-                "transaction_category": "category like Travel, Food, Office Supplies, etc.",
-                "purpose": "inferred purpose from bill type",
-                "amount": numeric_amount_only,
-                "currency": "INR or other currency",
-                "product": "product/service category",
-                "cluster_location": "location if mentioned",
-                "confidence_score": confidence_percentage_as_number
-            }
-            
-            Rules:
-            - Extract exact text as visible
-            - Use YYYY-MM-DD for dates
-            - Amount should be numeric only (no currency symbols)
-            - If information is unclear, use null
-            - Provide confidence score (0-100) for overall extraction
-            - Handle any file format including images, PDFs, documents
-            """
+            contents = [OCR_PROMPT]
+            if len(images) > 1:
+                contents.append(MULTI_PAGE_PROMPT)
+            contents.extend({'mime_type': 'image/jpeg', 'data': image} for image in images)
             
-            print("Sending image to Gemini for analysis...")
-            response = model.generate_content([prompt, image])
+            logger.debug("Sending %d image(s) to Gemini", len(images))
+            with stage_stats.time('gemini_call', method='image', images=len(images)):
+                response = gemini_client.generate_content(contents)
             extracted_text = response.text.strip()
-            print("Gemini analysis completed")
             
             # Process the response
-            return self._process_gemini_response(extracted_text)
+            with stage_stats.time('response_parse'):
+                return self._process_gemini_response(extracted_text)
                 
+        except OCRUnavailableError as e:
+            logger.warning("OCR unavailable: %s", e)
+            return self._ocr_unavailable_result(e)
         except Exception as e:
-            print(f"OCR Error: {str(e)}")
+            logger.error("OCR error: %s", e)
             return {
                 "bill_number": None,
                 "bill_date": None,
@@ -424,45 +645,129 @@ class ReimbursementProcessor:
                 "confidence_score": 0
             }
     
+    def _extract_pdf_text(self, file_data, filename):
+        """Parse a PDF's text layer locally; None when it has to go to Gemini"""
+        result = None
+        try:
+            with stage_stats.time('pdf_text_extract') as fields:
+                outcome, result, timings = extract_bill_from_pdf(
+                    file_data,
+                    max_pages=config.PDF_MAX_PAGES,
+                    min_chars=config.PDF_TEXT_MIN_CHARS,
+                    min_confidence=config.PDF_TEXT_MIN_CONFIDENCE
+                )
+                fields['chars'] = timings['chars']
+                fields['pages'] = timings['pages']
+        except ImportError:
+            logger.warning("PyMuPDF not available")
+            return None
+        except Exception as e:
+            logger.warning("PDF text extraction failed: %s", e)
+            outcome = 'error'
+        
+        metrics.pdf_text_outcomes.inc(outcome=outcome)
+        stage_stats.increment(f'pdf_text_{outcome}')
+        if outcome != 'absorbed':
+            logger.debug("PDF text layer not used (%s): %s", outcome, result and result['missing_fields'])
+            return None
+        
+        metrics.pdf_methods.inc(method='text_layer')
+        del result['missing_fields']
+        logger.debug("Extracted PDF from its text layer", extra={
+            'amount': result['amount'],
+            'vendor': result['vendor_name'],
+            'confidence': result['confidence_score']
+        })
+        if config.PDF_TEXT_SHADOW_RATE and random.random() < config.PDF_TEXT_SHADOW_RATE:
+            pdf_text_shadow_executor.submit(self._shadow_pdf_text, file_data, filename, dict(result))
+        return result
+    
+    def _shadow_pdf_text(self, file_data, filename, fast_result):
+        """Extract a fast-path PDF through Gemini too and count per-field agreement"""
+        try:
+            reference = self._extract_bill_details_uncached(file_data, filename, text_layer=False)
+            if not reference.get('confidence_score'):
+                return
+            stage_stats.increment('pdf_text_shadow_bills')
+            for field, matched in compare_extractions(fast_result, reference).items():
+                metrics.pdf_text_shadow.inc(field=field, result='match' if matched else 'mismatch')
+                if not matched:
+                    stage_stats.increment(f'pdf_text_shadow_mismatch_{field}')
+                    logger.debug("PDF text layer %s differs from Gemini: %r vs %r",
+                                 field, fast_result.get(field), reference.get(field))
+        except Exception as e:
+            logger.warning("PDF text shadow comparison failed: %s", e)
+    
+    def _ocr_unavailable_result(self, error):
+        """Placeholder result when Gemini is unhealthy: the bill goes to manual review instead of blocking"""
+        return {
+            "bill_number": None,
+            "bill_date": None,
+            "vendor_name": None,
+            "transaction_category": "Other",
+            "purpose": "OCR service unavailable - needs manual review",
+            "amount": 0,
+            "currency": "INR",
+            "product": "General",
+            "cluster_location": None,
+            "confidence_score": 0,
+            "needs_review": True,
+            "ocr_error": str(error)
+        }
+    
+    def _preprocess_image(self, source):
+        """Normalize raw image bytes or a rendered page into the JPEG payload sent to Gemini"""
+        payload, stats = normalize_image(
+            source,
+            max_edge=config.IMAGE_MAX_EDGE,
+            grayscale=config.IMAGE_GRAYSCALE,
+            crop_borders=config.IMAGE_CROP_BORDERS,
+            jpeg_quality=config.IMAGE_JPEG_QUALITY
+        )
+        stage_stats.record(
+            'image_preprocess',
+            stats['ms'] / 1000,
+            source_bytes=stats['source_bytes'],
+            upload_bytes=stats['upload_bytes'],
+            decoded_bytes=stats['decoded_bytes'],
+            full_decode_bytes=stats['full_decode_bytes']
+        )
+        stage_stats.increment('gemini_upload_bytes', stats['upload_bytes'])
+        stage_stats.increment('image_decoded_bytes', stats['decoded_bytes'])
+        if stats['source_bytes']:
+            stage_stats.increment('image_source_bytes', stats['source_bytes'])
+        return payload
+    
     def _process_gemini_response(self, extracted_text):
         """Process and parse Gemini API response"""
         try:
-            print(f"Processing Gemini response: {extracted_text[:200]}...")
+            logger.debug("Processing Gemini response: %.200s", extracted_text)
             
             # Clean and parse JSON response
-            if extracted_text.startswith('```json'):
-                extracted_text = extracted_text[7:-3]
-            elif extracted_text.startswith('```'):
-                extracted_text = extracted_text[3:-3]
+            extracted_text = self._strip_code_fence(extracted_text)
             
             try:
                 bill_data = json.loads(extracted_text)
-                print("Successfully parsed JSON response")
                 
                 # Validate and clean the extracted data
-                validated_data = {
-                    "bill_number": bill_data.get('bill_number'),
-                    "bill_date": bill_data.get('bill_date'),
-                    "vendor_name": bill_data.get('vendor_name'),
-                    "transaction_category": bill_data.get('transaction_category', 'Other'),
-                    "purpose": bill_data.get('purpose', 'Bill processing'),
-                    "amount": float(bill_data.get('amount', 0)) if bill_data.get('amount') else 0,
-                    "currency": bill_data.get('currency', 'INR'),
-                    "product": bill_data.get('product', 'General'),
-                    "cluster_location": bill_data.get('cluster_location'),
-                    "confidence_score": int(bill_data.get('confidence_score', 50)) if bill_data.get('confidence_score') else 50
-                }
+                validated_data = self._validate_bill_data(bill_data)
                 
-                print(f"Extraction successful - Amount: {validated_data['amount']}, Vendor: {validated_data['vendor_name']}")
+                metrics.gemini_parse_results.inc(result='json', mode='single')
+                logger.debug("Extraction successful", extra={
+                    'amount': validated_data['amount'],
+                    'vendor': validated_data['vendor_name']
+                })
                 return validated_data
                 
             except json.JSONDecodeError as e:
-                print(f"JSON parsing failed: {e}")
+                metrics.gemini_parse_results.inc(result='text_fallback', mode='single')
+                logger.warning("JSON parsing failed, using text fallback: %s", e)
                 # Try to extract data using regex as fallback
                 return self._fallback_text_extraction(extracted_text)
                 
         except Exception as e:
-            print(f"Response processing error: {e}")
+            metrics.gemini_parse_results.inc(result='error', mode='single')
+            logger.error("Response processing error: %s", e)
             return {
                 "bill_number": None,
                 "bill_date": None,
@@ -476,12 +781,118 @@ class ReimbursementProcessor:
                 "confidence_score": 25
             }
     
+    def _process_gemini_batch_response(self, extracted_text, count):
+        """Parse a batched response into {image_index: validated_data}.
+        
+        Each array element is validated on its own; elements that are
+        malformed, out of range or repeated are left out so only those
+        bills need a single-bill retry.
+        """
+        logger.debug("Processing Gemini batch response: %.200s", extracted_text)
+        
+        try:
+            items = json.loads(self._strip_code_fence(extracted_text))
+        except json.JSONDecodeError as e:
+            metrics.gemini_parse_results.inc(result='error', mode='batch')
+            logger.warning("Batch JSON parsing failed: %s", e)
+            return {}
+        
+        if isinstance(items, dict):
+            items = items.get('bills') or items.get('results') or [items]
+        if not isinstance(items, list):
+            metrics.gemini_parse_results.inc(result='error', mode='batch')
+            logger.warning("Batch response is not a JSON array")
+            return {}
+        
+        results = {}
+        for position, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("element is not an object")
+                index = int(item.get('index', position))
+                if not 0 <= index < count:
+                    raise ValueError(f"index {index} out of range")
+                if index in results:
+                    raise ValueError(f"index {index} returned twice")
+                results[index] = self._validate_bill_data(item)
+            except (TypeError, ValueError) as e:
+                logger.warning("Skipping batch element %d: %s", position, e)
+        
+        metrics.gemini_parse_results.inc(result='json' if len(results) == count else 'partial', mode='batch')
+        logger.debug("Batch extraction parsed %d/%d bills", len(results), count)
+        return results
+    
+    def _apply_vendor_knowledge(self, bill_data):
+        """Look the extracted vendor up in past claims.
+        
+        A vendor known under the same key (spelling aside from case,
+        punctuation and legal form) gets its canonical name, with the
+        model's reading kept as vendor_name_raw, and its usual
+        category/product. A fuzzy match only adds a vendor_suggestion for
+        the submitter to confirm; the extracted fields stay as read.
+        """
+        if not config.VENDOR_MATCHING or not bill_data.get('vendor_name'):
+            return bill_data
+        with stage_stats.time('vendor_lookup') as fields:
+            match = self.vendor_index.lookup(bill_data['vendor_name'])
+            exact = match is not None and match.key == vendor_key(bill_data['vendor_name'])
+            fields['outcome'] = 'none' if match is None else 'exact' if exact else 'fuzzy'
+        metrics.vendor_matches.inc(result=fields['outcome'])
+        if match is None:
+            return bill_data
+        
+        if not exact:
+            bill_data['vendor_suggestion'] = {
+                'vendor_name': match.name,
+                'score': match.score,
+                'bills': match.bills,
+                'transaction_category': match.category,
+                'product': match.product
+            }
+            return bill_data
+        if match.name != bill_data['vendor_name']:
+            bill_data['vendor_name_raw'] = bill_data['vendor_name']
+            bill_data['vendor_name'] = match.name
+        if match.category:
+            bill_data['transaction_category'] = match.category
+        if match.product:
+            bill_data['product'] = match.product
+        logger.debug("Matched vendor", extra={
+            'vendor': match.name,
+            'score': match.score,
+            'bills': match.bills
+        })
+        return bill_data
+    
+    @staticmethod
+    def _strip_code_fence(text):
+        """Remove a ```json ... ``` wrapper around a model response"""
+        if text.startswith('```json'):
+            return text[7:-3]
+        if text.startswith('```'):
+            return text[3:-3]
+        return text
+    
+    @staticmethod
+    def _validate_bill_data(bill_data):
+        """Clean one extracted bill object into the standard field set"""
+        return {
+            "bill_number": bill_data.get('bill_number'),
+            "bill_date": bill_data.get('bill_date'),
+            "vendor_name": bill_data.get('vendor_name'),
+            "transaction_category": bill_data.get('transaction_category', 'Other'),
+            "purpose": bill_data.get('purpose', 'Bill processing'),
+            "amount": float(bill_data.get('amount', 0)) if bill_data.get('amount') else 0,
+            "currency": bill_data.get('currency', 'INR'),
+            "product": bill_data.get('product', 'General'),
+            "cluster_location": bill_data.get('cluster_location'),
+            "confidence_score": int(bill_data.get('confidence_score', 50)) if bill_data.get('confidence_score') else 50
+        }
+    
     def _fallback_text_extraction(self, text):
         """Fallback method to extract data from unstructured text"""
         import re
         
-        print("Using fallback text extraction...")
-        
         result = {
             "bill_number": None,
             "bill_date": None,
@@ -523,10 +934,10 @@ class ReimbursementProcessor:
                     result["bill_date"] = match.group(1)
                     break
             
-            print(f"Fallback extraction completed - Amount: {result['amount']}")
+            logger.debug("Fallback extraction completed", extra={'amount': result['amount']})
             
         except Exception as e:
-            print(f"Fallback extraction error: {e}")
+            logger.error("Fallback extraction error: %s", e)
         
         return result
     
@@ -578,9 +989,11 @@ class ReimbursementProcessor:
             }
             processed_bills.append(bill_data)
         else:
-            # Process uploaded bill images
-            for i, image_data in enumerate(bill_images):
-                extracted_data = self.extract_bill_details(image_data, f"bill_{i}.jpg")
+            # Process uploaded bill images, batching the OCR calls
+            extracted_bills = self.extract_bills_batch(
+                [(image_data, f"bill_{i}.jpg") for i, image_data in enumerate(bill_images)]
+            )
+            for extracted_data in extracted_bills:
                 
                 # Check confidence and set flags
                 needs_review = extracted_data.get('confidence_score', 100) < 85
@@ -630,7 +1043,7 @@ class ReimbursementProcessor:
             overall_status = "rejected"
         
         result = {
-            "id": f"CLM_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(self.processed_claims)+1:03d}",
+            "id": f"CLM_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{self.repository.count()+1:03d}",
             "employee_details": employee_details,
             "claim_details": claim_details,
             "bills": processed_bills,
@@ -638,50 +1051,253 @@ class ReimbursementProcessor:
             "timestamp": datetime.now().isoformat()
         }
         
-        # Store for duplicate checking
-        self.processed_claims.append(result)
-        
-        # Save to JSON file
-        self.save_claims()
+        # Store for duplicate checking and save to JSON file
+        self.add_claim(result)
         
         return result
     
+    def add_claim(self, claim):
+        """Store a new claim locally and index its bills for duplicate checks"""
+        with stage_stats.time('local_claim_save', backend=self.repository.name):
+            self.repository.add_claim(claim)
+        self.duplicate_index.add_claim(claim)
+        self.vendor_index.add_claim(claim)
+    
     def check_duplicate(self, bill_number, vendor_name, amount):
         """Check for potential duplicates"""
         if not bill_number or not vendor_name or not amount:
             return False
         
-        for claim in self.processed_claims:
-            for bill in claim["bills"]:
-                if (bill.get("bill_number") == bill_number and 
-                    bill.get("vendor_name") == vendor_name and 
-                    abs(bill.get("amount", 0) - float(amount)) < 0.01):
-                    return True
-        return False
+        return self.duplicate_index.contains(bill_number, vendor_name, amount)
+    
+    def check_near_duplicate(self, vendor_name, amount, bill_date, window_days=None):
+        """Check for a bill from the same vendor with the same amount within a date window"""
+        if window_days is None:
+            window_days = config.DUPLICATE_NEAR_WINDOW_DAYS
+        if window_days <= 0:
+            return False
+        
+        return self.duplicate_index.has_near_duplicate(vendor_name, amount, bill_date, window_days)
     
     def get_all_claims(self):
-        """Get all claims with fresh data from file"""
-        self.processed_claims = self.load_claims()
-        return self.processed_claims
+        """Get all claims, including ones written by other workers"""
+        return self.repository.list_claims()
     
     def get_claim_by_id(self, claim_id):
         """Get specific claim by ID"""
-        claims = self.get_all_claims()
-        for claim in claims:
-            if claim.get('id') == claim_id:
-                return claim
-        return None
+        return self.repository.get_claim(claim_id)
     
     def delete_claim(self, claim_id):
         """Delete a claim by ID"""
-        self.processed_claims = self.load_claims()
-        self.processed_claims = [claim for claim in self.processed_claims if claim.get('id') != claim_id]
-        self.save_claims()
-        return True
+        claim = self.repository.delete_claim(claim_id)
+        self.duplicate_index.remove_claim(claim_id)
+        self.vendor_index.remove_claim(claim_id)
+        return claim is not None
 
 # Initialize processor
 processor = ReimbursementProcessor()
 
+# Claim store used by the /api/claims* routes: Firestore when available, else the local store
+claim_repository = firebase_service.claims if firebase_service else processor.repository
+
+def claim_approvers(claim):
+    """(approver_email, level) pairs a claim waits on: the submitter's reporting chain in the employee directory.
+    
+    Emails are the directory's canonical form, so compare against
+    `employee_directory.canonical_email(login_email)`. The HOD typed on the
+    form is only informational; trusting it would let a submitter pick
+    their own approver.
+    """
+    submitter = claim_employee_email(claim)
+    approvers = {}
+    employee = employee_directory.get(submitter) if submitter else None
+    if employee:
+        for level in REPORTING_LEVELS:
+            email = employee_directory.canonical_email(employee.approver(level)[1])
+            if email and email not in approvers:
+                approvers[email] = level
+        approvers.pop(employee_directory.canonical_email(employee.email), None)
+    return list(approvers.items())
+
+# Per-approver pending-claims inbox, kept next to the claim store and updated on submit, status change and delete;
+# keyed by canonical email so any domain variant of an approver's login opens their inbox
+approval_inbox = create_approval_inbox(claim_repository, claim_approvers, employee_directory.canonical_email)
+
+# Month-bucketed spend counters for /api/stats, kept next to the claim store
+spend_rollups = create_spend_rollups(claim_repository)
+
+# Reference counts of the content-addressed bill files, so a delete only removes blobs no other claim uses
+bill_blob_refs = create_bill_blob_refs(claim_repository)
+
+# Cached claim list/detail responses per viewer, retired by the writes below
+claim_read_cache = ClaimReadCache(max_entries=config.CLAIM_CACHE_MAX_ENTRIES, ttl=config.CLAIM_CACHE_TTL)
+if hasattr(claim_repository, 'listeners'):
+    claim_repository.listeners.append(claim_read_cache)
+
+def refresh_claim_views(claim, ref, hold=None):
+    """Update the inbox, rollups and blob references after a claim is saved or changes status.
+    
+    A submit's pending blob `hold` is released once the claim's own
+    references are recorded; if that fails the hold stays, keeping the
+    files alive. Failures never fail the write.
+    """
+    claim_read_cache.invalidate(*claim_scopes(claim, ref))
+    for view in (approval_inbox, spend_rollups):
+        try:
+            view.add_claim(claim, ref)
+        except Exception as e:
+            logger.warning("Failed to update %s for claim %s: %s", type(view).__name__, ref, e)
+    try:
+        release_bill_files(bill_blob_refs.add_claim(claim, ref))
+        if hold:
+            release_bill_files(bill_blob_refs.release_hold(hold))
+    except Exception as e:
+        logger.warning("Failed to update bill file references for claim %s: %s", ref, e)
+
+def hold_bill_files(bill_files):
+    """Take a pending reference on the content-addressed blobs of the request's bill files.
+    
+    Returns the hold token, or None if nothing was held (direct uploads
+    have unique paths; a failure only reopens the delete race).
+    """
+    paths = {
+        StorageBackend.content_path(hashlib.sha256(file_data).hexdigest(), filename)
+        for _i, file_data, filename, _content_type in bill_files
+        if not isinstance(file_data, dict)
+    }
+    if not paths:
+        return None
+    token = uuid.uuid4().hex
+    try:
+        bill_blob_refs.hold(token, paths)
+    except Exception as e:
+        logger.warning("Failed to hold bill files: %s", e)
+        return None
+    return token
+
+def release_bill_hold(token):
+    """Drop a failed submit's pending blob references, deleting files it alone uploaded"""
+    try:
+        release_bill_files(bill_blob_refs.release_hold(token))
+    except Exception as e:
+        logger.warning("Failed to release bill file hold %s: %s", token, e)
+
+def drop_claim_views(ref, claim=None):
+    """Remove a deleted claim from the inbox, rollups and blob references"""
+    claim_read_cache.invalidate(*claim_scopes(claim, ref))
+    for view in (approval_inbox, spend_rollups):
+        try:
+            view.remove_claim(ref)
+        except Exception as e:
+            logger.warning("Failed to update %s for claim %s: %s", type(view).__name__, ref, e)
+    try:
+        release_bill_files(bill_blob_refs.remove_claim(ref))
+    except Exception as e:
+        logger.warning("Failed to update bill file references for claim %s: %s", ref, e)
+
+def _delete_bill_files(paths):
+    for path in paths:
+        try:
+            # A submit may have held or saved a reference since the count reached zero
+            if bill_blob_refs.refs(path) > 0:
+                logger.debug("Kept bill file referenced again", extra={'file_path': path})
+                continue
+            firebase_service.storage.delete(path)
+            logger.debug("Deleted unreferenced bill file", extra={'file_path': path})
+        except Exception as e:
+            logger.warning("Failed to delete bill file %s: %s", path, e)
+
+def release_bill_files(paths):
+    """Delete bill files no claim references any more, off the request thread"""
+    if paths and firebase_service and firebase_service.storage:
+        submit_executor.submit(_delete_bill_files, list(paths))
+
+# Background OCR workers for job-based /process-bill requests. Job state is per-process, so a poll
+# landing on another worker would never find the job: job mode is off when several processes serve requests
+ocr_jobs_enabled = config.WEB_CONCURRENCY <= 1
+if not ocr_jobs_enabled:
+    logger.warning("WEB_CONCURRENCY=%d: OCR job mode needs a single process, /process-bill will run OCR inline",
+                   config.WEB_CONCURRENCY)
+ocr_jobs = OCRJobQueue(
+    processor.extract_bill_details,
+    workers=config.OCR_JOB_WORKERS,
+    max_depth=config.OCR_JOB_MAX_DEPTH,
+    result_ttl=config.OCR_JOB_RESULT_TTL
+)
+
+# Bounded worker pool shared by all submits for per-bill uploads and OCR
+submit_executor = ThreadPoolExecutor(
+    max_workers=config.SUBMIT_MAX_WORKERS,
+    thread_name_prefix='submit-worker'
+)
+
+def _submit_with_context(fn, *args):
+    """Run fn on the submit pool in the request's context so stage metrics keep its route label"""
+    return submit_executor.submit(contextvars.copy_context().run, fn, *args)
+
+# Request metrics: route label for stage samples, plus per-route request counts and latency
+@app.before_request
+def _start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_route_token = metrics.current_route.set(request.endpoint or 'unmatched')
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.get('metrics_start')
+    if start is not None and not request.path.startswith('/static/'):
+        route = request.endpoint or 'unmatched'
+        metrics.http_requests.inc(route=route, method=request.method, status=response.status_code)
+        metrics.http_seconds.observe(
+            time.perf_counter() - start,
+            route=route,
+            method=request.method,
+            outcome=metrics.http_outcome(response.status_code)
+        )
+    return response
+
+@app.teardown_request
+def _end_request_metrics(_error=None):
+    token = g.pop('metrics_route_token', None)
+    if token is not None:
+        metrics.current_route.reset(token)
+
+BREAKER_STATE_VALUES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+def _collect_service_metrics():
+    """Scrape-time samples from the existing stats of the pipeline, Gemini client, OCR cache and job queue"""
+    yield ('pipeline_total', 'counter', 'Pipeline running totals (bytes sent to Gemini, batch outcomes)',
+           [({'counter': name}, value) for name, value in stage_stats.counters().items()])
+
+    client_stats = gemini_client.get_stats()
+    yield ('gemini_client_total', 'counter', 'Gemini client calls, attempts, retries and rejections',
+           [({'event': name}, value) for name, value in client_stats.items()
+            if name not in ('breaker_state', 'breaker_failures', 'breaker_times_opened')])
+    yield ('gemini_breaker_state', 'gauge', 'Gemini circuit breaker state (0 closed, 1 half open, 2 open)',
+           [({}, BREAKER_STATE_VALUES.get(client_stats['breaker_state'], 2))])
+    yield ('gemini_breaker_opened_total', 'counter', 'Times the Gemini circuit breaker has opened',
+           [({}, client_stats['breaker_times_opened'])])
+
+    cache_stats = ocr_cache.get_stats()
+    yield ('ocr_cache_total', 'counter', 'OCR cache lookups, stores and evictions',
+           [({'event': name}, cache_stats[name]) for name in
+            ('memory_hits', 'disk_hits', 'misses', 'stores', 'memory_evictions', 'disk_evictions')])
+    yield ('ocr_cache_entries', 'gauge', 'OCR cache entries per tier',
+           [({'tier': 'memory'}, cache_stats['memory_entries']), ({'tier': 'disk'}, cache_stats['disk_entries'])])
+    yield ('ocr_cache_disk_bytes', 'gauge', 'Bytes used by the on-disk OCR cache', [({}, cache_stats['disk_bytes'])])
+
+    read_cache_stats = claim_read_cache.get_stats()
+    yield ('claim_read_cache_total', 'counter', 'Claim read cache lookups, stores, invalidations and evictions',
+           [({'event': name}, read_cache_stats[name]) for name in
+            ('hits', 'misses', 'stores', 'invalidations', 'evictions')])
+    yield ('claim_read_cache_entries', 'gauge', 'Cached claim read responses', [({}, read_cache_stats['entries'])])
+
+    job_stats = ocr_jobs.get_stats()
+    yield ('ocr_jobs_in_flight', 'gauge', 'Queued and running OCR jobs', [({}, job_stats['in_flight'])])
+    yield ('ocr_jobs', 'gauge', 'Retained OCR jobs by status',
+           [({'status': status}, count) for status, count in job_stats['jobs_by_status'].items()])
+
+metrics.registry.register_collector(_collect_service_metrics)
+
 # Authentication Routes
 @app.route('/login')
 def login():
@@ -700,21 +1316,19 @@ def login():
 def login_callback():
     """Handle Firebase authentication callback"""
     try:
-        print("Login callback called")
         data = request.get_json()
-        print(f"Received data: {data}")
         
         id_token = data.get('idToken')
         
         if not id_token:
-            print("No ID token provided")
+            logger.warning("Login callback without an ID token")
             return jsonify({'success': False, 'error': 'No ID token provided'}), 400
         
         # Verify the Firebase ID token
         user_info = verify_firebase_token(id_token)
         
         if user_info:
-            print(f"User authenticated: {user_info.get('email')}")
+            logger.info("User authenticated", extra={'uid': user_info['uid']})
             # Store user info in session
             session['user'] = {
                 'uid': user_info['uid'],
@@ -726,38 +1340,24 @@ def login_callback():
             
             # Look up employee details
             user_email = user_info.get('email', '').strip().lower()
-            employee_details = EMPLOYEE_DATA.get(user_email)
+            employee = employee_directory.get(user_email)
             
-            if employee_details:
-                session['employee_details'] = {
-                    "employee_id": employee_details.get("Employee ID"),
-                    "employee_name": employee_details.get("Employee Name"),
-                    "employee_email": employee_details.get("Employee Email ID"),
-                    "department": employee_details.get("Department Name"),
-                    "team": employee_details.get("Team Name"),
-                    "hod_name": employee_details.get("Reporting Person - 1 Name"),
-                    "hod_email": employee_details.get("Reporting Person - 1 Email"),
-                    "reporting_2_name": employee_details.get("Reporting Person - 2 Name"),
-                    "reporting_2_email": employee_details.get("Reporting Person - 2 Email"),
-                    "reporting_3_name": employee_details.get("Reporting Person - 3 Name"),
-                    "reporting_3_email": employee_details.get("Reporting Person - 3 Email"),
-                    "phone": employee_details.get("Phone Number of Employee")
-                }
-                print(f"Employee details loaded for: {employee_details.get('Employee Name')}")
+            if employee:
+                session['employee_details'] = employee.to_session()
+                logger.debug("Employee details loaded", extra={'employee_id': employee.employee_id})
             else:
                 session['employee_details'] = None
-                print(f"No employee details found for email: {user_email}")
+                logger.warning("No employee details found for email: %s", user_email)
             
             return jsonify({
                 'success': True, 
                 'redirect_url': url_for('index')
             })
         else:
-            print("Token verification failed")
             return jsonify({'success': False, 'error': 'Invalid token or verification failed'}), 401
             
     except Exception as e:
-        print(f"Login callback error: {e}")
+        logger.exception("Login callback error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/logout')
@@ -780,42 +1380,191 @@ def dashboard():
 def index():
     user = session.get('user')
     employee_details = session.get('employee_details')
-    return render_template('index.html', user=user, employee_details=employee_details)
+    return render_template('index.html', user=user, employee_details=employee_details,
+                           direct_uploads=config.DIRECT_UPLOADS)
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def api_create_upload():
+    """Signed URL for uploading one bill straight to storage, plus the token to send in its place"""
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename') or ''
+    try:
+        size = int(data['size']) if data.get('size') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid file size'}), 400
+    
+    try:
+        upload = direct_uploads.issue(
+            session.get('user', {}).get('email'),
+            filename,
+            content_type=data.get('content_type'),
+            size=size
+        )
+    except NotImplementedError:
+        return jsonify({'success': False, 'error': 'Direct uploads are not supported by this storage backend'}), 501
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'data': upload})
 
 @app.route('/process-bill', methods=['POST'])
 @login_required
 def process_bill():
-    """Process a single bill and extract details using Gemini Vision API"""
+    """Process a single bill and extract details using Gemini Vision API.
+    
+    The bill comes either as the `bill_image` file or, once uploaded
+    directly to storage, as an `upload_token` from /api/uploads.
+    """
     try:
-        if 'bill_image' not in request.files:
-            return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+        user_email = session.get('user', {}).get('email')
+        upload_token = request.values.get('upload_token')
         
-        file = request.files['bill_image']
-        
-        if file.filename == '':
-            return jsonify({'success': False, 'error': 'No file selected'}), 400
-        
-        if file and allowed_file(file.filename):
-            # Read the file data
-            file_data = file.read()
+        if upload_token:
+            try:
+                upload = direct_uploads.resolve(upload_token, user_email)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            filename = upload['filename']
+            # Read from storage where the OCR runs, not on the request thread
+            file_data = partial(direct_uploads.read, upload)
+        else:
+            if 'bill_image' not in request.files:
+                return jsonify({'success': False, 'error': 'No file uploaded'}), 400
             
-            # Extract bill details using Gemini (with filename for extension detection)
-            bill_details = processor.extract_bill_details(file_data, file.filename)
+            file = request.files['bill_image']
             
-            return jsonify({
+            if file.filename == '':
+                return jsonify({'success': False, 'error': 'No file selected'}), 400
+            
+            if not allowed_file(file.filename):
+                return jsonify({'success': False, 'error': 'Invalid file type'}), 400
+            
+            # Read the file data
+            filename = file.filename
+            with stage_stats.time('file_read') as fields:
+                file_data = file.read()
+                fields['bytes'] = len(file_data)
+        
+        # Job mode: hand the bill to the background OCR workers and return immediately
+        if request.values.get('mode') == 'async' and ocr_jobs_enabled:
+            try:
+                job_id = ocr_jobs.submit(file_data, filename, owner=user_email)
+            except QueueFullError as e:
+                response = jsonify({'success': False, 'error': str(e)})
+                response.headers['Retry-After'] = '5'
+                return response, 429
+            
+            job_info = {
                 'success': True,
-                'bill_details': bill_details
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Invalid file type'}), 400
+                'job_id': job_id,
+                'status_url': url_for('api_ocr_job_status', job_id=job_id)
+            }
+            if config.OCR_JOB_STREAM:
+                job_info['stream_url'] = url_for('api_ocr_job_stream', job_id=job_id)
+            return jsonify(job_info), 202
+        
+        if callable(file_data):
+            file_data = file_data()
+        
+        # Extract bill details using Gemini (with filename for extension detection)
+        bill_details = processor.extract_bill_details(file_data, filename)
+        
+        return jsonify({
+            'success': True,
+            'bill_details': bill_details
+        })
             
     except Exception as e:
-        print(f"Bill processing error: {e}")
+        logger.exception("Bill processing error: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _get_user_ocr_job(job_id):
+    """Return the OCR job if it belongs to the logged-in user"""
+    job = ocr_jobs.get(job_id)
+    if not job or job['owner'] != session.get('user', {}).get('email'):
+        return None
+    return job
+
+def _ocr_job_payload(job):
+    """Public view of an OCR job"""
+    return {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'bill_details': job['result'],
+        'error': job['error']
+    }
+
+@app.route('/api/ocr-jobs/<job_id>')
+@login_required
+def api_ocr_job_status(job_id):
+    """Poll the status of a queued bill OCR job"""
+    job = _get_user_ocr_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    return jsonify({'success': True, 'data': _ocr_job_payload(job)})
+
+@app.route('/api/ocr-jobs/<job_id>/stream')
+@login_required
+def api_ocr_job_stream(job_id):
+    """Server-sent events stream of an OCR job's status until it finishes"""
+    if not config.OCR_JOB_STREAM:
+        return jsonify({'success': False, 'error': 'Job streaming is disabled, poll the job status instead'}), 404
+    job = _get_user_ocr_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found or expired'}), 404
+    
+    def generate(job):
+        deadline = time.time() + config.OCR_JOB_STREAM_TIMEOUT
+        yield f"event: status\ndata: {json.dumps(_ocr_job_payload(job))}\n\n"
+        while job['status'] not in OCRJobQueue.FINISHED_STATES and time.time() < deadline:
+            updated = ocr_jobs.wait(job['job_id'], last_status=job['status'], timeout=15)
+            if updated is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            if updated['status'] == job['status']:
+                # Keep-alive comment so proxies don't close an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            job = updated
+            yield f"event: status\ndata: {json.dumps(_ocr_job_payload(job))}\n\n"
+    
+    return Response(generate(job), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def _cancel_bill_futures(pending):
+    """Cancel upload/OCR work that has not started yet for an aborted submit"""
+    for _i, _filename, _content_type, upload_future, ocr_future, _ocr_position in pending:
+        upload_future.cancel()
+        ocr_future.cancel()
+
+def _store_bill_file(file_data, filename, content_type):
+    """Upload a bill read from the request, or confirm one uploaded directly (file_data is then its upload)"""
+    if isinstance(file_data, dict):
+        return direct_uploads.confirm(file_data)
+    return firebase_service.upload_file_to_storage(file_data, filename, content_type)
+
+def _extract_bill_files(files):
+    """OCR a batch of bills, reading directly uploaded ones back from storage first.
+    
+    Returns the extractions and, for direct uploads, the SHA-256 of the bytes read (None otherwise).
+    """
+    batch, digests = [], []
+    for file_data, filename in files:
+        if isinstance(file_data, dict):
+            file_data = direct_uploads.read(file_data)
+            digests.append(hashlib.sha256(file_data).hexdigest())
+        else:
+            digests.append(None)
+        batch.append((file_data, filename))
+    return processor.extract_bills_batch(batch), digests
+
 @app.route('/submit-claim', methods=['POST'])
 @login_required
 def submit_claim():
+    hold, saved = None, False
     try:
         # Check if Firebase is available
         if not firebase_service:
@@ -829,13 +1578,14 @@ def submit_claim():
         
         # Get user info from session
         user_info = session.get('user', {})
-        employee_details = session.get('employee_details', {})
+        employee_details = session.get('employee_details') or {}
         
         # Get transaction count
         transaction_count = int(form_data.get('transaction_count', 1))
         
-        # Parse transactions and upload files
+        # Parse transactions and read bill files
         transactions = []
+        bill_files = []
         total_amount = 0
         
         for i in range(transaction_count):
@@ -852,46 +1602,28 @@ def submit_claim():
             except (ValueError, TypeError):
                 transaction['amount'] = 0
             
-            # Handle bill file upload
+            # Bills uploaded straight to storage arrive as tokens; they are read back by the OCR batch
+            upload_token = form_data.get(f'transaction_{i}_upload_token')
             bill_file_key = f'transaction_{i}_bill'
-            if bill_file_key in request.files:
+            if upload_token:
+                try:
+                    upload = direct_uploads.resolve(upload_token, user_info.get('email'))
+                except ValueError as e:
+                    return jsonify({
+                        "success": False,
+                        "error": f"Error processing file for transaction {i+1}: {str(e)}"
+                    }), 400
+                bill_files.append((i, upload, upload['filename'], upload['content_type']))
+            # Request files must be read on the request thread
+            elif bill_file_key in request.files:
                 file = request.files[bill_file_key]
                 if file and file.filename and allowed_file(file.filename):
                     try:
-                        # Read file data
-                        file_data = file.read()
-                        
-                        # Determine content type
+                        with stage_stats.time('file_read') as fields:
+                            file_data = file.read()
+                            fields['bytes'] = len(file_data)
                         content_type = file.content_type or 'application/octet-stream'
-                        
-                        # Upload to Firebase Storage
-                        upload_result = firebase_service.upload_file_to_storage(
-                            file_data, 
-                            file.filename, 
-                            content_type
-                        )
-                        
-                        if upload_result['success']:
-                            transaction['bill_file_url'] = upload_result['file_url']
-                            transaction['bill_file_path'] = upload_result['file_path']
-                            transaction['bill_file_size'] = upload_result['file_size']
-                            transaction['bill_file_name'] = file.filename
-                            transaction['bill_file_type'] = content_type
-                            
-                            # Extract bill details using OCR
-                            try:
-                                extracted_details = processor.extract_bill_details(file_data, file.filename)
-                                transaction['extracted_details'] = extracted_details
-                                print(f"OCR extraction completed for transaction {i}")
-                            except Exception as e:
-                                print(f"OCR extraction failed for transaction {i}: {e}")
-                                transaction['extracted_details'] = None
-                        else:
-                            return jsonify({
-                                "success": False,
-                                "error": f"Failed to upload file for transaction {i+1}: {upload_result['error']}"
-                            }), 500
-                            
+                        bill_files.append((i, file_data, file.filename, content_type))
                     except Exception as e:
                         return jsonify({
                             "success": False,
@@ -900,6 +1632,70 @@ def submit_claim():
             
             transactions.append(transaction)
         
+        # Hold reused blobs before the uploads check for them, so a concurrent delete can't remove them
+        hold = hold_bill_files(bill_files)
+        
+        # Upload every bill concurrently and OCR them in batches of OCR_BATCH_SIZE,
+        # one Gemini request per batch; latency tracks the slowest upload/batch
+        batch_size = max(config.OCR_BATCH_SIZE, 1)
+        pending = []
+        for start in range(0, len(bill_files), batch_size):
+            chunk = bill_files[start:start + batch_size]
+            ocr_future = _submit_with_context(
+                _extract_bill_files,
+                [(file_data, filename) for _i, file_data, filename, _content_type in chunk]
+            )
+            for ocr_position, (i, file_data, filename, content_type) in enumerate(chunk):
+                upload_future = _submit_with_context(_store_bill_file, file_data, filename, content_type)
+                pending.append((i, filename, content_type, upload_future, ocr_future, ocr_position))
+        
+        # Collect in transaction order so the first failed upload is the one reported
+        for position, (i, filename, content_type, upload_future, ocr_future, ocr_position) in enumerate(pending):
+            try:
+                upload_result = upload_future.result()
+            except Exception as e:
+                _cancel_bill_futures(pending[position:])
+                return jsonify({
+                    "success": False,
+                    "error": f"Error processing file for transaction {i+1}: {str(e)}"
+                }), 500
+            
+            if not upload_result['success']:
+                _cancel_bill_futures(pending[position:])
+                return jsonify({
+                    "success": False,
+                    "error": f"Failed to upload file for transaction {i+1}: {upload_result['error']}"
+                }), 500
+            
+            transaction = transactions[i]
+            transaction['bill_file_url'] = upload_result['file_url']
+            transaction['bill_file_path'] = upload_result['file_path']
+            transaction['bill_file_size'] = upload_result['file_size']
+            transaction['bill_file_name'] = filename
+            transaction['bill_file_type'] = content_type
+            if upload_result.get('sha256'):
+                transaction['bill_file_sha256'] = upload_result['sha256']
+            
+            # Extract bill details using OCR
+            try:
+                extracted, digests = ocr_future.result()
+                transaction['extracted_details'] = extracted[ocr_position]
+                if digests[ocr_position]:
+                    transaction['bill_file_sha256'] = digests[ocr_position]
+            except Exception as e:
+                logger.warning("OCR extraction failed for transaction %d: %s", i, e)
+                transaction['extracted_details'] = None
+        
+        # Flag bills already claimed before, using the entered values with OCR as fallback
+        for transaction in transactions:
+            extracted = transaction.get('extracted_details') or {}
+            vendor_name = extracted.get('vendor_name')
+            bill_number = transaction['bill_number'] or extracted.get('bill_number')
+            amount = transaction['amount'] or extracted.get('amount')
+            bill_date = transaction['bill_date'] or extracted.get('bill_date')
+            transaction['duplicate_detected'] = processor.check_duplicate(bill_number, vendor_name, amount)
+            transaction['possible_duplicate'] = processor.check_near_duplicate(vendor_name, amount, bill_date)
+        
         # Create comprehensive claim data structure
         claim_data = {
             'claim_id': f"CLAIM_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{str(uuid.uuid4())[:8].upper()}",
@@ -940,12 +1736,14 @@ def submit_claim():
         save_result = firebase_service.save_claim_to_firestore(claim_data)
         
         if save_result['success']:
+            saved = True
+            refresh_claim_views(claim_data, save_result['document_id'], hold=hold)
+            
             # Also save to local JSON for backward compatibility (optional)
             try:
-                processor.processed_claims.append(claim_data)
-                processor.save_claims()
+                processor.add_claim(claim_data)
             except Exception as e:
-                print(f"Warning: Failed to save to local JSON: {e}")
+                logger.warning("Failed to save to local JSON: %s", e)
             
             return jsonify({
                 "success": True,
@@ -964,101 +1762,218 @@ def submit_claim():
             }), 500
         
     except Exception as e:
-        print(f"Submit claim error: {e}")
+        logger.exception("Submit claim error: %s", e)
         return jsonify({
             "success": False,
             "error": f"An error occurred while submitting the claim: {str(e)}"
         }), 500
+    finally:
+        if hold and not saved:
+            release_bill_hold(hold)
+
+def _session_claim_owner():
+    """Email whose claims the logged-in user may list, or None for the whole local store"""
+    if firebase_service:
+        return session.get('user', {}).get('email')
+    # The local store keeps legacy claims without an owner, so list everything
+    return None
+
+def cached_claim_read(scopes):
+    """Serve a claim read through claim_read_cache, keyed by viewer and URL and revalidated by ETag.
+    
+    `scopes(**view_args)` names the scopes the response is read from. Only
+    200 responses are cached; a view sets g.skip_claim_cache for results it
+    must not keep (e.g. the local fallback).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not claim_read_cache.enabled:
+                return f(*args, **kwargs)
+            entry_scopes = scopes(**kwargs)
+            key = (session.get('user', {}).get('email'), request.full_path)
+            entry = claim_read_cache.get(key, entry_scopes)
+            if entry is None:
+                # Versions are taken before the read, so a write racing it retires the entry
+                versions = claim_read_cache.versions(entry_scopes)
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or g.pop('skip_claim_cache', False):
+                    return response
+                entry = claim_read_cache.put(key, versions, response.get_data(), response.mimetype)
+            response = app.response_class(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response.make_conditional(request)
+        return decorated_function
+    return decorator
+
+def _owner_claim_scopes(**_view_args):
+    return {owner_scope(_session_claim_owner())}
+
+def _claim_detail_scopes(claim_id):
+    return {claim_scope(claim_id)}
+
+def _claim_filter_args():
+    """Server-side listing filters from the query string"""
+    return {
+        'status': request.args.get('status') or None,
+        'department': request.args.get('department') or None,
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None
+    }
+
+def _claim_page_limit():
+    """Requested page size, clamped to the configured maximum"""
+    try:
+        limit = int(request.args.get('limit', config.CLAIMS_PAGE_SIZE))
+    except ValueError:
+        limit = config.CLAIMS_PAGE_SIZE
+    return max(1, min(limit, config.CLAIMS_PAGE_MAX))
 
 @app.route('/claims')
 @login_required
+@cached_claim_read(_owner_claim_scopes)
 def view_claims():
-    """View claims page - uses Firebase if available, falls back to local storage"""
+    """View claims page - renders only the first page of claims plus summary counts"""
+    owner = _session_claim_owner()
     try:
-        if firebase_service:
-            # Get claims from Firestore
-            user_email = session.get('user', {}).get('email')
-            claims = firebase_service.get_claims_from_firestore(user_email)
-        else:
-            # Fallback to local storage
-            claims = processor.get_all_claims()
-        
-        return render_template('claims.html', claims=claims)
+        claims, next_cursor = claim_repository.query_claims(owner, limit=config.CLAIMS_PAGE_SIZE)
+        summary = claim_repository.summarize_claims(owner)
     except Exception as e:
-        print(f"Error viewing claims: {e}")
+        logger.error("Error viewing claims: %s", e)
         # Fallback to local storage on error
-        claims = processor.get_all_claims()
-        return render_template('claims.html', claims=claims)
+        g.skip_claim_cache = True
+        claims, next_cursor = processor.repository.query_claims(limit=config.CLAIMS_PAGE_SIZE)
+        summary = processor.repository.summarize_claims()
+    return render_template('claims.html', claims=claims, next_cursor=next_cursor, summary=summary)
 
 @app.route('/api/claims')
 @login_required
+@cached_claim_read(_owner_claim_scopes)
 def api_claims():
-    """API endpoint to get all claims"""
+    """API endpoint to list claims one page at a time with server-side filters"""
+    filters = _claim_filter_args()
+    limit = _claim_page_limit()
+    cursor = request.args.get('cursor') or None
     try:
-        if firebase_service:
-            # Get claims from Firestore
-            user_email = session.get('user', {}).get('email')
-            claims = firebase_service.get_claims_from_firestore(user_email)
-        else:
-            # Fallback to local storage
-            claims = processor.get_all_claims()
-        
+        claims, next_cursor = claim_repository.query_claims(
+            _session_claim_owner(), limit=limit, cursor=cursor, **filters
+        )
         return jsonify({
             'success': True,
             'data': claims,
             'count': len(claims),
-            'source': 'firebase' if firebase_service else 'local'
+            'next_cursor': next_cursor,
+            'source': claim_repository.name
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        print(f"Error getting claims: {e}")
+        logger.error("Error getting claims: %s", e)
         # Fallback to local storage on error
-        claims = processor.get_all_claims()
+        g.skip_claim_cache = True
+        claims, next_cursor = processor.repository.query_claims(limit=limit, **filters)
         return jsonify({
             'success': True,
             'data': claims,
             'count': len(claims),
+            'next_cursor': None,
             'source': 'local_fallback',
             'warning': str(e)
         })
 
+@app.route('/api/claims/summary')
+@login_required
+@cached_claim_read(_owner_claim_scopes)
+def api_claims_summary():
+    """API endpoint with claim counts by status, computed by the store"""
+    filters = _claim_filter_args()
+    filters.pop('status')
+    try:
+        summary = claim_repository.summarize_claims(_session_claim_owner(), **filters)
+        return jsonify({
+            'success': True,
+            'data': summary,
+            'source': claim_repository.name
+        })
+    except Exception as e:
+        logger.error("Error summarizing claims: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+@app.route('/api/claims/export')
+@admin_required
+def api_export_claims():
+    """Stream one row per bill as CSV or XLSX, straight from the claim store"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    stream, mimetype = EXPORT_FORMATS[export_format]
+    filters = _claim_filter_args()
+    
+    def generate():
+        rows = 0
+        for claim_row in iter_export_rows(claim_repository.stream_claims(**filters)):
+            rows += 1
+            yield claim_row
+        logger.info("Claims export finished", extra={'format': export_format, 'rows': rows})
+    
+    filename = f"claims_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/stats')
+@admin_required
+def api_stats():
+    """Spend totals by status, department, category, cluster and month, read from the rollups"""
+    try:
+        stats = spend_rollups.summary(
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None
+        )
+        return jsonify({
+            'success': True,
+            'data': stats,
+            'source': spend_rollups.name
+        })
+    except Exception as e:
+        logger.error("Error reading spend rollups: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/claims/<claim_id>')
 @login_required
+@cached_claim_read(_claim_detail_scopes)
 def api_claim_detail(claim_id):
     """API endpoint to get specific claim details"""
     try:
-        if firebase_service and firebase_service.db:
-            # Get from Firestore
-            doc_ref = firebase_service.db.collection('reimbursement_claims').document(claim_id)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                claim_data = doc.to_dict()
-                claim_data['id'] = doc.id
-                return jsonify({
-                    'success': True,
-                    'data': claim_data
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'Claim not found in Firebase'
-                }), 404
-        else:
-            # Fallback to local storage
-            claim = processor.get_claim_by_id(claim_id)
-            if claim:
-                return jsonify({
-                    'success': True,
-                    'data': claim
-                })
+        claim = claim_repository.get_claim(claim_id)
+        if claim:
             return jsonify({
-                'success': False,
-                'error': 'Claim not found'
-            }), 404
+                'success': True,
+                'data': claim
+            })
+        return jsonify({
+            'success': False,
+            'error': 'Claim not found in Firebase' if firebase_service else 'Claim not found'
+        }), 404
             
     except Exception as e:
-        print(f"Error getting claim details: {e}")
+        logger.error("Error getting claim details: %s", e)
         # Try local storage as fallback
+        g.skip_claim_cache = True
         claim = processor.get_claim_by_id(claim_id)
         if claim:
             return jsonify({
@@ -1076,40 +1991,230 @@ def api_claim_detail(claim_id):
 def api_delete_claim(claim_id):
     """API endpoint to delete a claim"""
     try:
-        if firebase_service and firebase_service.db:
-            # Delete from Firestore
-            doc_ref = firebase_service.db.collection('reimbursement_claims').document(claim_id)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                doc_ref.delete()
-                return jsonify({
-                    'success': True,
-                    'message': 'Claim deleted successfully from Firebase'
-                })
-            else:
+        if firebase_service:
+            claim = claim_repository.delete_claim(claim_id)
+            if claim is None:
                 return jsonify({
                     'success': False,
                     'error': 'Claim not found in Firebase'
                 }), 404
-        else:
-            # Fallback to local storage
-            if processor.delete_claim(claim_id):
-                return jsonify({
-                    'success': True,
-                    'message': 'Claim deleted successfully'
-                })
+            drop_claim_views(claim_id, claim)
+            
+            # Keep the local mirror and duplicate index in step with Firestore
+            if claim.get('claim_id'):
+                try:
+                    processor.delete_claim(claim['claim_id'])
+                except Exception as e:
+                    logger.warning("Failed to delete claim from local store: %s", e)
+            
             return jsonify({
-                'success': False,
-                'error': 'Claim not found'
-            }), 404
+                'success': True,
+                'message': 'Claim deleted successfully from Firebase'
+            })
+        
+        # Fallback to local storage
+        if processor.delete_claim(claim_id):
+            drop_claim_views(claim_id)
+            return jsonify({
+                'success': True,
+                'message': 'Claim deleted successfully'
+            })
+        return jsonify({
+            'success': False,
+            'error': 'Claim not found'
+        }), 404
             
     except Exception as e:
-        print(f"Error deleting claim: {e}")
+        logger.error("Error deleting claim: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/claims/<claim_id>/status', methods=['POST'])
+@login_required
+def api_update_claim_status(claim_id):
+    """Approve, reject or otherwise change a claim's status (its approvers and admins only)"""
+    data = request.get_json(silent=True) or {}
+    status = data.get('status')
+    if status not in CLAIM_STATUSES:
+        return jsonify({'success': False, 'error': f"Status must be one of: {', '.join(CLAIM_STATUSES)}"}), 400
+    
+    user_email = (session.get('user', {}).get('email') or '').strip().lower()
+    try:
+        claim = claim_repository.get_claim(claim_id)
+        if not claim:
+            return jsonify({'success': False, 'error': 'Claim not found'}), 404
+        if employee_directory.canonical_email(user_email) not in dict(claim_approvers(claim)) and not is_admin_user():
+            return jsonify({'success': False, 'error': 'Only an approver of this claim can change its status'}), 403
+        
+        history_entry = {
+            'status': status,
+            'by': user_email,
+            'at': datetime.now().isoformat(),
+            'comment': data.get('comment', '')
+        }
+        claim = claim_repository.update_status(claim_id, status, history_entry)
+        if claim is None:
+            return jsonify({'success': False, 'error': 'Claim not found'}), 404
+        refresh_claim_views(claim, claim_id)
+        
+        # Keep the local mirror in step with the primary store
+        if firebase_service and claim.get('claim_id'):
+            try:
+                processor.repository.update_status(claim['claim_id'], status, history_entry)
+            except Exception as e:
+                logger.warning("Failed to update claim status in local store: %s", e)
+        
+        return jsonify({
+            'success': True,
+            'data': {'claim_id': claim_id, 'status': status, 'history_entry': history_entry}
+        })
+    except Exception as e:
+        logger.error("Error updating claim status: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/approvals/pending')
+@login_required
+def api_approvals_pending():
+    """The logged-in approver's inbox of claims awaiting a decision, one page at a time"""
+    approver_email = session.get('user', {}).get('email')
+    try:
+        entries, next_cursor = approval_inbox.query(
+            approver_email, limit=_claim_page_limit(), cursor=request.args.get('cursor') or None
+        )
+        return jsonify({
+            'success': True,
+            'data': entries,
+            'count': len(entries),
+            'next_cursor': next_cursor,
+            'counts': approval_inbox.counts(approver_email),
+            'source': approval_inbox.name
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Error getting approval inbox: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/team')
+@login_required
+def api_team():
+    """Employees reporting to the logged-in user, directly and through their reports"""
+    email = session.get('user', {}).get('email')
+    direct = {employee.email for employee in employee_directory.direct_reports(email)}
+    return jsonify({
+        'success': True,
+        'data': [
+            {
+                'employee_id': employee.employee_id,
+                'employee_name': employee.name,
+                'employee_email': employee.email,
+                'department': employee.department,
+                'team': employee.team,
+                'direct': employee.email in direct
+            }
+            for employee in employee_directory.all_reports(email)
+        ]
+    })
+
+@app.route('/local-storage/upload/<path:file_path>', methods=['PUT'])
+def local_storage_upload(file_path):
+    """Accept a signed direct upload, standing in for a bucket's signed URL offline"""
+    storage_backend = firebase_service.storage if firebase_service else None
+    if config.STORAGE_BACKEND != 'local' or not storage_backend:
+        return jsonify({'success': False, 'error': 'Local storage is not enabled'}), 404
+    
+    # Like the signed URL it replaces, the signature is the credential, not the session
+    content_type = request.args.get('content_type', '')
+    try:
+        max_bytes = storage_backend.verify_upload(
+            file_path,
+            content_type,
+            request.args.get('max_bytes'),
+            request.args.get('expires'),
+            request.args.get('signature')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 403
+    if (request.mimetype or '') != content_type.split(';')[0]:
+        return jsonify({'success': False, 'error': 'Content-Type does not match the upload URL'}), 403
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({'success': False, 'error': f'Upload exceeds {max_bytes} bytes'}), 413
+    
+    try:
+        size = storage_backend.write_stream(file_path, request.stream, max_bytes)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    return jsonify({'success': True, 'file_path': file_path, 'file_size': size})
+
+@app.route('/local-storage/<path:file_path>')
+@login_required
+def local_storage_file(file_path):
+    """Serve bill files kept by the local storage backend"""
+    if config.STORAGE_BACKEND != 'local':
+        return jsonify({'success': False, 'error': 'Local storage is not enabled'}), 404
+    # Only bill files, never anything else that ends up in the directory
+    if not posixpath.normpath(file_path).startswith(StorageBackend.BILL_PREFIX):
+        return jsonify({'success': False, 'error': 'File not found'}), 404
+    return send_from_directory(os.path.abspath(config.LOCAL_STORAGE_DIR), file_path)
+
+@app.route('/api/pipeline/stats')
+@login_required
+def api_pipeline_stats():
+    """API endpoint exposing per-stage bill processing timings"""
+    return jsonify({
+        'success': True,
+        'data': stage_stats.snapshot()
+    })
+
+@app.route('/api/ocr-cache/stats')
+@login_required
+def api_ocr_cache_stats():
+    """API endpoint exposing OCR cache hit/miss counters"""
+    return jsonify({
+        'success': True,
+        'data': ocr_cache.get_stats()
+    })
+
+@app.route('/api/ocr-client/stats')
+@login_required
+def api_ocr_client_stats():
+    """API endpoint exposing Gemini client retry counts and circuit breaker state"""
+    return jsonify({
+        'success': True,
+        'data': gemini_client.get_stats()
+    })
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (bearer token required when METRICS_TOKEN is set)"""
+    if config.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {config.METRICS_TOKEN}":
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiles')
+@admin_required
+def admin_profiles():
+    """List the request profiles kept in the on-disk ring, newest first"""
+    return jsonify({
+        'success': True,
+        'data': profile_store.list()
+    })
+
+@app.route('/admin/profiles/<profile_id>/<kind>')
+@admin_required
+def admin_profile_download(profile_id, kind):
+    """Download one profile as collapsed stacks, pstats or a text summary"""
+    profile = profile_store.get(profile_id)
+    if not profile or kind not in profile['files']:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    return send_from_directory(
+        os.path.abspath(profile_store.directory),
+        f"{profile_id}.{kind}",
+        as_attachment=kind == 'pstats',
+        mimetype='application/octet-stream' if kind == 'pstats' else 'text/plain'
+    )
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
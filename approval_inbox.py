@@ -0,0 +1,367 @@
+import json
+import os
+import sqlite3
+import threading
+
+from claim_repository import (
+    claim_department, claim_employee_email, claim_status, claim_submission_date, claim_total_amount,
+    decode_cursor, encode_cursor
+)
+from duplicate_index import claim_key
+
+# Claims in these states are waiting on an approver
+INBOX_STATUSES = ('pending', 'needs_review')
+
+
+def inbox_entry(claim, ref, level):
+    """Denormalized summary of a claim as shown in an approver's inbox"""
+    employee_details = claim.get('employee_details') or {}
+    form_details = claim.get('form_details') or {}
+    return {
+        'claim_id': ref,
+        'claim_number': claim_key(claim),
+        'employee_name': employee_details.get('employee_name') or employee_details.get('form_filled_by') or '',
+        'employee_email': claim_employee_email(claim),
+        'department': claim_department(claim),
+        'total_amount': claim_total_amount(claim),
+        'transaction_count': form_details.get('transaction_count') or len(claim.get('bills') or []),
+        'submission_date': claim_submission_date(claim) or '',
+        'status': claim_status(claim),
+        'level': level
+    }
+
+
+class ApprovalInbox:
+    """Per-approver index of claims awaiting a decision.
+
+    Maintained incrementally: `add_claim` (on submit and on every status
+    change) files a claim under each of its approvers while its status is in
+    INBOX_STATUSES and removes it otherwise; `remove_claim` drops it on
+    delete. `approvers_for(claim)` returns [(approver_email, level), ...]
+    with emails already in `approver_key` form, the key inboxes are read
+    by (the employee directory's canonical email, so every domain variant
+    of an approver's address opens the same inbox). Reading an inbox
+    touches only that approver's entries. Like the duplicate index, an
+    inbox can be a JsonLogClaimRepository listener.
+    """
+
+    name = 'base'
+
+    def __init__(self, approvers_for, approver_key=None):
+        self.approvers_for = approvers_for
+        self.approver_key = approver_key or _lower_email
+
+    def _key(self, approver_email):
+        return self.approver_key(approver_email) or ''
+
+    def _entries_for(self, claim, ref=None):
+        ref = ref or claim_key(claim)
+        if not ref or claim_status(claim) not in INBOX_STATUSES:
+            return ref, {}
+        return ref, {approver: inbox_entry(claim, ref, level) for approver, level in self.approvers_for(claim)}
+
+    def add_claim(self, claim, ref=None):
+        """Insert or refresh a claim's entries; ref is the id the claim store knows it by"""
+        raise NotImplementedError
+
+    def remove_claim(self, ref):
+        raise NotImplementedError
+
+    def query(self, approver_email, limit=25, cursor=None):
+        """Return (entries, next_cursor) of one inbox page, newest submission first"""
+        raise NotImplementedError
+
+    def counts(self, approver_email):
+        """Return {'total': n, 'by_status': {status: n}, 'total_amount': x} for one inbox"""
+        raise NotImplementedError
+
+    def build(self, claims):
+        """Rebuild every inbox from a full claim scan"""
+        raise NotImplementedError
+
+
+def _lower_email(email):
+    return (email or '').strip().lower()
+
+
+def _page(entries, limit, cursor):
+    """Keyset page over entries sorted newest first by (submission_date, claim_id)"""
+    position = decode_cursor(cursor)
+    if position:
+        after = (position.get('d') or '', position['id'])
+        entries = [entry for entry in entries if (entry['submission_date'], entry['claim_id']) < after]
+    page = entries[:limit]
+    next_cursor = None
+    if len(entries) > limit:
+        next_cursor = encode_cursor({'d': page[-1]['submission_date'], 'id': page[-1]['claim_id']})
+    return page, next_cursor
+
+
+def _summarize(entries):
+    by_status = {}
+    total_amount = 0.0
+    for entry in entries:
+        by_status[entry['status']] = by_status.get(entry['status'], 0) + 1
+        total_amount += entry['total_amount'] or 0
+    return {'total': sum(by_status.values()), 'by_status': by_status, 'total_amount': round(total_amount, 2)}
+
+
+class InMemoryApprovalInbox(ApprovalInbox):
+    """Process-local inboxes for the JSON and in-memory claim stores"""
+
+    name = 'memory'
+
+    def __init__(self, approvers_for, approver_key=None):
+        super().__init__(approvers_for, approver_key)
+        self._inboxes = {}
+        self._claim_approvers = {}
+        self._lock = threading.Lock()
+
+    def _remove_locked(self, ref):
+        for approver in self._claim_approvers.pop(ref, ()):
+            inbox = self._inboxes.get(approver)
+            if inbox is not None:
+                inbox.pop(ref, None)
+                if not inbox:
+                    del self._inboxes[approver]
+
+    def add_claim(self, claim, ref=None):
+        ref, entries = self._entries_for(claim, ref)
+        if not ref:
+            return
+        with self._lock:
+            self._remove_locked(ref)
+            for approver, entry in entries.items():
+                self._inboxes.setdefault(approver, {})[ref] = entry
+            if entries:
+                self._claim_approvers[ref] = set(entries)
+
+    def remove_claim(self, ref):
+        with self._lock:
+            self._remove_locked(ref)
+
+    def _sorted(self, approver_email):
+        with self._lock:
+            entries = list(self._inboxes.get(self._key(approver_email), {}).values())
+        entries.sort(key=lambda entry: (entry['submission_date'], entry['claim_id']), reverse=True)
+        return entries
+
+    def query(self, approver_email, limit=25, cursor=None):
+        return _page(self._sorted(approver_email), limit, cursor)
+
+    def counts(self, approver_email):
+        return _summarize(self._sorted(approver_email))
+
+    def build(self, claims):
+        with self._lock:
+            self._inboxes = {}
+            self._claim_approvers = {}
+        for claim in claims:
+            self.add_claim(claim)
+
+
+class SQLiteApprovalInbox(ApprovalInbox):
+    """Inbox table next to the SQLite claim store, keyed by (approver_email, claim_ref)"""
+
+    name = 'sqlite'
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS approval_inbox (
+            approver_email TEXT NOT NULL,
+            claim_ref TEXT NOT NULL,
+            status TEXT,
+            submission_date TEXT,
+            total_amount REAL,
+            entry TEXT NOT NULL,
+            PRIMARY KEY (approver_email, claim_ref)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_inbox_approver_date ON approval_inbox (approver_email, submission_date, claim_ref)",
+        "CREATE INDEX IF NOT EXISTS idx_inbox_claim_ref ON approval_inbox (claim_ref)"
+    ]
+
+    def __init__(self, db_path, approvers_for, approver_key=None):
+        super().__init__(approvers_for, approver_key)
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, conn, ref, entries):
+        conn.execute("DELETE FROM approval_inbox WHERE claim_ref = ?", (ref,))
+        conn.executemany(
+            "INSERT INTO approval_inbox (approver_email, claim_ref, status, submission_date, total_amount, entry) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (approver, ref, entry['status'], entry['submission_date'], entry['total_amount'], json.dumps(entry))
+                for approver, entry in entries.items()
+            ]
+        )
+
+    def add_claim(self, claim, ref=None):
+        ref, entries = self._entries_for(claim, ref)
+        if not ref:
+            return
+        with self._connection() as conn:
+            self._write(conn, ref, entries)
+
+    def remove_claim(self, ref):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM approval_inbox WHERE claim_ref = ?", (ref,))
+
+    def query(self, approver_email, limit=25, cursor=None):
+        position = decode_cursor(cursor)
+        params = [self._key(approver_email)]
+        keyset = ''
+        if position:
+            keyset = "AND (submission_date < ? OR (submission_date = ? AND claim_ref < ?))"
+            params.extend([position.get('d') or '', position.get('d') or '', position['id']])
+        rows = self._connection().execute(
+            f"SELECT entry FROM approval_inbox WHERE approver_email = ? {keyset} "
+            "ORDER BY submission_date DESC, claim_ref DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        entries = [json.loads(row[0]) for row in rows]
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor({'d': entries[-1]['submission_date'], 'id': entries[-1]['claim_id']})
+        return entries, next_cursor
+
+    def counts(self, approver_email):
+        rows = self._connection().execute(
+            "SELECT status, COUNT(*), COALESCE(SUM(total_amount), 0) FROM approval_inbox "
+            "WHERE approver_email = ? GROUP BY status",
+            (self._key(approver_email),)
+        ).fetchall()
+        by_status = {status: count for status, count, _amount in rows}
+        return {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'total_amount': round(sum(amount for _status, _count, amount in rows), 2)
+        }
+
+    def build(self, claims):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM approval_inbox")
+            for claim in claims:
+                ref, entries = self._entries_for(claim)
+                if ref and entries:
+                    self._write(conn, ref, entries)
+
+
+class FirestoreApprovalInbox(ApprovalInbox):
+    """Denormalized inbox documents: approval_inbox/{approver}/claims/{claim_ref}.
+
+    A per-claim document in approval_inbox_claims lists the approvers a
+    claim is filed under, so updates and deletes are keyed reads too.
+    """
+
+    name = 'firebase'
+    COLLECTION = 'approval_inbox'
+    CLAIMS_COLLECTION = 'approval_inbox_claims'
+
+    def __init__(self, db, approvers_for, approver_key=None):
+        super().__init__(approvers_for, approver_key)
+        self.db = db
+
+    def _inbox(self, approver_email):
+        return self.db.collection(self.COLLECTION).document(approver_email).collection('claims')
+
+    def _replace(self, ref, entries):
+        membership_ref = self.db.collection(self.CLAIMS_COLLECTION).document(ref)
+        membership = membership_ref.get()
+        previous = (membership.to_dict() or {}).get('approvers', []) if membership.exists else []
+
+        batch = self.db.batch()
+        for approver in previous:
+            if approver not in entries:
+                batch.delete(self._inbox(approver).document(ref))
+        for approver, entry in entries.items():
+            batch.set(self._inbox(approver).document(ref), entry)
+        if entries:
+            batch.set(membership_ref, {'approvers': sorted(entries)})
+        elif membership.exists:
+            batch.delete(membership_ref)
+        batch.commit()
+
+    def add_claim(self, claim, ref=None):
+        ref, entries = self._entries_for(claim, ref)
+        if ref:
+            self._replace(ref, entries)
+
+    def remove_claim(self, ref):
+        self._replace(ref, {})
+
+    def query(self, approver_email, limit=25, cursor=None):
+        from firebase_admin import firestore
+
+        position = decode_cursor(cursor)
+        query = self._inbox(self._key(approver_email)).order_by(
+            'submission_date', direction=firestore.Query.DESCENDING
+        ).order_by('claim_id', direction=firestore.Query.DESCENDING)
+        if position:
+            query = query.start_after({'submission_date': position.get('d') or '', 'claim_id': position['id']})
+        entries = [doc.to_dict() for doc in query.limit(limit + 1).stream()]
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor({'d': entries[-1]['submission_date'], 'id': entries[-1]['claim_id']})
+        return entries, next_cursor
+
+    def counts(self, approver_email):
+        inbox = self._inbox(self._key(approver_email))
+        by_status = {}
+        for status in INBOX_STATUSES:
+            count = inbox.where('status', '==', status).count().get()[0][0].value
+            if count:
+                by_status[status] = count
+        total_amount = inbox.sum('total_amount').get()[0][0].value if by_status else 0
+        return {'total': sum(by_status.values()), 'by_status': by_status, 'total_amount': round(total_amount or 0, 2)}
+
+    def build(self, claims):
+        # Entries of deleted claims or changed reporting lines would otherwise survive a rebuild
+        self._reset()
+        # Claims read back from Firestore carry their document id, which is what the API addresses
+        for claim in claims:
+            self.add_claim(claim, claim.get('id'))
+
+    def _reset(self):
+        batch, pending = self.db.batch(), 0
+        # Inbox parents are never written themselves, so list_documents (not stream) finds them
+        inboxes = [inbox.collection('claims') for inbox in self.db.collection(self.COLLECTION).list_documents()]
+        for collection in inboxes + [self.db.collection(self.CLAIMS_COLLECTION)]:
+            for doc in collection.stream():
+                batch.delete(doc.reference)
+                pending += 1
+                if pending == 400:
+                    batch.commit()
+                    batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+
+
+def create_approval_inbox(repository, approvers_for, approver_key=None):
+    """Inbox stored alongside the given claim repository"""
+    if repository.name == 'firebase':
+        return FirestoreApprovalInbox(repository.db, approvers_for, approver_key)
+    if repository.name == 'sqlite':
+        return SQLiteApprovalInbox(repository.db_path, approvers_for, approver_key)
+    inbox = InMemoryApprovalInbox(approvers_for, approver_key)
+    inbox.build(repository.iter_claims())
+    # Claims written by other workers reach the JSON store's in-memory mirror through its listeners
+    if hasattr(repository, 'listeners'):
+        repository.listeners.append(inbox)
+    return inbox
@@ -0,0 +1,291 @@
+import copy
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from duplicate_index import claim_key
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade_claim(claim):
+    """Return a copy of the claim in the `transactions` schema written by submit_claim.
+
+    Legacy claims from validate_and_process_claim (`bills`, `overall_status`,
+    `timestamp`) are converted: each bill becomes a transaction whose
+    `extracted_details` hold the OCR fields, and the claim-level form fields
+    move to `form_details`/`status`. Claims already in the current schema
+    are returned unchanged.
+    """
+    claim = copy.deepcopy(claim)
+    if 'bills' not in claim or 'transactions' in claim:
+        return claim
+
+    legacy_employee = claim.get('employee_details') or {}
+    claim_details = claim.get('claim_details') or {}
+    bills = claim.get('bills') or []
+    submitted = claim.get('timestamp') or ''
+
+    transactions = []
+    for bill in bills:
+        transaction = {
+            'bill_date': bill.get('bill_date', ''),
+            'bill_number': bill.get('bill_number', ''),
+            'transaction_category': bill.get('transaction_category', ''),
+            'purpose': bill.get('purpose', ''),
+            'amount': float(bill.get('amount') or 0),
+            'product': bill.get('product', ''),
+            'cluster': claim_details.get('cluster') or bill.get('cluster_location') or '',
+            'remarks': bill.get('comments') or claim_details.get('remarks', ''),
+            'extracted_details': {
+                key: bill.get(key)
+                for key in ('bill_number', 'bill_date', 'vendor_name', 'transaction_category', 'purpose',
+                            'amount', 'currency', 'product', 'cluster_location')
+            },
+            'duplicate_detected': bool(bill.get('duplicate_detected')),
+            'possible_duplicate': bool(bill.get('possible_duplicate'))
+        }
+        for key in ('needs_review', 'change_flag', 'approval_status', 'rejection_reason', 'bill_type'):
+            if key in bill:
+                transaction[key] = bill[key]
+        transactions.append(transaction)
+
+    return {
+        'claim_id': claim_key(claim),
+        'employee_details': {
+            'employee_name': legacy_employee.get('form_filled_by', ''),
+            'employee_email': legacy_employee.get('employee_email', ''),
+            'employee_id': legacy_employee.get('employee_id', ''),
+            'department': legacy_employee.get('department', ''),
+            'team': legacy_employee.get('team', ''),
+            'hod_name': legacy_employee.get('hod', ''),
+            'hod_email': legacy_employee.get('hod_email', ''),
+            'phone': legacy_employee.get('phone', ''),
+            'submitted_by_uid': ''
+        },
+        'form_details': {
+            'cc_emails': legacy_employee.get('cc_emails', []),
+            'additional_cc': legacy_employee.get('additional_cc', []),
+            'payment_mode': legacy_employee.get('mode_of_payment', 'Bank Transfer'),
+            'total_amount': sum(transaction['amount'] for transaction in transactions),
+            'transaction_count': len(transactions),
+            'currency': (bills[0].get('currency') if bills else None) or 'INR'
+        },
+        'claim_details': claim_details,
+        'transactions': transactions,
+        'status': {
+            'current_status': claim.get('overall_status', 'pending'),
+            'submission_date': submitted,
+            'last_updated': submitted,
+            'approval_history': claim.get('approval_history', [])
+        },
+        'metadata': {
+            'submitted_by': legacy_employee.get('employee_email') or 'Unknown',
+            'submitted_from': 'legacy_import',
+            'upgraded_from': 'bills'
+        }
+    }
+
+
+class Checkpoint:
+    """Progress of a resumable job, rewritten atomically after every batch.
+
+    `position` is the number of source records fully handled, so a rerun
+    with the same checkpoint file skips them. A checkpoint written for a
+    different job is refused rather than silently reused.
+    """
+
+    def __init__(self, path, job):
+        self.path = path
+        self.job = job
+        self.state = {'job': job, 'run_id': uuid.uuid4().hex[:12], 'position': 0, 'stats': {}, 'failed': []}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('job') != job:
+                raise ValueError(f"Checkpoint {path} belongs to another job: {state.get('job')}")
+            self.state = state
+            self.resumed = True
+        else:
+            self.resumed = False
+
+    @property
+    def position(self):
+        return self.state['position']
+
+    @property
+    def run_id(self):
+        return self.state['run_id']
+
+    @property
+    def stats(self):
+        return self.state['stats']
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class BatchRunner:
+    """Run `handler(items)` over consecutive batches with bounded parallelism.
+
+    At most `workers` batches are in flight. Batches may finish out of
+    order; the checkpoint position only advances past a batch once every
+    earlier batch has finished, so a crash never skips unprocessed records.
+    `handler` returns a dict of counters that are summed into the
+    checkpoint stats; a batch that raises is recorded under `failed`.
+    """
+
+    def __init__(self, handler, checkpoint, workers=4, batch_size=400, report_every=10.0, report=print):
+        self.handler = handler
+        self.checkpoint = checkpoint
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.report_every = report_every
+        self.report = report
+        self._finished = {}
+        self._started = time.monotonic()
+        self._last_report = self._started
+
+    def _batches(self, records):
+        resume_from = self.checkpoint.position
+        batch, start = [], resume_from
+        for position, record in enumerate(records):
+            if position < resume_from:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                yield start, position + 1, batch
+                batch, start = [], position + 1
+        if batch:
+            yield start, start + len(batch), batch
+
+    def _complete(self, start, end, counters, error=None):
+        stats = self.checkpoint.stats
+        for key, value in counters.items():
+            stats[key] = stats.get(key, 0) + value
+        if error is not None:
+            self.checkpoint.state['failed'].append({'start': start, 'end': end, 'error': str(error)})
+            stats['failed_batches'] = stats.get('failed_batches', 0) + 1
+            logger.error("Batch %d-%d failed: %s", start, end, error)
+        self._finished[start] = end
+        while self.checkpoint.position in self._finished:
+            self.checkpoint.state['position'] = self._finished.pop(self.checkpoint.position)
+        self.checkpoint.save()
+
+        now = time.monotonic()
+        if now - self._last_report >= self.report_every:
+            self._last_report = now
+            self.report(self.progress())
+
+    def progress(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        stats = self.checkpoint.stats
+        rates = ', '.join(
+            f"{key} {value} ({value / elapsed:.1f}/s)" for key, value in sorted(stats.items())
+        )
+        return f"[{elapsed:.0f}s] position {self.checkpoint.position}: {rates}"
+
+    def run(self, records):
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill-worker') as executor:
+            for start, end, batch in self._batches(records):
+                if len(in_flight) >= self.workers:
+                    self._drain(in_flight, FIRST_COMPLETED)
+                in_flight[executor.submit(self.handler, batch)] = (start, end)
+            self._drain(in_flight, ALL_COMPLETED)
+        stats = dict(self.checkpoint.stats)
+        stats['elapsed_seconds'] = round(time.monotonic() - self._started, 2)
+        return stats
+
+    def _drain(self, in_flight, return_when):
+        done, _pending = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            start, end = in_flight.pop(future)
+            try:
+                self._complete(start, end, future.result() or {})
+            except Exception as e:
+                self._complete(start, end, {}, e)
+
+
+def backfill_claims(claims, repository, checkpoint, workers=4, batch_size=400, dry_run=False, report=print):
+    """Upgrade claims to the current schema and bulk-write them to `repository`"""
+    def handle(batch):
+        upgraded = [upgrade_claim(claim) for claim in batch]
+        valid = [claim for claim in upgraded if claim_key(claim)]
+        if not dry_run:
+            repository.add_claims(valid)
+        return {
+            'claims': len(valid),
+            'upgraded': sum(1 for claim in batch if 'bills' in claim and 'transactions' not in claim),
+            'skipped': len(batch) - len(valid)
+        }
+
+    return BatchRunner(handle, checkpoint, workers, batch_size, report=report).run(claims)
+
+
+def reextract_claims(claims, repository, storage, extract_batch, checkpoint, workers=4, batch_size=20,
+                     dry_run=False, report=print, on_written=None):
+    """Re-run OCR over stored bill files and write the new extracted_details back.
+
+    `claims` is a stream from the claim store, whose order may change while
+    the job runs, so progress is tracked per claim instead of by position:
+    each rewritten claim is stamped with the run id in
+    metadata.ocr_reextract_run, and a resumed run skips stamped claims.
+    `extract_batch` is ReimbursementProcessor.extract_bills_batch; a bill
+    whose re-extraction fails (confidence 0) keeps its previous details.
+    `on_written(claims)` is called after each batch is written so derived
+    views (inbox, rollups, duplicate and vendor indexes) can be refreshed.
+    """
+    run_id = checkpoint.run_id
+
+    def handle(batch):
+        counters = {'claims': 0, 'bills': 0, 'bill_errors': 0, 'skipped': 0}
+        files, targets, updated = [], [], []
+        for claim in batch:
+            if (claim.get('metadata') or {}).get('ocr_reextract_run') == run_id:
+                counters['skipped'] += 1
+                continue
+            # In-memory stores hand out their own dicts; never edit those in place
+            claim = copy.deepcopy(claim)
+            updated.append(claim)
+            for transaction in claim.get('transactions') or []:
+                file_path = transaction.get('bill_file_path')
+                if not file_path:
+                    continue
+                try:
+                    files.append((storage.download(file_path), transaction.get('bill_file_name') or file_path))
+                    targets.append(transaction)
+                except Exception as e:
+                    counters['bill_errors'] += 1
+                    logger.warning("Could not read bill %s: %s", file_path, e)
+
+        for transaction, extracted in zip(targets, extract_batch(files) if files else []):
+            counters['bills'] += 1
+            if not extracted or not extracted.get('confidence_score'):
+                counters['bill_errors'] += 1
+                continue
+            transaction['extracted_details'] = extracted
+
+        for claim in updated:
+            metadata = claim.setdefault('metadata', {})
+            metadata['ocr_reextract_run'] = run_id
+            metadata['ocr_reextracted_at'] = datetime.now().isoformat()
+        if updated and not dry_run:
+            repository.add_claims(updated)
+            if on_written:
+                on_written(updated)
+        counters['claims'] = len(updated)
+        return counters
+
+    # Positions are meaningless across runs here; the per-claim stamp does the resuming
+    checkpoint.state['position'] = 0
+    return BatchRunner(handle, checkpoint, workers, batch_size, report=report).run(claims)
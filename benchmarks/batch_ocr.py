@@ -0,0 +1,108 @@
+"""Compare per-bill vs batched Gemini extraction for a set of bill images.
+
+Usage:
+    python benchmarks/batch_ocr.py bills/*.jpg --batch-size 4 --rounds 3
+
+Both modes bypass the OCR cache and make real Gemini calls (GEMINI_API_KEY
+must be set). For every round it reports wall-clock latency, the number of
+Gemini requests, and input/output tokens as counted by `model.count_tokens`.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as reimburse_app  # noqa: E402
+
+
+class CallRecorder:
+    """Wraps model.generate_content to count requests and tokens"""
+
+    def __init__(self, model):
+        self.model = model
+        self.generate_content = model.generate_content
+        self.calls = []
+
+    def __enter__(self):
+        self.model.generate_content = self._generate_content
+        return self
+
+    def __exit__(self, *exc):
+        self.model.generate_content = self.generate_content
+        return False
+
+    def _generate_content(self, contents, **kwargs):
+        response = self.generate_content(contents, **kwargs)
+        self.calls.append((contents, response.text))
+        return response
+
+    def tokens(self):
+        input_tokens = output_tokens = 0
+        for contents, text in self.calls:
+            input_tokens += self.model.count_tokens(contents).total_tokens
+            output_tokens += self.model.count_tokens(text).total_tokens
+        return input_tokens, output_tokens
+
+
+def run_per_bill(processor, files):
+    return [processor._extract_bill_details_uncached(data, name) for data, name in files]
+
+
+def run_batched(processor, files, batch_size):
+    results = []
+    for start in range(0, len(files), batch_size):
+        chunk = files[start:start + batch_size]
+        payloads = [processor._preprocess_image(data) for data, _name in chunk]
+        extracted = processor._extract_batch_chunk(payloads) if len(payloads) > 1 else {}
+        for offset, (data, name) in enumerate(chunk):
+            results.append(extracted.get(offset) or processor._extract_bill_details_uncached(data, name))
+    return results
+
+
+def measure(label, func, rounds):
+    latencies, requests, tokens_in, tokens_out = [], [], [], []
+    results = None
+    for _ in range(rounds):
+        with CallRecorder(reimburse_app.model) as recorder:
+            start = time.perf_counter()
+            results = func()
+            latencies.append(time.perf_counter() - start)
+        input_tokens, output_tokens = recorder.tokens()
+        requests.append(len(recorder.calls))
+        tokens_in.append(input_tokens)
+        tokens_out.append(output_tokens)
+
+    print(f"{label:>9}: latency median {statistics.median(latencies) * 1000:8.1f} ms"
+          f" | requests {statistics.mean(requests):5.1f}"
+          f" | input tokens {statistics.mean(tokens_in):8.0f}"
+          f" | output tokens {statistics.mean(tokens_out):6.0f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('images', nargs='+', help='bill image files')
+    parser.add_argument('--batch-size', type=int, default=reimburse_app.config.OCR_BATCH_SIZE)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    files = []
+    for path in args.images:
+        with open(path, 'rb') as f:
+            files.append((f.read(), os.path.basename(path)))
+
+    processor = reimburse_app.processor
+    print(f"{len(files)} bills, batch size {args.batch_size}, {args.rounds} rounds")
+    single = measure('per-bill', lambda: run_per_bill(processor, files), args.rounds)
+    batched = measure('batched', lambda: run_batched(processor, files, args.batch_size), args.rounds)
+
+    fields = ('bill_number', 'bill_date', 'vendor_name', 'amount')
+    agree = sum(all(a.get(k) == b.get(k) for k in fields) for a, b in zip(single, batched))
+    print(f"Batched results matching per-bill on {', '.join(fields)}: {agree}/{len(files)}")
+
+
+if __name__ == '__main__':
+    main()
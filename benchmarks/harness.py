@@ -0,0 +1,78 @@
+"""Shared setup for running the real app offline in benchmarks."""
+import contextlib
+import io
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def load_offline_app(workdir, ocr_latency_ms=800, ocr_latency_sigma=0.5, ocr_error_rate=0.0,
+                     storage_latency_ms=50, claim_store='sqlite', seed=0):
+    """Import app.py configured with the fake OCR backend and local storage under workdir.
+
+    Must be called before anything else imports app. The app keeps
+    claims_data.json and uploads/ relative to the working directory, so
+    this also changes into workdir. App logging below ERROR is silenced
+    unless BENCH_LOG_LEVEL is set.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    os.environ.update({
+        'OCR_BACKEND': 'fake',
+        'STORAGE_BACKEND': 'local',
+        'LOCAL_STORAGE_DIR': os.path.join(workdir, 'storage'),
+        'LOCAL_CLAIM_STORE_DIR': os.path.join(workdir, 'local_claims'),
+        'LOCAL_STORAGE_LATENCY_MS': str(storage_latency_ms),
+        'OCR_CACHE_DIR': os.path.join(workdir, 'ocr_cache'),
+        'CLAIM_STORE_BACKEND': claim_store,
+        'CLAIM_STORE_SQLITE_PATH': os.path.join(workdir, 'claims.db'),
+        'FAKE_OCR_LATENCY_MS': str(ocr_latency_ms),
+        'FAKE_OCR_LATENCY_SIGMA': str(ocr_latency_sigma),
+        'FAKE_OCR_ERROR_RATE': str(ocr_error_rate),
+        'FAKE_OCR_SEED': str(seed),
+        'GEMINI_RATE_PER_MINUTE': '1000000',
+        'GEMINI_RATE_BURST': '1000000',
+        'LOG_LEVEL': os.environ.get('BENCH_LOG_LEVEL', 'ERROR')
+    })
+    os.chdir(workdir)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    return app
+
+
+def logged_in_client(app_module, email='bench@example.com', employee_details=None):
+    """Flask test client with a user session (test clients are not thread-safe; use one per thread)"""
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'uid': email, 'email': email, 'name': email.split('@')[0]}
+        session['employee_details'] = employee_details
+    return client
+
+
+def submit_form(bill_pool, transactions, department='Engineering'):
+    """Multipart form for /submit-claim with synthetic bills"""
+    form = {'transaction_count': str(transactions), 'employee_name': 'Bench User', 'department': department}
+    for i in range(transactions):
+        data, filename, content_type = bill_pool.next_bill()
+        form[f'transaction_{i}_amount'] = '100'
+        form[f'transaction_{i}_bill_date'] = '2025-01-15'
+        form[f'transaction_{i}_bill'] = (io.BytesIO(data), filename, content_type)
+    return form
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stray stdout output while a benchmark runs"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def percentiles(values, fractions=(0.50, 0.95, 0.99)):
+    """Nearest-rank percentiles of an unsorted list of numbers"""
+    from stage_stats import StageStats
+
+    values = sorted(values)
+    return tuple(StageStats.percentile(values, fraction) for fraction in fractions)
@@ -0,0 +1,143 @@
+"""Report how much PDF traffic the text-layer fast path absorbs, and how accurately.
+
+Usage:
+    python benchmarks/pdf_fast_path.py --bills 500 --scanned-ratio 0.3
+    python benchmarks/pdf_fast_path.py invoices/*.pdf [--gemini]
+
+With no files, a synthetic mix of born-digital invoices (Swiggy, Uber,
+airline, Amazon, hotel, cafe, supermarket and payment receipt layouts with
+known fields, including totals followed by a tax rate, an item count or a
+date), scanned PDFs and itemised statements is generated and the fast path is scored against the
+ground truth. With files, a `<name>.json` next to a PDF holding any of
+amount/bill_date/vendor_name/bill_number/currency is used as its ground
+truth; `--gemini` instead scores against the live Gemini extraction
+(GEMINI_API_KEY must be set). Uses the PDF_TEXT_* settings from config.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from harness import percentiles  # noqa: E402
+from pdf_text import compare_extractions, extract_bill_from_pdf  # noqa: E402
+from synthetic import make_digital_invoice_pdf, make_invoice_pdf, make_scanned_pdf  # noqa: E402
+
+FIELDS = ('amount', 'bill_date', 'vendor_name', 'bill_number', 'currency')
+
+
+def synthetic_bills(count, scanned_ratio, itemised_ratio, rng):
+    """(name, pdf bytes, truth or None) for a mix of digital, scanned and itemised PDFs"""
+    for n in range(count):
+        roll = rng.random()
+        if roll < scanned_ratio:
+            yield f'scanned_{n}.pdf', make_scanned_pdf(rng), None
+        elif roll < scanned_ratio + itemised_ratio:
+            yield f'itemised_{n}.pdf', make_invoice_pdf(rng, pages=rng.randint(1, 3)), None
+        else:
+            data, truth = make_digital_invoice_pdf(rng)
+            yield f'digital_{n}.pdf', data, truth
+
+
+def file_bills(paths, use_gemini):
+    reference = None
+    if use_gemini:
+        import app as reimburse_app
+
+        def reference(data, name):
+            return reimburse_app.processor._extract_bill_details_uncached(data, name, text_layer=False)
+
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        truth = None
+        truth_path = os.path.splitext(path)[0] + '.json'
+        if reference is not None:
+            truth = reference(data, os.path.basename(path))
+        elif os.path.exists(truth_path):
+            with open(truth_path, 'r', encoding='utf-8') as f:
+                truth = json.load(f)
+        yield os.path.basename(path), data, truth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='*', help='PDFs to score (default: a synthetic mix)')
+    parser.add_argument('--bills', type=int, default=500, help='synthetic PDFs to generate')
+    parser.add_argument('--scanned-ratio', type=float, default=0.3, help='fraction of synthetic PDFs without text')
+    parser.add_argument('--itemised-ratio', type=float, default=0.1,
+                        help='fraction of synthetic PDFs with text but no bill fields')
+    parser.add_argument('--gemini', action='store_true', help='score files against live Gemini extractions')
+    parser.add_argument('--min-confidence', type=int, default=config.PDF_TEXT_MIN_CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help='print every mismatched field')
+    args = parser.parse_args()
+
+    if args.files:
+        bills = file_bills(args.files, args.gemini)
+    else:
+        bills = synthetic_bills(args.bills, args.scanned_ratio, args.itemised_ratio, random.Random(args.seed))
+
+    outcomes = {}
+    timings = []
+    scored = 0
+    required_right = 0
+    matches = {field: 0 for field in FIELDS}
+    compared = {field: 0 for field in FIELDS}
+    total = 0
+    for name, data, truth in bills:
+        total += 1
+        start = time.perf_counter()
+        try:
+            outcome, result, _timings = extract_bill_from_pdf(
+                data,
+                max_pages=config.PDF_MAX_PAGES,
+                min_chars=config.PDF_TEXT_MIN_CHARS,
+                min_confidence=args.min_confidence
+            )
+        except Exception as e:
+            outcome, result = 'error', None
+            print(f"{name}: {e}", file=sys.stderr)
+        timings.append((time.perf_counter() - start) * 1000)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        if outcome != 'absorbed' or not truth:
+            continue
+        scored += 1
+        comparison = compare_extractions(result, truth)
+        required_right += all(comparison[field] for field in ('amount', 'bill_date', 'vendor_name') if field in truth)
+        for field, matched in comparison.items():
+            # Ground truth files may leave fields out; only score what they state
+            if field not in truth:
+                continue
+            compared[field] += 1
+            matches[field] += matched
+            if not matched and args.verbose:
+                print(f"{name}: {field} {result.get(field)!r} != {truth.get(field)!r}")
+
+    if not total:
+        print("No PDFs to score")
+        return
+
+    absorbed = outcomes.get('absorbed', 0)
+    print(f"PDFs: {total}   min confidence: {args.min_confidence}")
+    print(f"Absorbed by the fast path: {absorbed} ({absorbed / total:.1%})")
+    for outcome, count in sorted(outcomes.items()):
+        if outcome != 'absorbed':
+            print(f"  fell through ({outcome}): {count} ({count / total:.1%})")
+    p50, p95, p99 = percentiles(timings)
+    print(f"Fast path time per PDF: p50 {p50:.1f}ms  p95 {p95:.1f}ms  p99 {p99:.1f}ms")
+    if scored:
+        print(f"Accuracy over {scored} absorbed PDFs with ground truth:")
+        for field in FIELDS:
+            if compared[field]:
+                print(f"  {field:<12} {matches[field] / compared[field]:.1%} ({matches[field]}/{compared[field]})")
+        print(f"  amount, date and vendor all right: {required_right / scored:.1%} ({required_right}/{scored})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Offline end-to-end benchmark of /process-bill and /submit-claim.
+
+Usage:
+    python benchmarks/pipeline.py --requests 200 --concurrency 8 --transactions 3
+
+Runs the real Flask app (through its test client) with the fake OCR
+backend and local storage, so no network, Gemini quota or Firebase
+credentials are needed. Every bill goes through the full pipeline
+(rasterize, preprocess, OCR, store, persist). Reports p50/p95/p99 per
+endpoint and per pipeline stage.
+
+Everything is written to a temporary working directory that is removed
+afterwards (use --workdir to keep it).
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import REPO_ROOT, load_offline_app, logged_in_client, percentiles, quiet, submit_form
+from synthetic import BillPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100, help='claims submitted (each also runs one /process-bill)')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--transactions', type=int, default=3, help='bills per claim')
+    parser.add_argument('--pdf-ratio', type=float, default=0.2, help='fraction of bills that are PDFs')
+    parser.add_argument('--ocr-latency-ms', type=float, default=800)
+    parser.add_argument('--ocr-latency-sigma', type=float, default=0.5)
+    parser.add_argument('--ocr-error-rate', type=float, default=0.0)
+    parser.add_argument('--storage-latency-ms', type=float, default=50)
+    parser.add_argument('--claim-store', default='sqlite', choices=['json', 'sqlite', 'memory'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='keep all files in this directory instead of a temporary one')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='reimburse-bench-')
+    reimburse_app = load_offline_app(
+        workdir,
+        ocr_latency_ms=args.ocr_latency_ms,
+        ocr_latency_sigma=args.ocr_latency_sigma,
+        ocr_error_rate=args.ocr_error_rate,
+        storage_latency_ms=args.storage_latency_ms,
+        claim_store=args.claim_store,
+        seed=args.seed
+    )
+
+    print("Generating synthetic bills...")
+    bills = BillPool(random.Random(args.seed), pdf_ratio=args.pdf_ratio)
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = logged_in_client(reimburse_app)
+        return local.client
+
+    latencies = {'process_bill': [], 'submit_claim': []}
+    errors = {'process_bill': 0, 'submit_claim': 0}
+    latency_lock = threading.Lock()
+
+    def timed(name, func):
+        start = time.perf_counter()
+        response = func()
+        elapsed = time.perf_counter() - start
+        with latency_lock:
+            latencies[name].append(elapsed)
+            if response.status_code != 200:
+                errors[name] += 1
+
+    def one_iteration(_n):
+        data, filename, content_type = bills.next_bill()
+        timed('process_bill', lambda: client().post(
+            '/process-bill',
+            data={'bill_image': (io.BytesIO(data), filename, content_type)},
+            content_type='multipart/form-data'
+        ))
+        form = submit_form(bills, args.transactions)
+        timed('submit_claim', lambda: client().post('/submit-claim', data=form, content_type='multipart/form-data'))
+
+    reimburse_app.stage_stats.reset()
+    print(f"Running {args.requests} iterations with {args.concurrency} clients...")
+    start = time.perf_counter()
+    with quiet():
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            list(pool.map(one_iteration, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    print(f"\nWall time {wall:.1f}s, {args.requests / wall:.2f} claims/s")
+    print(f"{'endpoint / stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, values in latencies.items():
+        p50, p95, p99 = percentiles(values)
+        print(f"{name:<22}{len(values):>7}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{p99 * 1000:>10.1f}"
+              f"{statistics.mean(values) * 1000:>10.1f}  ({errors[name]} errors)")
+    snapshot = reimburse_app.stage_stats.snapshot()
+    for stage, entry in sorted(snapshot['stages'].items()):
+        print(f"  {stage:<20}{entry['count']:>7}{entry['p50_ms']:>10.1f}{entry['p95_ms']:>10.1f}"
+              f"{entry['p99_ms']:>10.1f}{entry['avg_ms']:>10.1f}")
+    print(f"Counters: {snapshot['counters']}")
+    print(f"OCR client: {reimburse_app.gemini_client.get_stats()}")
+
+    os.chdir(REPO_ROOT)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
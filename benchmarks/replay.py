@@ -0,0 +1,199 @@
+"""Replay a captured request trace against the app running offline.
+
+Usage:
+    TRACE_CAPTURE_PATH=traces/requests.jsonl python app.py      # capture real traffic
+    python benchmarks/replay.py traces/requests.jsonl --speed 2 --seed-transactions 100000
+
+Requests are issued open-loop at their recorded arrival times (scaled by
+--speed, or back to back with --speed 0), so production burst shapes are
+reproduced. Uploads are replaced by synthetic bills of the same type, each
+traced user is mapped to an employee from the directory, and ids in
+claim/job URLs are swapped for ids that exist in the replay. The fake OCR
+backend and local storage are used, as in benchmarks/pipeline.py.
+"""
+import argparse
+import hashlib
+import io
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import REPO_ROOT, load_offline_app, logged_in_client, percentiles, quiet
+from synthetic import BillPool
+from workload import ClaimGenerator, load_employees
+
+TRANSACTION_FIELD = re.compile(r'^transaction_(\d+)_bill$')
+
+
+class Replayer:
+    def __init__(self, app_module, employees, bills, rng):
+        self.app_module = app_module
+        self.employees = employees
+        self.bills = bills
+        self.rng = rng
+        self._local = threading.local()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.results = defaultdict(list)
+
+    def employee_for(self, user_hash):
+        if not user_hash:
+            return None
+        index = int(hashlib.sha256(user_hash.encode('utf-8')).hexdigest()[:8], 16) % len(self.employees)
+        return self.employees[index]
+
+    def client_for(self, email):
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        if email not in clients:
+            clients[email] = logged_in_client(self.app_module, email)
+        return clients[email]
+
+    def _path(self, record, email):
+        path = record['path']
+        endpoint = record.get('endpoint')
+        if endpoint in ('api_claim_detail', 'api_delete_claim'):
+            claims, _cursor = self.app_module.claim_repository.query_claims(user_email=email, limit=20)
+            if claims:
+                claim = self.rng.choice(claims)
+                path = f"/api/claims/{claim.get('claim_id') or claim.get('id')}"
+        elif endpoint in ('api_ocr_job_status', 'api_ocr_job_stream'):
+            with self._lock:
+                job_id = self._jobs.get(email)
+            if job_id:
+                path = f"/api/ocr-jobs/{job_id}" + ('/stream' if endpoint == 'api_ocr_job_stream' else '')
+        return path
+
+    def _body(self, record):
+        data = dict(record.get('form') or {})
+        for upload in record.get('files') or []:
+            kind = 'pdf' if upload.get('ext') == '.pdf' else 'image'
+            content, filename, content_type = self.bills.next_bill(kind)
+            data[upload['field']] = (io.BytesIO(content), filename, content_type)
+            match = TRANSACTION_FIELD.match(upload['field'])
+            if match:
+                data.setdefault(f"transaction_{match.group(1)}_amount", '100')
+        return data
+
+    def issue(self, record, scheduled_at):
+        employee = self.employee_for(record.get('user'))
+        email = employee['Employee Email ID'].strip().lower() if employee else 'anonymous@example.com'
+        client = self.client_for(email)
+        path = self._path(record, email)
+        kwargs = {'query_string': record.get('query') or {}}
+        if record['method'] in ('POST', 'PUT', 'PATCH'):
+            kwargs['data'] = self._body(record)
+            if record.get('files'):
+                kwargs['content_type'] = 'multipart/form-data'
+
+        start = time.perf_counter()
+        response = client.open(path, method=record['method'], **kwargs)
+        if record.get('endpoint') == 'api_ocr_job_stream':
+            response.get_data()
+        elapsed = time.perf_counter() - start
+
+        if record.get('endpoint') == 'process_bill' and response.status_code == 202:
+            with self._lock:
+                self._jobs[email] = response.get_json().get('job_id')
+
+        with self._lock:
+            self.results[record.get('endpoint') or path].append({
+                'ms': elapsed * 1000,
+                'lag_ms': (time.perf_counter() - scheduled_at) * 1000 - elapsed * 1000,
+                'status': response.status_code,
+                'recorded_ms': record.get('duration_ms'),
+                'recorded_status': record.get('status')
+            })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('trace', nargs='?', default=os.path.join('traces', 'requests.jsonl'))
+    parser.add_argument('--speed', type=float, default=1.0, help='time compression (2 = twice as fast, 0 = no waits)')
+    parser.add_argument('--concurrency', type=int, default=32, help='maximum requests in flight')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--seed-transactions', type=int, default=0, help='pre-load a synthetic claim history')
+    parser.add_argument('--ocr-latency-ms', type=float, default=800)
+    parser.add_argument('--storage-latency-ms', type=float, default=50)
+    parser.add_argument('--claim-store', default='sqlite', choices=['json', 'sqlite', 'memory'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='keep all files in this directory instead of a temporary one')
+    args = parser.parse_args()
+
+    from request_trace import load_trace
+
+    records = load_trace(os.path.abspath(args.trace))[:args.limit]
+    if not records:
+        sys.exit(f"No requests in {args.trace}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='reimburse-replay-')
+    app_module = load_offline_app(
+        workdir,
+        ocr_latency_ms=args.ocr_latency_ms,
+        storage_latency_ms=args.storage_latency_ms,
+        claim_store=args.claim_store,
+        seed=args.seed
+    )
+    employees = load_employees()
+
+    if args.seed_transactions:
+        print(f"Seeding {args.seed_transactions} synthetic transactions...")
+        repository = app_module.claim_repository
+        generator = ClaimGenerator(employees, seed=args.seed)
+        with quiet():
+            if hasattr(repository, 'add_claims'):
+                batch = []
+                for claim in generator.claims(args.seed_transactions):
+                    batch.append(claim)
+                    if len(batch) >= 5000:
+                        repository.add_claims(batch)
+                        batch = []
+                repository.add_claims(batch)
+            else:
+                for claim in generator.claims(args.seed_transactions):
+                    repository.add_claim(claim)
+
+    rng = random.Random(args.seed)
+    replayer = Replayer(app_module, employees, BillPool(rng), rng)
+    span = records[-1]['ts'] - records[0]['ts']
+    print(f"Replaying {len(records)} requests spanning {span:.1f}s at speed {args.speed or 'max'}...")
+
+    start = time.perf_counter()
+    with quiet():
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            for record in records:
+                if args.speed:
+                    due = start + (record['ts'] - records[0]['ts']) / args.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(replayer.issue, record, time.perf_counter())
+    wall = time.perf_counter() - start
+
+    print(f"\nReplayed in {wall:.1f}s ({len(records) / wall:.1f} req/s)")
+    print(f"{'endpoint':<26}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'rec p50':>10}{'rec p95':>10}{'lag p95':>10}{'status !=':>11}")
+    for endpoint, results in sorted(replayer.results.items()):
+        p50, p95, p99 = percentiles([r['ms'] for r in results])
+        recorded = [r['recorded_ms'] for r in results if r['recorded_ms'] is not None]
+        rec_p50, rec_p95, _rec_p99 = percentiles(recorded) if recorded else (0, 0, 0)
+        lag_p95 = percentiles([r['lag_ms'] for r in results])[1]
+        mismatched = sum(r['status'] != r['recorded_status'] for r in results)
+        print(f"{endpoint:<26}{len(results):>7}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}"
+              f"{rec_p50:>10.1f}{rec_p95:>10.1f}{lag_p95:>10.1f}{mismatched:>11}")
+
+    os.chdir(REPO_ROOT)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
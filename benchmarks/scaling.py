@@ -0,0 +1,248 @@
+"""Scaling benchmark of the claim-store hot paths against synthetic histories.
+
+Usage:
+    python benchmarks/scaling.py --sizes 10000,100000,1000000 --clients 1,4,16
+
+For every history size (in transactions) it measures:
+- duplicate index build time and check_duplicate lookups (hits and misses)
+- JSON log store: snapshot load, per-claim append (fsync) and compaction
+- SQLite store: bulk load, get_claim_by_id, and first/deep page queries
+- /api/claims and /api/claims/summary through the real Flask app
+and then submit throughput (claims/s) with N concurrent clients using the
+fake OCR backend and local storage. Histories are generated by
+benchmarks/workload.py; large sizes need memory for the in-memory indexes
+(roughly 1.5GB per million transactions).
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import REPO_ROOT, load_offline_app, logged_in_client, percentiles, quiet, submit_form
+from synthetic import BillPool
+from workload import ClaimGenerator, load_employees, write_json_snapshot
+
+
+def timed_calls(func, args_list):
+    """Per-call latencies in microseconds"""
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - start) * 1_000_000)
+    return latencies
+
+
+def summary(latencies, unit='us'):
+    p50, p95, p99 = percentiles(latencies)
+    return f"p50 {p50:,.1f}{unit}  p95 {p95:,.1f}{unit}  p99 {p99:,.1f}{unit}"
+
+
+def bench_duplicates(claims, rng, lookups=20_000):
+    from duplicate_index import DuplicateIndex, iter_claim_bills
+
+    index = DuplicateIndex()
+    start = time.perf_counter()
+    index.build(claims)
+    build = time.perf_counter() - start
+
+    bills = [bill for claim in rng.sample(claims, min(len(claims), lookups)) for bill in iter_claim_bills(claim)]
+    hits = [(number, vendor, amount) for number, vendor, amount, _date in bills[:lookups]]
+    misses = [(f"MISS{n}", vendor, amount) for n, (_number, vendor, amount) in enumerate(hits)]
+    return {
+        'build_s': build,
+        'hit': timed_calls(index.contains, hits),
+        'miss': timed_calls(index.contains, misses)
+    }
+
+
+def bench_json_store(claims, workdir, appends=200):
+    from claim_repository import JsonLogClaimRepository
+
+    path = os.path.join(workdir, 'scaling_claims.json')
+    start = time.perf_counter()
+    write_json_snapshot(iter(claims), path)
+    write = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with quiet():
+        repository = JsonLogClaimRepository(path, compact_bytes=1 << 40)
+    load = time.perf_counter() - start
+
+    extra = list(ClaimGenerator(load_employees(), seed=99).claims(appends * 2))[:appends]
+    append = timed_calls(repository.add_claim, [(claim,) for claim in extra])
+    lookup_ids = [(claim['claim_id'],) for claim in random.Random(1).sample(claims, min(len(claims), 5000))]
+    get = timed_calls(repository.get_claim, lookup_ids)
+
+    start = time.perf_counter()
+    repository.compact()
+    compact = time.perf_counter() - start
+    return {'write_s': write, 'load_s': load, 'append': append, 'get': get, 'compact_s': compact,
+            'bytes': os.path.getsize(path)}
+
+
+def bench_sqlite_store(claims, workdir):
+    from claim_repository import SQLiteClaimRepository
+
+    path = os.path.join(workdir, 'scaling_claims.db')
+    repository = SQLiteClaimRepository(path)
+    start = time.perf_counter()
+    for offset in range(0, len(claims), 5000):
+        repository.add_claims(claims[offset:offset + 5000])
+    load = time.perf_counter() - start
+
+    rng = random.Random(2)
+    get = timed_calls(repository.get_claim, [(claim['claim_id'],) for claim in rng.sample(claims, min(len(claims), 5000))])
+
+    emails = [claim['employee_details']['employee_email'] for claim in rng.sample(claims, min(len(claims), 200))]
+    first_page = timed_calls(lambda email: repository.query_claims(user_email=email, limit=25), [(e,) for e in emails])
+
+    def deep_page(email):
+        cursor = None
+        for _ in range(10):
+            _claims, cursor = repository.query_claims(user_email=email, limit=25, cursor=cursor)
+            if not cursor:
+                break
+    deep = timed_calls(deep_page, [(e,) for e in emails[:50]])
+    return {'load_s': load, 'get': get, 'first_page': first_page, 'tenth_page_walk': deep, 'repository': repository}
+
+
+def bench_api(app_module, repository, claims, requests=200):
+    app_module.claim_repository = repository
+    # The heaviest claimant has the most to list and serialize
+    counts = {}
+    for claim in claims:
+        email = claim['employee_details']['employee_email']
+        counts[email] = counts.get(email, 0) + 1
+    email = max(counts, key=counts.get)
+    client = logged_in_client(app_module, email)
+
+    results = {}
+    for name, url in [('api_claims_25', '/api/claims?limit=25'), ('api_claims_200', '/api/claims?limit=200'),
+                      ('api_claims_summary', '/api/claims/summary')]:
+        latencies = []
+        with quiet():
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.get(url)
+                response.get_data()
+                latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)[:200]
+        results[name] = latencies
+    return results, counts[email]
+
+
+def bench_submit(app_module, clients, requests_per_client, transactions, bills):
+    local = threading.local()
+
+    def submit(_n):
+        if not hasattr(local, 'client'):
+            local.client = logged_in_client(app_module)
+        form = submit_form(bills, transactions)
+        start = time.perf_counter()
+        response = local.client.post('/submit-claim', data=form, content_type='multipart/form-data')
+        return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with quiet():
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(submit, range(clients * requests_per_client)))
+    wall = time.perf_counter() - start
+    latencies = [elapsed * 1000 for elapsed, _status in results]
+    errors = sum(status != 200 for _elapsed, status in results)
+    return len(results) / wall, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000', help='comma separated history sizes in transactions')
+    parser.add_argument('--clients', default='1,4,16', help='comma separated concurrent submit clients')
+    parser.add_argument('--submits-per-client', type=int, default=5)
+    parser.add_argument('--transactions', type=int, default=2, help='bills per submitted claim')
+    parser.add_argument('--ocr-latency-ms', type=float, default=300)
+    parser.add_argument('--storage-latency-ms', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json-out', help='also write the raw results to this file')
+    parser.add_argument('--workdir', help='keep all files in this directory instead of a temporary one')
+    args = parser.parse_args()
+    if args.json_out:
+        args.json_out = os.path.abspath(args.json_out)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='reimburse-scaling-')
+    app_module = load_offline_app(
+        workdir,
+        ocr_latency_ms=args.ocr_latency_ms,
+        storage_latency_ms=args.storage_latency_ms,
+        claim_store='sqlite',
+        seed=args.seed
+    )
+    employees = load_employees()
+    report = {'sizes': {}, 'submit': {}}
+
+    for size in [int(value) for value in args.sizes.split(',')]:
+        print(f"\n=== {size:,} transactions ===")
+        start = time.perf_counter()
+        claims = list(ClaimGenerator(employees, seed=args.seed).claims(size))
+        print(f"generated {len(claims):,} claims in {time.perf_counter() - start:.1f}s")
+        rng = random.Random(args.seed)
+
+        duplicates = bench_duplicates(claims, rng)
+        print(f"duplicate index build   {duplicates['build_s']:.2f}s")
+        print(f"check_duplicate hit     {summary(duplicates['hit'])}")
+        print(f"check_duplicate miss    {summary(duplicates['miss'])}")
+
+        json_store = bench_json_store(claims, workdir)
+        print(f"json snapshot write     {json_store['write_s']:.2f}s ({json_store['bytes'] / 1e6:,.0f}MB)")
+        print(f"json store load         {json_store['load_s']:.2f}s")
+        print(f"json store append       {summary(json_store['append'])}")
+        print(f"json get_claim_by_id    {summary(json_store['get'])}")
+        print(f"json store compact      {json_store['compact_s']:.2f}s")
+
+        sqlite_store = bench_sqlite_store(claims, workdir)
+        print(f"sqlite bulk load        {sqlite_store['load_s']:.2f}s")
+        print(f"sqlite get_claim_by_id  {summary(sqlite_store['get'])}")
+        print(f"sqlite first page       {summary(sqlite_store['first_page'])}")
+        print(f"sqlite 10-page walk     {summary(sqlite_store['tenth_page_walk'])}")
+
+        api, user_claims = bench_api(app_module, sqlite_store.pop('repository'), claims)
+        for name, latencies in api.items():
+            print(f"{name:<24}{summary(latencies, 'ms')}  (user with {user_claims:,} claims)")
+
+        report['sizes'][size] = {
+            'claims': len(claims),
+            'duplicates': duplicates,
+            'json_store': json_store,
+            'sqlite_store': sqlite_store,
+            'api': api
+        }
+        del claims
+        for name in os.listdir(workdir):
+            if name.startswith('scaling_claims'):
+                os.remove(os.path.join(workdir, name))
+
+    print("\n=== submit throughput ===")
+    bills = BillPool(random.Random(args.seed))
+    for clients in [int(value) for value in args.clients.split(',')]:
+        throughput, latencies, errors = bench_submit(
+            app_module, clients, args.submits_per_client, args.transactions, bills
+        )
+        print(f"{clients:>3} clients  {throughput:6.2f} claims/s  {summary(latencies, 'ms')}  "
+              f"mean {statistics.mean(latencies):,.0f}ms  ({errors} errors)")
+        report['submit'][clients] = {'claims_per_s': throughput, 'latencies_ms': latencies, 'errors': errors}
+
+    os.chdir(REPO_ROOT)
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Synthetic bill files for benchmarks and load tests."""
+import io
+import os
+import threading
+
+
+def make_receipt_jpeg(rng, width=3000, height=4000):
+    """A phone-photo sized synthetic receipt"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (width, height), (rng.randint(180, 230),) * 3)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((width // 6, height // 10, width * 5 // 6, height * 9 // 10), fill='white')
+    for line in range(40):
+        y = height // 8 + line * (height // 55)
+        draw.rectangle((width // 5, y, width // 5 + rng.randint(width // 6, width // 2), y + height // 120), fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def make_invoice_pdf(rng, pages=2):
+    """A multi-page synthetic invoice"""
+    import fitz
+
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page(width=595, height=842)
+        for line in range(30):
+            page.insert_text((72, 90 + line * 22), f"Item {page_number}-{line}  Qty {rng.randint(1, 9)}  INR {rng.randint(100, 9999)}.00")
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def _digital_invoice_lines(rng, template):
+    """(text lines, ground truth) for one born-digital invoice layout"""
+    amount = round(rng.uniform(80, 25000), 2)
+    day = rng.randint(1, 28)
+    month = rng.randint(1, 12)
+    year = rng.choice((2024, 2025))
+    number = f"{rng.randint(10**8, 10**9 - 1)}"
+    iso = f"{year}-{month:02d}-{day:02d}"
+    month_name = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')[month - 1]
+    subtotal = round(amount / 1.05, 2)
+
+    if template == 'swiggy':
+        vendor, lines = 'Swiggy', [
+            'Tax Invoice', 'Bundl Technologies Private Limited (Swiggy)', f'Order ID: {number}',
+            f'Order Date: {day:02d}/{month:02d}/{year}', 'Restaurant: Mehfil', f'Item Total  ₹ {subtotal:,.2f}',
+            f'Taxes  ₹ {amount - subtotal:,.2f}', f'Grand Total  ₹ {amount:,.2f}'
+        ]
+    elif template == 'uber':
+        vendor, lines = 'Uber', [
+            'Uber', 'Thanks for riding, Priya', f'{month_name} {day}, {year}', f'Trip ID {number}',
+            f'Trip fare  ₹{subtotal:,.2f}', f'Booking fee  ₹{amount - subtotal:,.2f}', f'Total  ₹{amount:,.2f}'
+        ]
+    elif template == 'airline':
+        vendor, lines = 'IndiGo', [
+            'InterGlobe Aviation Limited', 'IndiGo - GST Invoice', f'Invoice No: IGO{number}',
+            f'Invoice Date: {day:02d}-{month_name}-{year}', 'PNR: K7Q2XZ', 'Hyderabad - Bengaluru',
+            f'Base Fare  INR {subtotal:,.2f}', f'Total Amount  INR {amount:,.2f}'
+        ]
+    elif template == 'amazon':
+        vendor, lines = 'Amazon', [
+            'Tax Invoice/Bill of Supply/Cash Memo', '(Original for Recipient)', 'Sold By: Appario Retail Private Ltd',
+            'amazon.in', f'Order Number: 407-{number[:7]}-{number[2:9]}', f'Invoice Number: HYD8-{number[:6]}',
+            f'Invoice Date: {day:02d}.{month:02d}.{year}', 'Description  Qty  Unit Price', f'Logitech Mouse  1  ₹{subtotal:,.2f}',
+            f'TOTAL:  ₹{amount:,.2f}'
+        ]
+    elif template == 'cafe':
+        # Tax rate after the total, which a "last figure on the line" parse reads as the amount
+        amount = float(round(amount))
+        vendor, lines = 'Cafe Niloufer', [
+            'Cafe Niloufer', 'Lakdikapul, Hyderabad', f'Bill No: CN-{number[:6]}', f'Date: {day:02d} {month_name} {year}',
+            f'Tea and Snacks  ₹{subtotal:,.2f}', f'Grand Total ₹{amount:,.0f} (incl. 18% GST)'
+        ]
+    elif template == 'supermarket':
+        vendor, lines = 'Ratnadeep Supermarket', [
+            'Ratnadeep Supermarket', 'Tax Invoice', f'Invoice No: RD{number[:7]}',
+            f'Invoice Date: {day:02d}/{month:02d}/{year}',
+            f'Total Amount: Rs. {amount:.2f} for {rng.randint(2, 9)} items'
+        ]
+    elif template == 'receipt':
+        # The payment date shares the total's line
+        amount = float(round(amount))
+        vendor, lines = 'Sri Sai Travels', [
+            'Sri Sai Travels', 'Payment Receipt', f'Receipt No: SST/{number[:4]}',
+            f'Total paid {amount:.0f} on {day:02d}/{month:02d}/{year}'
+        ]
+    else:
+        vendor, lines = 'Hotel Sitara Grand', [
+            'Hotel Sitara Grand', 'Banjara Hills, Hyderabad', 'Tax Invoice', f'Bill No: SG/{number[:5]}',
+            f'Date: {iso}', f'Room Charges  {subtotal:,.2f}', f'CGST 2.5%  {(amount - subtotal) / 2:,.2f}',
+            f'Net Payable  Rs. {amount:,.2f}'
+        ]
+
+    truth = {'amount': amount, 'bill_date': iso, 'vendor_name': vendor, 'currency': 'INR'}
+    return lines, truth
+
+
+DIGITAL_TEMPLATES = ('swiggy', 'uber', 'airline', 'amazon', 'hotel', 'cafe', 'supermarket', 'receipt')
+
+
+def make_digital_invoice_pdf(rng, template=None):
+    """A born-digital invoice with a text layer; returns (pdf bytes, ground truth fields)"""
+    import fitz
+
+    lines, truth = _digital_invoice_lines(rng, template or rng.choice(DIGITAL_TEMPLATES))
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    for number, line in enumerate(lines):
+        # Base-14 fonts have no ₹ glyph; embedded text of real invoices does
+        page.insert_text((72, 90 + number * 22), line, fontname='helv' if '₹' not in line else 'china-s')
+    data = document.tobytes()
+    document.close()
+    return data, truth
+
+
+def make_scanned_pdf(rng):
+    """A PDF holding only a page image, as a scanner or phone app produces (no text layer)"""
+    import fitz
+
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    page.insert_image(page.rect, stream=make_receipt_jpeg(rng, width=600, height=800))
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def unique(data, rng):
+    """Make bill bytes unique without changing how they decode.
+
+    Trailing bytes after the JPEG EOI / PDF %%EOF are ignored by decoders
+    but give every upload its own OCR cache key.
+    """
+    return data + b'\n' + rng.getrandbits(64).to_bytes(8, 'big')
+
+
+class BillPool:
+    """A few pre-rendered bills handed out as unique (cache-busting) copies"""
+
+    def __init__(self, rng, pdf_ratio=0.2, jpegs=4, pdfs=2):
+        self.rng = rng
+        self.pdf_ratio = pdf_ratio
+        self.jpegs = [make_receipt_jpeg(rng) for _ in range(jpegs)]
+        self.pdfs = [make_invoice_pdf(rng, pages=rng.randint(1, 3)) for _ in range(pdfs)]
+        self._lock = threading.Lock()
+
+    def next_bill(self, kind=None):
+        """Return (data, filename, content_type); kind is 'pdf', 'image' or None for the configured mix"""
+        with self._lock:
+            if kind is None:
+                kind = 'pdf' if self.rng.random() < self.pdf_ratio else 'image'
+            if kind == 'pdf':
+                return unique(self.rng.choice(self.pdfs), self.rng), 'invoice.pdf', 'application/pdf'
+            return unique(self.rng.choice(self.jpegs), self.rng), 'receipt.jpg', 'image/jpeg'
+
+
+def write_bill_files(directory, count, rng, pdf_ratio=0.2):
+    """Write count synthetic bills to directory; returns their paths"""
+    os.makedirs(directory, exist_ok=True)
+    pool = BillPool(rng, pdf_ratio)
+    paths = []
+    for n in range(count):
+        data, filename, _content_type = pool.next_bill()
+        path = os.path.join(directory, f"bill_{n:06d}{os.path.splitext(filename)[1]}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
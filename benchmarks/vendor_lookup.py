@@ -0,0 +1,149 @@
+"""Measure vendor knowledge base build time, lookup latency and match accuracy.
+
+Usage:
+    python benchmarks/vendor_lookup.py --vendors 100000 --queries 20000
+
+Builds a VendorIndex from synthetic claims covering --vendors vendors,
+each filed a few times under different spellings ("Mehfil", "M/s MEHFIL
+PVT LTD", "Mehfil LLP") with a mostly consistent category. It then
+looks up three kinds of names: known spellings, typos (one character
+dropped, swapped or replaced) and vendors that were never seen, and
+reports latency percentiles, how often the right vendor came back, and
+how often an unseen vendor was wrongly matched to a known one.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from duplicate_index import vendor_key  # noqa: E402
+from harness import percentiles  # noqa: E402
+from vendor_index import VendorIndex  # noqa: E402
+
+CONSONANTS = 'bcdfghjklmnprstvwyz'
+VOWELS = 'aeiou'
+PREFIXES = ['Sri ', 'Shree ', 'New ', 'Royal ', 'Green ', 'Grand ']
+BUSINESS_WORDS = [' Foods', ' Travels', ' Bakery', ' Sweets', ' Medicals', ' Motors', ' Biryani House',
+                  ' Tiffins', ' Kitchen', ' Traders', ' Digital', ' Tech', ' Fuels', ' Tours']
+SUFFIXES = ['', ' Pvt Ltd', ' Private Limited', ' Pvt. Ltd.', ' LLP', ' Ltd']
+CATEGORIES = ['Food', 'Travel', 'Accommodation', 'Fuel', 'Others']
+PRODUCTS = ['Academy Online', 'Intensive Online', 'NIAT Application', 'Common']
+
+
+def make_word(rng):
+    letters = [rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4))]
+    if rng.random() < 0.5:
+        letters.append(rng.choice(CONSONANTS))
+    return ''.join(letters).capitalize()
+
+
+def make_vendor(rng):
+    """Names like "Sri Kolatu Bakery" or "Vanemi Rusodo": prefixes and business words repeat across vendors"""
+    words = [make_word(rng) for _ in range(rng.choice((1, 1, 2)))]
+    prefix = rng.choice(PREFIXES) if rng.random() < 0.2 else ''
+    business = rng.choice(BUSINESS_WORDS) if rng.random() < 0.4 else ''
+    return prefix + ' '.join(words) + business
+
+
+def spelling(rng, name):
+    variant = ('M/s ' if rng.random() < 0.1 else '') + name + rng.choice(SUFFIXES)
+    return variant.upper() if rng.random() < 0.3 else variant
+
+
+def typo(rng, name):
+    position = rng.randrange(1, len(name) - 1)
+    kind = rng.choice(('drop', 'swap', 'replace'))
+    if kind == 'drop':
+        return name[:position] + name[position + 1:]
+    if kind == 'swap':
+        return name[:position - 1] + name[position] + name[position - 1] + name[position + 1:]
+    return name[:position] + rng.choice('aeiou') + name[position + 1:]
+
+
+def synthetic_claims(vendors, rng):
+    """One claim per vendor with 1-6 bills, 80% of them filed under its usual category/product"""
+    for n, (name, category, product) in enumerate(vendors):
+        transactions = []
+        for _ in range(rng.randint(1, 6)):
+            usual = rng.random() < 0.8
+            transactions.append({
+                'transaction_category': category if usual else rng.choice(CATEGORIES),
+                'product': product if usual else rng.choice(PRODUCTS),
+                'extracted_details': {'vendor_name': spelling(rng, name)}
+            })
+        yield {'claim_id': f'CLAIM_{n}', 'transactions': transactions}
+
+
+def timed_lookups(index, names):
+    timings, matches = [], []
+    for name in names:
+        start = time.perf_counter()
+        matches.append(index.lookup(name))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vendors', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=20000, help='lookups per query kind')
+    parser.add_argument('--threshold', type=float, default=config.VENDOR_MATCH_THRESHOLD)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vendors, seen = [], set()
+    while len(vendors) < args.vendors:
+        name = make_vendor(rng)
+        if vendor_key(name) not in seen:
+            seen.add(vendor_key(name))
+            vendors.append((name, rng.choice(CATEGORIES), rng.choice(PRODUCTS)))
+
+    index = VendorIndex(
+        threshold=args.threshold,
+        min_bills=config.VENDOR_CATEGORY_MIN_BILLS,
+        min_share=config.VENDOR_CATEGORY_MIN_SHARE
+    )
+    claims = list(synthetic_claims(vendors, rng))
+    start = time.perf_counter()
+    index.build(claims)
+    bills = sum(len(claim['transactions']) for claim in claims)
+    print(f"Built {len(index)} vendors from {bills} bills in {time.perf_counter() - start:.1f}s "
+          f"(threshold {args.threshold})")
+
+    sample = [rng.choice(vendors) for _ in range(args.queries)]
+    unseen = []
+    while len(unseen) < args.queries:
+        name = make_vendor(rng)
+        if vendor_key(name) not in seen:
+            unseen.append(name)
+    kinds = [
+        ('known spelling', [spelling(rng, name) for name, _, _ in sample], sample),
+        ('typo', [typo(rng, name) for name, _, _ in sample], sample),
+        ('unseen vendor', unseen, None)
+    ]
+
+    for label, names, expected in kinds:
+        timings, matches = timed_lookups(index, names)
+        p50, p95, p99 = percentiles(timings)
+        print(f"{label:<15} p50 {p50 * 1000:.0f}us  p95 {p95 * 1000:.0f}us  p99 {p99 * 1000:.0f}us  "
+              f"max {max(timings):.2f}ms")
+        if expected is None:
+            wrong = sum(match is not None for match in matches)
+            print(f"{'':<15} wrongly matched: {wrong / len(names):.1%}")
+            continue
+        right = sum(match is not None and match.key == vendor_key(name)
+                    for match, (name, _, _) in zip(matches, expected))
+        missed = sum(match is None for match in matches)
+        categorised = sum(match is not None and match.category == category
+                          for match, (_, category, _) in zip(matches, expected))
+        print(f"{'':<15} right vendor: {right / len(names):.1%}  no match: {missed / len(names):.1%}  "
+              f"usual category prefilled: {categorised / len(names):.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""Synthetic claim histories drawn from the employee directory.
+
+Usage:
+    python benchmarks/workload.py --transactions 100000 --out claims.jsonl
+    python benchmarks/workload.py --transactions 1000000 --sqlite claims.db
+    python benchmarks/workload.py --transactions 10000 --out claims_data.json --bills bills/ --bill-count 50
+
+Claims follow the /submit-claim schema. Submitters are drawn from
+employee_data.csv with a skewed (a few heavy claimants) distribution,
+with their real department, team and reporting chain; submission times
+follow business hours over --days days; amounts are lognormal per
+category; and a fraction of bills are resubmissions of earlier bills so
+duplicate detection has something to find. Output is streamed, so
+millions of transactions never sit in memory at once.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# category -> (vendors, products, median amount in INR, lognormal sigma)
+CATEGORIES = {
+    'Travel': (['Uber India', 'Ola Cabs', 'Rapido', 'IRCTC', 'Meru Cabs'], ['Cab', 'Train', 'Bike Taxi'], 450, 0.8),
+    'Flights': (['IndiGo Airlines', 'Air India', 'Vistara', 'Akasa Air'], ['Flight'], 6500, 0.5),
+    'Accommodation': (['Taj Hotels', 'OYO Rooms', 'Lemon Tree', 'Treebo'], ['Hotel Stay'], 4200, 0.6),
+    'Food': (['Swiggy', 'Zomato', 'Cafe Coffee Day', 'Haldiram'], ['Team Meal', 'Client Meal'], 850, 0.7),
+    'Office Supplies': (['Amazon Business', 'Staples', 'Flipkart'], ['Stationery', 'Furniture'], 1200, 0.9),
+    'Electronics': (['Croma', 'Reliance Digital', 'Vijay Sales'], ['Laptop Accessories', 'Mobile'], 3500, 0.9),
+    'Internet': (['Airtel', 'Jio', 'ACT Fibernet'], ['Broadband', 'Mobile Data'], 999, 0.3)
+}
+CATEGORY_WEIGHTS = [30, 8, 8, 25, 12, 7, 10]
+CLUSTERS = ['Hyderabad', 'Bengaluru', 'Mumbai', 'Delhi NCR', 'Chennai', 'Pune']
+TRANSACTIONS_PER_CLAIM = [1, 1, 1, 2, 2, 3, 4, 5]
+
+
+def load_employees(path=os.path.join(REPO_ROOT, 'employee_data.csv')):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row for row in csv.DictReader(f) if row.get('Employee Email ID')]
+
+
+class ClaimGenerator:
+    """Yields claims in submission order until the transaction budget is spent"""
+
+    def __init__(self, employees, seed=0, days=365, end_date=None, duplicate_rate=0.01):
+        self.rng = random.Random(seed)
+        self.employees = employees
+        self.days = days
+        self.end_date = end_date or datetime(2025, 12, 31, 18, 0)
+        self.duplicate_rate = duplicate_rate
+        self._recent_bills = deque(maxlen=2000)
+        self._sequence = 0
+
+        # Zipf-like activity: a few employees file most claims
+        ranks = list(range(1, len(employees) + 1))
+        self.rng.shuffle(ranks)
+        self.employee_weights = [1 / rank ** 0.8 for rank in ranks]
+
+    def _submission_times(self, claims):
+        """Business-hours weighted timestamps spread over the period, in order"""
+        start = self.end_date - timedelta(days=self.days)
+        # Thin out nights and weekends instead of skipping them outright; candidate
+        # times are drawn faster by the average acceptance so the period is still covered
+        hour_weight = lambda hour: 1.0 if 9 <= hour < 19 else 0.1
+        day_weight = lambda weekday: 0.15 if weekday >= 5 else 1.0
+        acceptance = sum(map(hour_weight, range(24))) / 24 * sum(map(day_weight, range(7))) / 7
+        mean_gap = self.days * 86400 / max(claims, 1) * acceptance
+        current = start
+        while True:
+            current += timedelta(seconds=self.rng.expovariate(1 / mean_gap))
+            if self.rng.random() < hour_weight(current.hour) * day_weight(current.weekday()):
+                yield current
+
+    def _bill(self, submitted):
+        if self._recent_bills and self.rng.random() < self.duplicate_rate:
+            # Resubmission of an earlier bill
+            return dict(self.rng.choice(self._recent_bills))
+
+        category = self.rng.choices(list(CATEGORIES), CATEGORY_WEIGHTS)[0]
+        vendors, products, median, sigma = CATEGORIES[category]
+        vendor = self.rng.choice(vendors)
+        bill_date = (submitted - timedelta(days=int(self.rng.expovariate(1 / 6)))).strftime('%Y-%m-%d')
+        amount = round(median * math.exp(self.rng.gauss(0, sigma)), 2)
+        bill = {
+            'bill_date': bill_date,
+            'bill_number': f"{vendor[:3].upper()}{self.rng.randint(10 ** 7, 10 ** 8 - 1)}",
+            'vendor_name': vendor,
+            'transaction_category': category,
+            'purpose': f"{category} expense",
+            'amount': amount,
+            'product': self.rng.choice(products),
+            'cluster': self.rng.choice(CLUSTERS)
+        }
+        self._recent_bills.append(bill)
+        return bill
+
+    def _status(self, submitted):
+        age_days = (self.end_date - submitted).days
+        if age_days < 7:
+            return self.rng.choices(['pending', 'needs_review'], [85, 15])[0]
+        return self.rng.choices(
+            ['approved', 'rejected', 'partially_approved', 'needs_review', 'pending'],
+            [78, 8, 5, 4, 5]
+        )[0]
+
+    def claims(self, transactions):
+        mean_per_claim = sum(TRANSACTIONS_PER_CLAIM) / len(TRANSACTIONS_PER_CLAIM)
+        times = self._submission_times(int(transactions / mean_per_claim))
+        remaining = transactions
+        while remaining > 0:
+            submitted = next(times)
+            employee = self.rng.choices(self.employees, self.employee_weights)[0]
+            count = min(self.rng.choice(TRANSACTIONS_PER_CLAIM), remaining)
+            remaining -= count
+            yield self._claim(employee, submitted, count)
+
+    def _claim(self, employee, submitted, count):
+        self._sequence += 1
+        email = employee['Employee Email ID'].strip().lower()
+        status = self._status(submitted)
+        approver = employee.get('Reporting Person - 1 Email') or ''
+
+        transactions = []
+        for _ in range(count):
+            bill = self._bill(submitted)
+            extension = self.rng.choice(['jpg', 'jpg', 'jpg', 'png', 'pdf'])
+            transactions.append({
+                'bill_date': bill['bill_date'],
+                'bill_number': bill['bill_number'],
+                'transaction_category': bill['transaction_category'],
+                'purpose': bill['purpose'],
+                'amount': bill['amount'],
+                'product': bill['product'],
+                'cluster': bill['cluster'],
+                'remarks': '',
+                'bill_file_url': f"/local-storage/claims/synthetic-{self._sequence}-{len(transactions)}.{extension}",
+                'bill_file_path': f"claims/synthetic-{self._sequence}-{len(transactions)}.{extension}",
+                'bill_file_size': self.rng.randint(80_000, 4_000_000),
+                'bill_file_name': f"bill.{extension}",
+                'bill_file_type': 'application/pdf' if extension == 'pdf' else f"image/{'jpeg' if extension == 'jpg' else extension}",
+                'extracted_details': {
+                    'bill_number': bill['bill_number'],
+                    'bill_date': bill['bill_date'],
+                    'vendor_name': bill['vendor_name'],
+                    'transaction_category': bill['transaction_category'],
+                    'amount': bill['amount'],
+                    'currency': 'INR',
+                    'confidence_score': self.rng.randint(60, 99)
+                },
+                'duplicate_detected': False,
+                'possible_duplicate': False
+            })
+
+        history = []
+        if status not in ('pending', 'needs_review'):
+            decided = submitted + timedelta(hours=self.rng.expovariate(1 / 30))
+            history.append({
+                'status': status,
+                'by': approver,
+                'at': min(decided, self.end_date).isoformat()
+            })
+
+        return {
+            'claim_id': f"CLAIM_{submitted.strftime('%Y%m%d_%H%M%S')}_{self._sequence:08X}",
+            'employee_details': {
+                'employee_name': employee['Employee Name'],
+                'employee_email': email,
+                'employee_id': employee['Employee ID'],
+                'department': employee['Department Name'],
+                'team': employee['Team Name'],
+                'hod_name': employee.get('Reporting Person - 1 Name', ''),
+                'hod_email': approver,
+                'phone': employee.get('Phone Number of Employee', ''),
+                'submitted_by_uid': f"uid-{employee['Employee ID']}"
+            },
+            'form_details': {
+                'cc_emails': [employee['Reporting Person - 2 Email']] if employee.get('Reporting Person - 2 Email') else [],
+                'payment_mode': 'Bank Transfer',
+                'total_amount': round(sum(t['amount'] for t in transactions), 2),
+                'transaction_count': count,
+                'currency': 'INR'
+            },
+            'transactions': transactions,
+            'status': {
+                'current_status': status,
+                'submission_date': submitted.isoformat(),
+                'last_updated': history[-1]['at'] if history else submitted.isoformat(),
+                'approval_history': history
+            },
+            'metadata': {
+                'submitted_by': email,
+                'submitted_from': 'synthetic',
+                'ip_address': '127.0.0.1',
+                'user_agent': 'workload-generator'
+            }
+        }
+
+
+def generate_claims(transactions, seed=0, days=365, duplicate_rate=0.01, employees=None):
+    """Convenience wrapper: a claim iterator for the given transaction budget"""
+    generator = ClaimGenerator(employees or load_employees(), seed=seed, days=days, duplicate_rate=duplicate_rate)
+    return generator.claims(transactions)
+
+
+def write_jsonl(claims, path):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for claim in claims:
+            f.write(json.dumps(claim, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def write_json_snapshot(claims, path):
+    """Stream claims as a JSON array (the claims_data.json snapshot format)"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('[\n')
+        for claim in claims:
+            if count:
+                f.write(',\n')
+            f.write(json.dumps(claim, ensure_ascii=False, indent=2))
+            count += 1
+        f.write('\n]\n')
+    return count
+
+
+def write_sqlite(claims, path, batch_size=5000):
+    from claim_repository import SQLiteClaimRepository
+
+    repository = SQLiteClaimRepository(path)
+    count, batch = 0, []
+    for claim in claims:
+        batch.append(claim)
+        if len(batch) >= batch_size:
+            repository.add_claims(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        repository.add_claims(batch)
+        count += len(batch)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=10_000, help='total bills across all claims')
+    parser.add_argument('--out', help='write claims to a .jsonl file or a .json snapshot')
+    parser.add_argument('--sqlite', help='write claims into a SQLite claim store')
+    parser.add_argument('--days', type=int, default=365, help='history length in days')
+    parser.add_argument('--duplicate-rate', type=float, default=0.01, help='fraction of bills resubmitted')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bills', help='directory to write synthetic bill images/PDFs into')
+    parser.add_argument('--bill-count', type=int, default=20)
+    parser.add_argument('--pdf-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    if not args.out and not args.sqlite and not args.bills:
+        parser.error('nothing to do: pass --out, --sqlite and/or --bills')
+
+    claims = generate_claims(args.transactions, seed=args.seed, days=args.days, duplicate_rate=args.duplicate_rate)
+    if args.out and args.sqlite:
+        parser.error('pass only one of --out and --sqlite')
+    if args.out:
+        writer = write_jsonl if args.out.endswith('.jsonl') else write_json_snapshot
+        print(f"Wrote {writer(claims, args.out)} claims ({args.transactions} transactions) to {args.out}")
+    elif args.sqlite:
+        print(f"Wrote {write_sqlite(claims, args.sqlite)} claims ({args.transactions} transactions) to {args.sqlite}")
+
+    if args.bills:
+        from synthetic import write_bill_files
+
+        paths = write_bill_files(args.bills, args.bill_count, random.Random(args.seed), args.pdf_ratio)
+        print(f"Wrote {len(paths)} synthetic bills to {args.bills}")
+
+
+if __name__ == '__main__':
+    main()
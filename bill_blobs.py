@@ -0,0 +1,263 @@
+import json
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from duplicate_index import claim_key
+
+
+def claim_blob_paths(claim):
+    """Storage paths of the bill files a claim references"""
+    return {
+        transaction['bill_file_path']
+        for transaction in claim.get('transactions') or []
+        if transaction.get('bill_file_path')
+    }
+
+
+class BillBlobRefs:
+    """Reference counts of stored bill files, maintained on every claim write.
+
+    Bill files are content-addressed (see StorageBackend.upload), so one
+    blob can back transactions in several claims. Each claim's referenced
+    paths are stored next to the counts; `add_claim` and `remove_claim`
+    apply the difference atomically and return the paths whose count
+    dropped to zero, which the caller may then delete from storage. Paths
+    of claims written before counting began are never released until
+    `build` has counted them.
+
+    A submit `hold`s the blobs it is about to upload or reuse before
+    checking whether they exist, under a pending reference that is
+    released once the claim's own references are recorded or the submit
+    fails, so a concurrent delete of the last other claim can't release
+    them in between. A hold left by a crashed worker only keeps a blob
+    alive until the next `build`.
+    """
+
+    name = 'base'
+    # Pending references are recorded like claims under this prefix
+    HOLD_PREFIX = 'pending:'
+
+    def add_claim(self, claim, ref=None):
+        """Record a claim's bill files; ref is the id the claim store knows it by"""
+        ref = ref or claim_key(claim)
+        if not ref:
+            return []
+        return self._replace(ref, claim_blob_paths(claim))
+
+    def remove_claim(self, ref):
+        return self._replace(ref, set())
+
+    def hold(self, token, paths):
+        """Take a pending reference on the blobs a submit is about to store or reuse"""
+        return self._replace(self.HOLD_PREFIX + token, set(paths))
+
+    def release_hold(self, token):
+        """Drop a pending reference; returns the paths no longer referenced"""
+        return self._replace(self.HOLD_PREFIX + token, set())
+
+    def build(self, claims):
+        """Recount every reference from a full claim scan"""
+        self._reset()
+        for claim in claims:
+            self.add_claim(claim, self._build_ref(claim))
+
+    def _build_ref(self, claim):
+        return claim_key(claim)
+
+    def refs(self, path):
+        """Number of claims referencing the blob at path"""
+        raise NotImplementedError
+
+    def _replace(self, ref, paths):
+        """Swap ref's recorded paths for `paths`; returns the paths no longer referenced"""
+        raise NotImplementedError
+
+    def _reset(self):
+        raise NotImplementedError
+
+
+class InMemoryBillBlobRefs(BillBlobRefs):
+    """Process-local counts for the JSON and in-memory claim stores"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._counts = {}
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def refs(self, path):
+        with self._lock:
+            return self._counts.get(path, 0)
+
+    def _replace(self, ref, paths):
+        released = []
+        with self._lock:
+            old = self._claims.pop(ref, set())
+            for path in paths - old:
+                self._counts[path] = self._counts.get(path, 0) + 1
+            for path in old - paths:
+                self._counts[path] = self._counts.get(path, 0) - 1
+                if self._counts[path] <= 0:
+                    del self._counts[path]
+                    released.append(path)
+            if paths:
+                self._claims[ref] = set(paths)
+        return released
+
+    def _reset(self):
+        with self._lock:
+            self._counts = {}
+            self._claims = {}
+
+
+class SQLiteBillBlobRefs(BillBlobRefs):
+    """Reference count table next to the SQLite claim store"""
+
+    name = 'sqlite'
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS bill_blobs (
+            path TEXT PRIMARY KEY,
+            refs INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS bill_blob_claims (
+            claim_ref TEXT PRIMARY KEY,
+            paths TEXT NOT NULL
+        )
+        """
+    ]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def refs(self, path):
+        row = self._connection().execute("SELECT refs FROM bill_blobs WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else 0
+
+    def _replace(self, ref, paths):
+        conn = self._connection()
+        released = []
+        with conn:
+            # Take the write lock before reading the old paths so concurrent writers serialize
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT paths FROM bill_blob_claims WHERE claim_ref = ?", (ref,)).fetchone()
+            old = set(json.loads(row[0])) if row else set()
+            conn.executemany(
+                "INSERT INTO bill_blobs (path, refs) VALUES (?, 1) ON CONFLICT (path) DO UPDATE SET refs = refs + 1",
+                [(path,) for path in paths - old]
+            )
+            for path in old - paths:
+                conn.execute("UPDATE bill_blobs SET refs = refs - 1 WHERE path = ?", (path,))
+                if conn.execute("DELETE FROM bill_blobs WHERE path = ? AND refs <= 0", (path,)).rowcount:
+                    released.append(path)
+            if paths:
+                conn.execute(
+                    "INSERT OR REPLACE INTO bill_blob_claims (claim_ref, paths) VALUES (?, ?)",
+                    (ref, json.dumps(sorted(paths)))
+                )
+            else:
+                conn.execute("DELETE FROM bill_blob_claims WHERE claim_ref = ?", (ref,))
+        return released
+
+    def _reset(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM bill_blobs")
+            conn.execute("DELETE FROM bill_blob_claims")
+
+
+class FirestoreBillBlobRefs(BillBlobRefs):
+    """bill_blobs/{path} count documents, updated in a transaction with the claim's bill_blob_claims/{ref}"""
+
+    name = 'firebase'
+    COLLECTION = 'bill_blobs'
+    CLAIMS_COLLECTION = 'bill_blob_claims'
+
+    def __init__(self, db):
+        self.db = db
+
+    def _blob_ref(self, path):
+        # Document ids can't contain '/'
+        return self.db.collection(self.COLLECTION).document(quote(path, safe=''))
+
+    def refs(self, path):
+        snapshot = self._blob_ref(path).get()
+        return (snapshot.to_dict() or {}).get('refs', 0) if snapshot.exists else 0
+
+    def _replace(self, ref, paths):
+        from firebase_admin import firestore
+
+        claim_ref = self.db.collection(self.CLAIMS_COLLECTION).document(ref)
+
+        @firestore.transactional
+        def apply(transaction):
+            released = []
+            snapshot = claim_ref.get(transaction=transaction)
+            old = set((snapshot.to_dict() or {}).get('paths') or []) if snapshot.exists else set()
+            # Transactions read before they write: fetch the counts about to drop first
+            dropping = {path: self._blob_ref(path).get(transaction=transaction) for path in old - paths}
+            for path in paths - old:
+                transaction.set(self._blob_ref(path), {'path': path, 'refs': firestore.Increment(1)}, merge=True)
+            for path, blob_snapshot in dropping.items():
+                count = (blob_snapshot.to_dict() or {}).get('refs', 0) if blob_snapshot.exists else 0
+                if count <= 1:
+                    transaction.delete(self._blob_ref(path))
+                    released.append(path)
+                else:
+                    transaction.update(self._blob_ref(path), {'refs': firestore.Increment(-1)})
+            if paths:
+                transaction.set(claim_ref, {'paths': sorted(paths)})
+            elif snapshot.exists:
+                transaction.delete(claim_ref)
+            return released
+
+        return apply(self.db.transaction())
+
+    def _reset(self):
+        for collection in (self.COLLECTION, self.CLAIMS_COLLECTION):
+            batch, pending = self.db.batch(), 0
+            for doc in self.db.collection(collection).stream():
+                batch.delete(doc.reference)
+                pending += 1
+                if pending == 400:
+                    batch.commit()
+                    batch, pending = self.db.batch(), 0
+            if pending:
+                batch.commit()
+
+    def _build_ref(self, claim):
+        # Claims read back from Firestore carry their document id, which is what the API addresses
+        return claim.get('id') or claim_key(claim)
+
+
+def create_bill_blob_refs(repository):
+    """Blob reference counts stored alongside the given claim repository"""
+    if repository.name == 'firebase':
+        return FirestoreBillBlobRefs(repository.db)
+    if repository.name == 'sqlite':
+        return SQLiteBillBlobRefs(repository.db_path)
+    blob_refs = InMemoryBillBlobRefs()
+    blob_refs.build(repository.iter_claims())
+    # Claims written by other workers reach the JSON store's in-memory mirror through its listeners
+    if hasattr(repository, 'listeners'):
+        repository.listeners.append(blob_refs)
+    return blob_refs
@@ -0,0 +1,63 @@
+import math
+import time
+
+from PIL import Image
+
+
+# PDF user space is 72 points per inch
+POINTS_PER_INCH = 72.0
+
+
+def choose_scale(width_pt, height_pt, target_pixels, min_scale=1.0, max_scale=4.0):
+    """Zoom factor that renders a page close to target_pixels in total.
+
+    A receipt-sized page gets a higher zoom than an A4 invoice so both end
+    up with roughly the same pixel budget, which is what the vision model
+    actually consumes.
+    """
+    area = max(width_pt * height_pt, 1.0)
+    scale = math.sqrt(target_pixels / area)
+    return max(min_scale, min(scale, max_scale))
+
+
+def rasterize_pdf(file_data, max_pages=5, target_pixels=2_500_000, min_scale=1.0, max_scale=4.0, transform=None):
+    """Render up to max_pages pages of a PDF to RGB PIL images in-process.
+
+    Uses a single PyMuPDF document handle for every page and builds the PIL
+    image straight from the pixmap samples (no PNG round trip, no poppler
+    subprocess). Each page is passed to `transform` (e.g. JPEG encoding) as
+    soon as it is rendered and only its result is kept, so at most one
+    page bitmap is alive at a time; without a transform the images
+    themselves are returned. Returns (pages, timings) where timings holds
+    the open time and per-page render time/zoom.
+    """
+    import fitz  # PyMuPDF
+
+    timings = {'open_ms': 0.0, 'pages': [], 'page_count': 0}
+    pages = []
+
+    start = time.perf_counter()
+    with fitz.open(stream=file_data, filetype="pdf") as document:
+        timings['open_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        timings['page_count'] = document.page_count
+
+        for page_number in range(min(document.page_count, max_pages)):
+            page_start = time.perf_counter()
+            page = document.load_page(page_number)
+            rect = page.rect
+            scale = choose_scale(rect.width, rect.height, target_pixels, min_scale, max_scale)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False, colorspace=fitz.csRGB)
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            timings['pages'].append({
+                'page': page_number + 1,
+                'scale': round(scale, 3),
+                'dpi': round(scale * POINTS_PER_INCH),
+                'pixels': pix.width * pix.height,
+                'ms': round((time.perf_counter() - page_start) * 1000, 2)
+            })
+            # The image holds its own copy of the samples; drop the pixmap before transforming it
+            del pix
+            pages.append(transform(image) if transform else image)
+            del image
+
+    return pages, timings
@@ -0,0 +1,134 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from claim_repository import claim_employee_email
+from duplicate_index import claim_key
+
+# Scope of the whole local store, whose listings are not filtered by owner
+ALL_CLAIMS = 'all'
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'mimetype', 'etag', 'versions', 'expires'])
+
+
+def owner_scope(owner):
+    """Scope of one user's claim listings (the whole store when owner is None)"""
+    return f"owner:{owner.strip().lower()}" if owner else ALL_CLAIMS
+
+
+def claim_scope(ref):
+    return f"claim:{ref}"
+
+
+def claim_scopes(claim, ref=None):
+    """Every scope a write to this claim makes stale"""
+    scopes = {ALL_CLAIMS}
+    if claim is not None:
+        email = claim_employee_email(claim)
+        if email:
+            scopes.add(owner_scope(email))
+        if claim_key(claim):
+            scopes.add(claim_scope(claim_key(claim)))
+    if ref:
+        scopes.add(claim_scope(ref))
+    return scopes
+
+
+class ClaimReadCache:
+    """Per-viewer read-through cache of rendered claim reads.
+
+    Entries are keyed by (viewer, URL) and remember the version of each
+    scope they were read from: an owner's listings or a single claim. A
+    write bumps its scopes (`invalidate`), retiring every dependent entry
+    without scanning. `ttl` bounds staleness from writes made by other
+    processes and `max_entries` bounds memory (LRU). The ETag is made of
+    the scope versions plus a digest of the body taken when the entry was
+    filled, so a revalidation hit costs neither a store read nor a
+    serialization. Can be a JsonLogClaimRepository listener.
+    """
+
+    def __init__(self, max_entries=2048, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # Versions come from one counter, so a bump always moves a scope past any recorded value;
+        # scopes evicted from the bounded table read as `_floor`, which only ever grows
+        self._versions = OrderedDict()
+        self._counter = itertools.count(1)
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'evictions': 0}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _version(self, scope):
+        return self._versions.get(scope, self._floor)
+
+    def versions(self, scopes):
+        """Current versions of `scopes`; take them before reading the store, then pass them to `put`"""
+        with self._lock:
+            return tuple(sorted((scope, self._version(scope)) for scope in scopes))
+
+    def get(self, key, scopes):
+        """The live entry for key, or None if it expired or any of its scopes changed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.expires < time.monotonic()
+                or {scope for scope, _version in entry.versions} != set(scopes)
+                or any(self._version(scope) != version for scope, version in entry.versions)
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key, versions, body, mimetype):
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        version = max((version for _scope, version in versions), default=0)
+        entry = CachedResponse(body, mimetype, f"{version}-{digest}", versions, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return entry
+
+    def invalidate(self, *scopes):
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = next(self._counter)
+                self._versions.move_to_end(scope)
+            while len(self._versions) > self.max_entries * 4:
+                _scope, version = self._versions.popitem(last=False)
+                self._floor = max(self._floor, version)
+            self.stats['invalidations'] += len(scopes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Listener interface: claims changed by other workers on the JSON store
+
+    def add_claim(self, claim, ref=None):
+        self.invalidate(*claim_scopes(claim, ref))
+
+    def remove_claim(self, ref):
+        self.invalidate(*claim_scopes(None, ref))
+
+    def build(self, claims):
+        self.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), scopes=len(self._versions), ttl=self.ttl)
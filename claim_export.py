@@ -0,0 +1,212 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from claim_repository import claim_department, claim_employee_email, claim_status, claim_submission_date
+from duplicate_index import claim_key
+
+# (header, row key) in export order; one row per bill/transaction
+EXPORT_COLUMNS = [
+    ('Claim ID', 'claim_id'),
+    ('Employee Name', 'employee_name'),
+    ('Employee Email', 'employee_email'),
+    ('Department', 'department'),
+    ('Submitted', 'submission_date'),
+    ('Status', 'status'),
+    ('Bill Date', 'bill_date'),
+    ('Bill Number', 'bill_number'),
+    ('Vendor', 'vendor_name'),
+    ('Category', 'category'),
+    ('Amount', 'amount'),
+    ('OCR Amount', 'ocr_amount'),
+    ('Amount Changed', 'change_flag'),
+    ('Duplicate', 'duplicate_detected'),
+    ('Possible Duplicate', 'possible_duplicate'),
+    ('Needs Review', 'needs_review')
+]
+
+# Rows buffered per chunk handed to the WSGI server
+CHUNK_ROWS = 500
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_export_rows(claims):
+    """Flatten claims in either schema into one dict per bill, dropping OCR blobs"""
+    for claim in claims:
+        employee_details = claim.get('employee_details') or {}
+        base = {
+            'claim_id': claim_key(claim),
+            'employee_name': employee_details.get('employee_name') or employee_details.get('form_filled_by') or '',
+            'employee_email': claim_employee_email(claim) or '',
+            'department': claim_department(claim) or '',
+            'submission_date': claim_submission_date(claim) or '',
+            'status': claim_status(claim) or ''
+        }
+        # Legacy schema: bill fields are the OCR output, change_flag was set at submission
+        for bill in claim.get('bills') or []:
+            yield dict(
+                base,
+                bill_date=bill.get('bill_date') or '',
+                bill_number=bill.get('bill_number') or '',
+                vendor_name=bill.get('vendor_name') or '',
+                category=bill.get('transaction_category') or '',
+                amount=_number(bill.get('amount')),
+                ocr_amount=_number(bill.get('amount')),
+                change_flag=bool(bill.get('change_flag')),
+                duplicate_detected=bool(bill.get('duplicate_detected')),
+                possible_duplicate=bool(bill.get('possible_duplicate')),
+                needs_review=bool(bill.get('needs_review'))
+            )
+        # Current schema: entered values with the OCR output alongside
+        for transaction in claim.get('transactions') or []:
+            extracted = transaction.get('extracted_details') or {}
+            amount = _number(transaction.get('amount'))
+            ocr_amount = _number(extracted.get('amount'))
+            yield dict(
+                base,
+                bill_date=transaction.get('bill_date') or extracted.get('bill_date') or '',
+                bill_number=transaction.get('bill_number') or extracted.get('bill_number') or '',
+                vendor_name=extracted.get('vendor_name') or '',
+                category=transaction.get('transaction_category') or extracted.get('transaction_category') or '',
+                amount=amount,
+                ocr_amount=ocr_amount,
+                change_flag=amount is not None and ocr_amount is not None and abs(amount - ocr_amount) > 0.01,
+                duplicate_detected=bool(transaction.get('duplicate_detected')),
+                possible_duplicate=bool(transaction.get('possible_duplicate')),
+                needs_review=(_number(extracted.get('confidence_score')) or 100) < 85
+            )
+
+
+class _ChunkBuffer:
+    """Write-only file object whose contents are drained between yields"""
+
+    def __init__(self, empty=b''):
+        self._empty = empty
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self._empty.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    # Keep spreadsheet apps from evaluating user-entered text as a formula
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    """Yield CSV text in chunks of CHUNK_ROWS rows"""
+    buffer = _ChunkBuffer('')
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _key in EXPORT_COLUMNS])
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_value(row[key]) for _header, key in EXPORT_COLUMNS])
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.drain()
+            pending = 0
+    yield buffer.drain()
+
+
+# Characters XML 1.0 does not allow, which would make Excel reject the sheet
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>'
+    text = escape(_XML_ILLEGAL.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(rows, sheet_name='Claims'):
+    """Yield an .xlsx workbook in chunks without building it in memory.
+
+    The worksheet uses inline strings (no shared string table to hold) and
+    zipfile writes to a non-seekable buffer using data descriptors, so only
+    one chunk of compressed rows is held at a time.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _ROOT_RELS)
+        workbook.writestr('xl/workbook.xml', _WORKBOOK.format(name=escape(sheet_name)))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row([header for header, _key in EXPORT_COLUMNS]).encode('utf-8'))
+            pending = 0
+            for row in rows:
+                sheet.write(_xlsx_row([row[key] for _header, key in EXPORT_COLUMNS]).encode('utf-8'))
+                pending += 1
+                if pending >= CHUNK_ROWS:
+                    yield buffer.drain()
+                    pending = 0
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
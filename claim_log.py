@@ -0,0 +1,236 @@
+import os
+import json
+import shutil
+import threading
+import logging
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock; fall back to in-process locking only
+    fcntl = None
+
+from duplicate_index import claim_key
+
+logger = logging.getLogger(__name__)
+
+
+class ClaimLog:
+    """Crash-safe claim storage: a JSON snapshot plus an append-only JSONL log.
+
+    Every change is appended to the log as one fsync'd line (`put` with the
+    full claim, or a `delete` tombstone), so writes cost O(claim) instead of
+    re-serializing the whole history. Once the log grows past
+    `compact_bytes` it is folded into the snapshot in a background thread.
+    The snapshot is replaced atomically, so a crash can never truncate it.
+    An flock on a sidecar lock file serializes writers across worker
+    processes; readers replay only the log tail they have not seen yet.
+    """
+
+    def __init__(self, snapshot_path, log_path=None, compact_bytes=4 * 1024 * 1024):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path or f"{os.path.splitext(snapshot_path)[0]}.log"
+        self.lock_path = f"{snapshot_path}.lock"
+        self.compact_bytes = compact_bytes
+        self._thread_lock = threading.RLock()
+        self._compacting = False
+        self._snapshot_signature = None
+        self._offset = 0
+
+    def _locked(self, exclusive):
+        return _FileLock(self.lock_path, self._thread_lock, exclusive)
+
+    def _signature(self):
+        try:
+            st = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return []
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            # Keep the damaged file for manual recovery before it is ever rewritten
+            corrupt_path = f"{self.snapshot_path}.corrupt"
+            logger.error("Error loading claims snapshot: %s", e)
+            if not os.path.exists(corrupt_path):
+                shutil.copyfile(self.snapshot_path, corrupt_path)
+                logger.warning("Damaged snapshot preserved as %s", corrupt_path)
+            return []
+
+    def _read_log(self, offset):
+        """Return (ops, new_offset) for complete log lines after offset"""
+        ops = []
+        try:
+            with open(self.log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return ops, 0
+
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping damaged claim log record")
+        return ops, offset + end
+
+    @staticmethod
+    def apply(claims, ops):
+        """Apply log ops to an id -> claim dict in place"""
+        for op in ops:
+            if op.get('op') == 'put':
+                claims[op['id']] = op['claim']
+            elif op.get('op') == 'delete':
+                claims.pop(op['id'], None)
+        return claims
+
+    @staticmethod
+    def _by_id(claims):
+        by_id = {}
+        for n, claim in enumerate(claims):
+            # Claims without any id still need a stable slot
+            by_id[claim_key(claim) or f"__anonymous_{n}"] = claim
+        return by_id
+
+    def load(self):
+        """Load all claims from the snapshot and replay the log tail"""
+        with self._locked(exclusive=False):
+            claims = self._by_id(self._read_snapshot())
+            ops, self._offset = self._read_log(0)
+            self._snapshot_signature = self._signature()
+        return list(self.apply(claims, ops).values())
+
+    def read_tail(self):
+        """Return ops appended (by any process) since the last load/read_tail.
+
+        Returns None when the snapshot has been compacted by another process
+        since we last loaded it; the caller must then do a full load().
+        """
+        with self._locked(exclusive=False):
+            if self._signature() != self._snapshot_signature:
+                return None
+            ops, self._offset = self._read_log(self._offset)
+        return ops
+
+    def append_put(self, claim):
+        """Durably record a new or updated claim"""
+        self._append({'op': 'put', 'id': claim_key(claim), 'claim': claim})
+
+    def append_delete(self, claim_id):
+        """Durably record a deletion tombstone"""
+        self._append({'op': 'delete', 'id': claim_id})
+
+    def _append(self, op):
+        line = json.dumps(op, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+        with self._locked(exclusive=True):
+            with open(self.log_path, 'ab') as f:
+                size = f.tell()
+                # A crash mid-append can leave a partial line; start a fresh one after it
+                if size and not self._ends_with_newline():
+                    f.write(b'\n')
+                    size += 1
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            # Our own write is already applied in memory; skip it on the next tail read
+            if size == self._offset:
+                self._offset = size + len(line)
+            log_size = size + len(line)
+
+        if log_size >= self.compact_bytes:
+            self.compact_in_background()
+
+    def _ends_with_newline(self):
+        with open(self.log_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        with self._thread_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_worker, name='claim-log-compaction', daemon=True).start()
+
+    def _compact_worker(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error("Claim log compaction failed: %s", e)
+        finally:
+            with self._thread_lock:
+                self._compacting = False
+
+    def compact(self):
+        """Fold the log into a new snapshot and truncate the log"""
+        with self._locked(exclusive=True):
+            claims = self._by_id(self._read_snapshot())
+            ops, log_end = self._read_log(0)
+            caught_up = self._snapshot_signature == self._signature() and self._offset == log_end
+            self.apply(claims, ops)
+            self._write_snapshot(list(claims.values()))
+            with open(self.log_path, 'wb') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            # If we had already applied everything, our in-memory view is still current
+            if caught_up:
+                self._snapshot_signature = self._signature()
+                self._offset = 0
+
+    def _write_snapshot(self, claims):
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(claims, f, indent=2, ensure_ascii=False, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+class _FileLock:
+    """Thread lock plus an inter-process flock on a sidecar file"""
+
+    def __init__(self, path, thread_lock, exclusive):
+        self.path = path
+        self.thread_lock = thread_lock
+        self.exclusive = exclusive
+        self._file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                self._file = open(self.path, 'a')
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+            except Exception:
+                self._release_file()
+                self.thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        self._release_file()
+        self.thread_lock.release()
+        return False
+
+    def _release_file(self):
+        if self._file is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self._file.close()
+                self._file = None
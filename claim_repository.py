@@ -0,0 +1,713 @@
+import os
+import json
+import base64
+import sqlite3
+import threading
+import logging
+
+from claim_log import ClaimLog
+from duplicate_index import claim_key
+
+logger = logging.getLogger(__name__)
+
+
+def claim_employee_email(claim):
+    """Submitter email in either claim schema"""
+    return ((claim.get('employee_details') or {}).get('employee_email') or '').strip().lower() or None
+
+
+def claim_status(claim):
+    """Current status in either claim schema"""
+    status = claim.get('status')
+    if isinstance(status, dict):
+        return status.get('current_status')
+    return claim.get('overall_status') or status
+
+
+def claim_department(claim):
+    """Department in either claim schema"""
+    return (claim.get('employee_details') or {}).get('department') or None
+
+
+def claim_submission_date(claim):
+    """ISO submission timestamp in either claim schema"""
+    status = claim.get('status')
+    if isinstance(status, dict) and status.get('submission_date'):
+        return status['submission_date']
+    return claim.get('timestamp')
+
+
+def claim_total_amount(claim):
+    """Claimed total in either claim schema"""
+    form_details = claim.get('form_details') or {}
+    if form_details.get('total_amount') is not None:
+        return float(form_details['total_amount'] or 0)
+    return sum(float(bill.get('amount') or 0) for bill in claim.get('bills') or [])
+
+
+CLAIM_STATUSES = ('pending', 'approved', 'rejected', 'partially_approved', 'needs_review')
+
+
+def apply_status_change(claim, status, history_entry):
+    """Set the claim's current status in place and record the change in its approval history"""
+    if isinstance(claim.get('status'), dict):
+        claim['status']['current_status'] = status
+        claim['status']['last_updated'] = history_entry['at']
+        claim['status'].setdefault('approval_history', []).append(history_entry)
+    else:
+        claim['overall_status'] = status
+        claim.setdefault('approval_history', []).append(history_entry)
+    return claim
+
+
+def encode_cursor(position):
+    """Opaque, URL-safe page cursor"""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or 'id' not in position:
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def _date_upper_bound(date_to):
+    """Inclusive upper bound for ISO timestamps on a YYYY-MM-DD day"""
+    return f"{date_to}T23:59:59.999999"
+
+
+def claim_matches(claim, status=None, department=None, date_from=None, date_to=None):
+    """True if the claim passes the listing filters"""
+    if status and claim_status(claim) != status:
+        return False
+    if department and claim_department(claim) != department:
+        return False
+    submitted = claim_submission_date(claim) or ''
+    if date_from and submitted < date_from:
+        return False
+    if date_to and submitted > _date_upper_bound(date_to):
+        return False
+    return True
+
+
+class ClaimRepository:
+    """Storage interface for reimbursement claims.
+
+    Implementations: Firestore (primary when configured), SQLite, the
+    JSON snapshot + log store, and an in-memory store for tests/benchmarks.
+    Claims are addressed by their `claim_id` (or legacy `id`); Firestore
+    additionally accepts its document id.
+    """
+
+    name = 'base'
+
+    def add_claim(self, claim):
+        """Persist a new claim and return its id"""
+        raise NotImplementedError
+
+    def add_claims(self, claims):
+        """Persist many claims, replacing any stored under the same id (backfills)"""
+        for claim in claims:
+            self.add_claim(claim)
+
+    def get_claim(self, claim_id):
+        """Return a single claim or None"""
+        raise NotImplementedError
+
+    def delete_claim(self, claim_id):
+        """Delete a claim and return the deleted claim, or None if it did not exist"""
+        raise NotImplementedError
+
+    def list_claims(self, user_email=None):
+        """Return claims, newest first, optionally only those submitted by user_email"""
+        raise NotImplementedError
+
+    def query_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None,
+                     limit=50, cursor=None):
+        """Return (claims, next_cursor) for one page of claims, newest first.
+
+        Filters are applied by the store; `cursor` is the opaque value
+        returned with the previous page (None for the first page).
+        """
+        raise NotImplementedError
+
+    def summarize_claims(self, user_email=None, department=None, date_from=None, date_to=None):
+        """Return {'total': n, 'by_status': {status: n}} without loading claims"""
+        raise NotImplementedError
+
+    def stream_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None):
+        """Iterate over filtered claims without loading them all (exports)"""
+        user_email = user_email.strip().lower() if user_email else None
+        for claim in self.iter_claims():
+            if user_email and claim_employee_email(claim) != user_email:
+                continue
+            if claim_matches(claim, status, department, date_from, date_to):
+                yield claim
+
+    def update_status(self, claim_id, status, history_entry):
+        """Change a claim's status, appending history_entry; returns the updated claim or None"""
+        claim = self.get_claim(claim_id)
+        if claim is None:
+            return None
+        apply_status_change(claim, status, history_entry)
+        self.add_claim(claim)
+        return claim
+
+    def iter_claims(self):
+        """Iterate over every stored claim (used to build in-memory indexes)"""
+        return iter(self.list_claims())
+
+    def count(self):
+        """Number of stored claims"""
+        return sum(1 for _ in self.iter_claims())
+
+
+def _sort_key(claim):
+    return (claim_submission_date(claim) or '', claim_key(claim) or '')
+
+
+def _newest_first(claims):
+    return sorted(claims, key=_sort_key, reverse=True)
+
+
+class InMemoryClaimRepository(ClaimRepository):
+    """Process-local claim store with no persistence"""
+
+    name = 'memory'
+
+    def __init__(self, claims=None):
+        self._claims = {}
+        self._lock = threading.Lock()
+        for claim in claims or []:
+            self.add_claim(claim)
+
+    def add_claim(self, claim):
+        with self._lock:
+            self._claims[claim_key(claim)] = claim
+        return claim_key(claim)
+
+    def get_claim(self, claim_id):
+        with self._lock:
+            return self._claims.get(claim_id)
+
+    def delete_claim(self, claim_id):
+        with self._lock:
+            return self._claims.pop(claim_id, None)
+
+    def list_claims(self, user_email=None):
+        with self._lock:
+            claims = list(self._claims.values())
+        if user_email:
+            user_email = user_email.strip().lower()
+            claims = [claim for claim in claims if claim_employee_email(claim) == user_email]
+        return _newest_first(claims)
+
+    def query_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None,
+                     limit=50, cursor=None):
+        position = decode_cursor(cursor)
+        claims = [
+            claim for claim in self.list_claims(user_email)
+            if claim_matches(claim, status, department, date_from, date_to)
+        ]
+        if position:
+            after = (position.get('d') or '', position['id'])
+            claims = [claim for claim in claims if _sort_key(claim) < after]
+        page = claims[:limit]
+        next_cursor = None
+        if len(claims) > limit:
+            last_date, last_id = _sort_key(page[-1])
+            next_cursor = encode_cursor({'d': last_date, 'id': last_id})
+        return page, next_cursor
+
+    def summarize_claims(self, user_email=None, department=None, date_from=None, date_to=None):
+        by_status = {}
+        total = 0
+        for claim in self.list_claims(user_email):
+            if claim_matches(claim, None, department, date_from, date_to):
+                total += 1
+                status = claim_status(claim) or 'unknown'
+                by_status[status] = by_status.get(status, 0) + 1
+        return {'total': total, 'by_status': by_status}
+
+    def iter_claims(self):
+        with self._lock:
+            return iter(list(self._claims.values()))
+
+    def count(self):
+        with self._lock:
+            return len(self._claims)
+
+
+class JsonLogClaimRepository(InMemoryClaimRepository):
+    """claims_data.json snapshot + append-only log, mirrored in memory.
+
+    Reads are served from memory after replaying any log records appended by
+    other worker processes. `listeners` (objects with add_claim/remove_claim,
+    such as the duplicate index) are told about those foreign changes.
+    """
+
+    name = 'json'
+
+    def __init__(self, snapshot_path, compact_bytes=4 * 1024 * 1024, listeners=None):
+        self.claim_log = ClaimLog(snapshot_path, compact_bytes=compact_bytes)
+        self.listeners = list(listeners or [])
+        super().__init__()
+        self._load()
+
+    def _load(self):
+        try:
+            claims = self.claim_log.load()
+        except IOError as e:
+            logger.error("Error loading claims data: %s", e)
+            claims = []
+        with self._lock:
+            self._claims = {}
+            for n, claim in enumerate(claims):
+                self._claims[claim_key(claim) or f"__anonymous_{n}"] = claim
+
+    def refresh(self):
+        """Replay log records written by other workers since our last read"""
+        ops = self.claim_log.read_tail()
+        if ops is None:
+            # Another worker compacted the snapshot; reload it in full
+            self._load()
+            for listener in self.listeners:
+                listener.build(super().iter_claims())
+            return
+
+        with self._lock:
+            ClaimLog.apply(self._claims, ops)
+        for op in ops:
+            for listener in self.listeners:
+                if op['op'] == 'put':
+                    listener.add_claim(op['claim'])
+                else:
+                    listener.remove_claim(op['id'])
+
+    def add_claim(self, claim):
+        self.claim_log.append_put(claim)
+        return super().add_claim(claim)
+
+    def get_claim(self, claim_id):
+        self.refresh()
+        return super().get_claim(claim_id)
+
+    def delete_claim(self, claim_id):
+        self.refresh()
+        claim = super().delete_claim(claim_id)
+        if claim is not None:
+            self.claim_log.append_delete(claim_id)
+        return claim
+
+    def list_claims(self, user_email=None):
+        self.refresh()
+        return super().list_claims(user_email)
+
+    def iter_claims(self):
+        self.refresh()
+        return super().iter_claims()
+
+    def count(self):
+        self.refresh()
+        return super().count()
+
+    def compact(self):
+        """Fold the log into a fresh snapshot"""
+        self.claim_log.compact()
+
+
+class SQLiteClaimRepository(ClaimRepository):
+    """SQLite claim store (WAL mode) with indexed lookup columns.
+
+    The full claim is kept as a JSON document; the columns pulled out of it
+    exist only to be indexed and filtered on.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS claims (
+            claim_id TEXT PRIMARY KEY,
+            employee_email TEXT,
+            status TEXT,
+            department TEXT,
+            submission_date TEXT,
+            data TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_claims_employee_email ON claims (employee_email, submission_date)",
+        "CREATE INDEX IF NOT EXISTS idx_claims_status ON claims (status)",
+        "CREATE INDEX IF NOT EXISTS idx_claims_department ON claims (department)",
+        "CREATE INDEX IF NOT EXISTS idx_claims_submission_date ON claims (submission_date)"
+    ]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        """Per-thread connection (sqlite3 connections must not be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_values(claim):
+        return (
+            claim_key(claim),
+            claim_employee_email(claim),
+            claim_status(claim),
+            claim_department(claim),
+            claim_submission_date(claim) or '',
+            json.dumps(claim, ensure_ascii=False, default=str)
+        )
+
+    def add_claim(self, claim):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO claims (claim_id, employee_email, status, department, submission_date, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._row_values(claim)
+            )
+        return claim_key(claim)
+
+    def add_claims(self, claims):
+        """Insert many claims in a single transaction"""
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO claims (claim_id, employee_email, status, department, submission_date, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._row_values(claim) for claim in claims)
+            )
+
+    def get_claim(self, claim_id):
+        row = self._connection().execute("SELECT data FROM claims WHERE claim_id = ?", (claim_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_claim(self, claim_id):
+        with self._connection() as conn:
+            row = conn.execute("SELECT data FROM claims WHERE claim_id = ?", (claim_id,)).fetchone()
+            if not row:
+                return None
+            conn.execute("DELETE FROM claims WHERE claim_id = ?", (claim_id,))
+        return json.loads(row[0])
+
+    def list_claims(self, user_email=None):
+        if user_email:
+            rows = self._connection().execute(
+                "SELECT data FROM claims WHERE employee_email = ? ORDER BY submission_date DESC",
+                (user_email.strip().lower(),)
+            )
+        else:
+            rows = self._connection().execute("SELECT data FROM claims ORDER BY submission_date DESC")
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _where(user_email=None, status=None, department=None, date_from=None, date_to=None):
+        clauses, params = [], []
+        if user_email:
+            clauses.append("employee_email = ?")
+            params.append(user_email.strip().lower())
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if department:
+            clauses.append("department = ?")
+            params.append(department)
+        if date_from:
+            clauses.append("submission_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("submission_date <= ?")
+            params.append(_date_upper_bound(date_to))
+        return clauses, params
+
+    def query_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None,
+                     limit=50, cursor=None):
+        position = decode_cursor(cursor)
+        clauses, params = self._where(user_email, status, department, date_from, date_to)
+        if position:
+            # Keyset pagination: continue strictly after the last row of the previous page
+            clauses.append("(submission_date < ? OR (submission_date = ? AND claim_id < ?))")
+            params.extend([position.get('d') or '', position.get('d') or '', position['id']])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f"SELECT claim_id, submission_date, data FROM claims {where} "
+            "ORDER BY submission_date DESC, claim_id DESC LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({'d': rows[-1][1], 'id': rows[-1][0]})
+        return [json.loads(row[2]) for row in rows], next_cursor
+
+    def summarize_claims(self, user_email=None, department=None, date_from=None, date_to=None):
+        clauses, params = self._where(user_email, None, department, date_from, date_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f"SELECT COALESCE(status, 'unknown'), COUNT(*) FROM claims {where} GROUP BY status",
+            params
+        ).fetchall()
+        by_status = {status: count for status, count in rows}
+        return {'total': sum(by_status.values()), 'by_status': by_status}
+
+    def stream_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None):
+        clauses, params = self._where(user_email, status, department, date_from, date_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        # Iterating the cursor steps through rows; nothing is fetched ahead
+        for row in self._connection().execute(
+            f"SELECT data FROM claims {where} ORDER BY submission_date DESC, claim_id DESC", params
+        ):
+            yield json.loads(row[0])
+
+    def iter_claims(self):
+        for row in self._connection().execute("SELECT data FROM claims"):
+            yield json.loads(row[0])
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+
+
+class FirestoreClaimRepository(ClaimRepository):
+    """Claims stored in the `reimbursement_claims` Firestore collection"""
+
+    name = 'firebase'
+    COLLECTION = 'reimbursement_claims'
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def collection(self):
+        return self.db.collection(self.COLLECTION)
+
+    @staticmethod
+    def _from_doc(doc):
+        claim_data = doc.to_dict()
+        claim_data['id'] = doc.id
+        return claim_data
+
+    def add_claim(self, claim):
+        from firebase_admin import firestore
+
+        # Add timestamps on a copy so the caller's dict stays JSON-serializable
+        document = dict(claim)
+        document['created_at'] = firestore.SERVER_TIMESTAMP
+        document['updated_at'] = firestore.SERVER_TIMESTAMP
+        # Keyed by claim_id so add_claims (backfills) upserts the same document
+        doc_id = claim_key(claim)
+        if doc_id is None:
+            return self.collection.add(document)[1].id
+        self.collection.document(doc_id).set(document)
+        return doc_id
+
+    # Firestore allows 500 writes and 10 MiB per commit; stay under both
+    BATCH_WRITES = 500
+    BATCH_BYTES = 9 * 1024 * 1024
+    # Values allowed in one `in` filter
+    IN_QUERY_LIMIT = 30
+
+    def _existing_doc_ids(self, claim_ids):
+        """{claim_id: document id} for claims already stored under another document id.
+
+        Claims submitted before add_claim keyed documents by claim_id live
+        under auto-generated ids; writing them under their claim_id would
+        duplicate them.
+        """
+        claim_ids = list(dict.fromkeys(claim_ids))
+        doc_ids = {}
+        for start in range(0, len(claim_ids), self.IN_QUERY_LIMIT):
+            chunk = claim_ids[start:start + self.IN_QUERY_LIMIT]
+            for doc in self.collection.where('claim_id', 'in', chunk).select(['claim_id']).stream():
+                claim_id = (doc.to_dict() or {}).get('claim_id')
+                if claim_id and doc.id != claim_id:
+                    doc_ids.setdefault(claim_id, doc.id)
+        return doc_ids
+
+    def add_claims(self, claims):
+        """Upsert claims in as few batched commits as the limits allow.
+
+        A claim read from Firestore keeps its document `id`; any other claim
+        is written to the document already holding its claim_id, or else
+        under its claim_id, so a backfill of claims the app already mirrored
+        (or a re-run) overwrites instead of duplicating. `created_at` falls
+        back to the submission date so imported claims sort by when they
+        were submitted.
+        """
+        from datetime import datetime
+        from firebase_admin import firestore
+
+        claims = list(claims)
+        existing = self._existing_doc_ids(
+            claim['claim_id'] for claim in claims if not claim.get('id') and claim.get('claim_id')
+        )
+        batch, writes, size = self.db.batch(), 0, 0
+        for claim in claims:
+            document = dict(claim)
+            doc_id = document.pop('id', None) or existing.get(claim.get('claim_id')) or claim_key(claim)
+            if 'created_at' not in document:
+                try:
+                    document['created_at'] = datetime.fromisoformat(claim_submission_date(claim))
+                except (TypeError, ValueError):
+                    document['created_at'] = firestore.SERVER_TIMESTAMP
+            document['updated_at'] = firestore.SERVER_TIMESTAMP
+            document_size = len(json.dumps(document, default=str))
+            if writes and (writes >= self.BATCH_WRITES or size + document_size > self.BATCH_BYTES):
+                batch.commit()
+                batch, writes, size = self.db.batch(), 0, 0
+            batch.set(self.collection.document(doc_id), document)
+            writes += 1
+            size += document_size
+        if writes:
+            batch.commit()
+
+    def get_claim(self, claim_id):
+        doc = self.collection.document(claim_id).get()
+        return self._from_doc(doc) if doc.exists else None
+
+    def delete_claim(self, claim_id):
+        doc_ref = self.collection.document(claim_id)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return None
+        doc_ref.delete()
+        return self._from_doc(doc)
+
+    def list_claims(self, user_email=None):
+        from firebase_admin import firestore
+
+        query = self.collection
+        if user_email:
+            query = query.where('employee_details.employee_email', '==', user_email)
+        docs = query.order_by('created_at', direction=firestore.Query.DESCENDING).stream()
+        return [self._from_doc(doc) for doc in docs]
+
+    def _filtered_query(self, user_email=None, status=None, department=None, date_from=None, date_to=None):
+        query = self.collection
+        if user_email:
+            query = query.where('employee_details.employee_email', '==', user_email)
+        if status:
+            query = query.where('status.current_status', '==', status)
+        if department:
+            query = query.where('employee_details.department', '==', department)
+        if date_from:
+            query = query.where('status.submission_date', '>=', date_from)
+        if date_to:
+            query = query.where('status.submission_date', '<=', _date_upper_bound(date_to))
+        return query
+
+    def query_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None,
+                     limit=50, cursor=None):
+        from firebase_admin import firestore
+
+        position = decode_cursor(cursor)
+        query = self._filtered_query(user_email, status, department, date_from, date_to)
+        query = query.order_by('status.submission_date', direction=firestore.Query.DESCENDING)
+        if position:
+            snapshot = self.collection.document(position['id']).get()
+            if not snapshot.exists:
+                raise ValueError("Cursor refers to a claim that no longer exists")
+            query = query.start_after(snapshot)
+        docs = list(query.limit(limit + 1).stream())
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor({'id': docs[-1].id})
+        return [self._from_doc(doc) for doc in docs], next_cursor
+
+    def summarize_claims(self, user_email=None, department=None, date_from=None, date_to=None):
+        # Server-side COUNT aggregations: no claim documents are transferred
+        query = self._filtered_query(user_email, None, department, date_from, date_to)
+        by_status = {}
+        for status in CLAIM_STATUSES:
+            result = query.where('status.current_status', '==', status).count().get()
+            count = result[0][0].value
+            if count:
+                by_status[status] = count
+        total = query.count().get()[0][0].value
+        return {'total': total, 'by_status': by_status}
+
+    def update_status(self, claim_id, status, history_entry):
+        from firebase_admin import firestore
+
+        doc_ref = self.collection.document(claim_id)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return None
+        claim = self._from_doc(doc)
+        if isinstance(claim.get('status'), dict):
+            doc_ref.update({
+                'status.current_status': status,
+                'status.last_updated': history_entry['at'],
+                'status.approval_history': firestore.ArrayUnion([history_entry]),
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+        else:
+            doc_ref.update({
+                'overall_status': status,
+                'approval_history': firestore.ArrayUnion([history_entry]),
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+        return apply_status_change(claim, status, history_entry)
+
+    def stream_claims(self, user_email=None, status=None, department=None, date_from=None, date_to=None,
+                      page_size=500):
+        from firebase_admin import firestore
+
+        query = self._filtered_query(user_email, status, department, date_from, date_to)
+        query = query.order_by('status.submission_date', direction=firestore.Query.DESCENDING)
+        # Page through with start_after rather than one long stream(), which can outlive the RPC deadline
+        last = None
+        while True:
+            page = query.start_after(last) if last is not None else query
+            docs = 0
+            for doc in page.limit(page_size).stream():
+                docs += 1
+                last = doc
+                yield self._from_doc(doc)
+            if docs < page_size:
+                return
+
+    def iter_claims(self):
+        for doc in self.collection.stream():
+            yield self._from_doc(doc)
+
+
+def create_local_repository(backend, json_path, sqlite_path, compact_bytes=4 * 1024 * 1024, listeners=None):
+    """Build the configured non-Firestore claim repository"""
+    if backend == 'sqlite':
+        return SQLiteClaimRepository(sqlite_path)
+    if backend == 'memory':
+        return InMemoryClaimRepository()
+    if backend == 'json':
+        return JsonLogClaimRepository(json_path, compact_bytes=compact_bytes, listeners=listeners)
+    raise ValueError(f"Unknown claim store backend: {backend}")
+
+
+def migrate_json_to_sqlite(json_path, sqlite_path):
+    """One-shot copy of claims_data.json (snapshot + log) into a SQLite store"""
+    claims = ClaimLog(json_path).load()
+    repository = SQLiteClaimRepository(sqlite_path)
+    repository.add_claims(claim for claim in claims if claim_key(claim))
+    skipped = sum(1 for claim in claims if not claim_key(claim))
+    return {'migrated': len(claims) - skipped, 'skipped': skipped, 'total': repository.count()}
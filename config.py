@@ -17,4 +17,138 @@ FIREBASE_MESSAGING_SENDER_ID = os.getenv("FIREBASE_MESSAGING_SENDER_ID", "234251
 FIREBASE_APP_ID = os.getenv("FIREBASE_APP_ID", "1:234251111713:web:8ee95f76e1a2c78d140260")
 
 # Firebase Admin SDK Config
-FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH", "firebase_credentials.json")
\ No newline at end of file
+FIREBASE_CREDENTIALS_PATH = os.getenv("FIREBASE_CREDENTIALS_PATH", "firebase_credentials.json")
+
+# OCR result cache
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "ocr_cache")
+OCR_CACHE_MEMORY_ENTRIES = int(os.getenv("OCR_CACHE_MEMORY_ENTRIES", "512"))
+OCR_CACHE_DISK_MAX_BYTES = int(os.getenv("OCR_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Maximum concurrent bill uploads/OCR calls across all claim submissions
+SUBMIT_MAX_WORKERS = int(os.getenv("SUBMIT_MAX_WORKERS", "8"))
+
+# Background OCR job queue used by /process-bill in async mode. Jobs live in the web process's memory, so
+# job mode needs a single process: with WEB_CONCURRENCY above 1, /process-bill runs OCR inline instead
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "4"))
+OCR_JOB_MAX_DEPTH = int(os.getenv("OCR_JOB_MAX_DEPTH", "64"))
+OCR_JOB_RESULT_TTL = int(os.getenv("OCR_JOB_RESULT_TTL", "600"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Server-sent events stream of OCR job status. Each open stream holds a worker for the whole job, so only
+# enable it under an async (gevent/eventlet) worker; clients otherwise poll the job status endpoint
+OCR_JOB_STREAM = os.getenv("OCR_JOB_STREAM", "False").lower() in ("true", "1", "yes")
+OCR_JOB_STREAM_TIMEOUT = int(os.getenv("OCR_JOB_STREAM_TIMEOUT", "120"))
+
+# Near-duplicate bill detection window (same vendor and amount); 0 disables it
+DUPLICATE_NEAR_WINDOW_DAYS = int(os.getenv("DUPLICATE_NEAR_WINDOW_DAYS", "3"))
+
+# Vendor knowledge base learned from past claims: extracted vendor names are mapped to their canonical
+# name when their trigram similarity reaches the threshold, and a vendor's usual category/product is
+# prefilled once it covers this share of at least this many of its bills
+VENDOR_MATCHING = os.getenv("VENDOR_MATCHING", "True").lower() in ("true", "1", "yes")
+VENDOR_MATCH_THRESHOLD = float(os.getenv("VENDOR_MATCH_THRESHOLD", "0.7"))
+VENDOR_CATEGORY_MIN_BILLS = int(os.getenv("VENDOR_CATEGORY_MIN_BILLS", "3"))
+VENDOR_CATEGORY_MIN_SHARE = float(os.getenv("VENDOR_CATEGORY_MIN_SHARE", "0.6"))
+
+# Fold the append-only claim log into claims_data.json once it reaches this size
+CLAIM_LOG_COMPACT_BYTES = int(os.getenv("CLAIM_LOG_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+# Local claim store used when Firestore is unavailable: json, sqlite or memory
+CLAIM_STORE_BACKEND = os.getenv("CLAIM_STORE_BACKEND", "json")
+CLAIM_STORE_SQLITE_PATH = os.getenv("CLAIM_STORE_SQLITE_PATH", "claims.db")
+
+# Per-viewer cache of claim list/detail responses: seconds an entry may serve writes made by
+# other processes (0 disables the cache) and the maximum number of entries
+CLAIM_CACHE_TTL = float(os.getenv("CLAIM_CACHE_TTL", "30"))
+CLAIM_CACHE_MAX_ENTRIES = int(os.getenv("CLAIM_CACHE_MAX_ENTRIES", "2048"))
+
+# Claims listing pagination
+CLAIMS_PAGE_SIZE = int(os.getenv("CLAIMS_PAGE_SIZE", "25"))
+CLAIMS_PAGE_MAX = int(os.getenv("CLAIMS_PAGE_MAX", "200"))
+
+# PDF rasterization: pages sent to Gemini and the pixel budget per page
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "5"))
+PDF_TARGET_PIXELS = int(os.getenv("PDF_TARGET_PIXELS", "2500000"))
+
+# PDF text-layer fast path: born-digital PDFs parsed locally instead of sent to Gemini when the
+# parse finds amount, date and vendor at this confidence; a fraction is also sent to Gemini to measure accuracy.
+# Off until its accuracy on real bills is measured (benchmarks/pdf_fast_path.py --gemini, then the shadow rate)
+PDF_TEXT_FAST_PATH = os.getenv("PDF_TEXT_FAST_PATH", "False").lower() in ("true", "1", "yes")
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "40"))
+PDF_TEXT_MIN_CONFIDENCE = int(os.getenv("PDF_TEXT_MIN_CONFIDENCE", "80"))
+PDF_TEXT_SHADOW_RATE = float(os.getenv("PDF_TEXT_SHADOW_RATE", "0.05"))
+
+# Image normalization before OCR
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1600"))
+IMAGE_GRAYSCALE = os.getenv("IMAGE_GRAYSCALE", "False").lower() in ("true", "1", "yes")
+IMAGE_CROP_BORDERS = os.getenv("IMAGE_CROP_BORDERS", "False").lower() in ("true", "1", "yes")
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "80"))
+
+# Number of bill images sent to Gemini in one request (1 disables batching)
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "4"))
+
+# Gemini client resilience: per-attempt timeout and overall deadline (seconds), retries,
+# request rate quota, and circuit breaker (consecutive failures / seconds before a probe)
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "60"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+GEMINI_RATE_PER_MINUTE = float(os.getenv("GEMINI_RATE_PER_MINUTE", "60"))
+GEMINI_RATE_BURST = int(os.getenv("GEMINI_RATE_BURST", "10"))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", "30"))
+GEMINI_CALL_WORKERS = int(os.getenv("GEMINI_CALL_WORKERS", "16"))
+
+# Backends: "gemini" or "fake" for OCR, "firebase" or "local" for bill files and claims
+OCR_BACKEND = os.getenv("OCR_BACKEND", "gemini")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firebase")
+
+# Fake OCR backend: median latency, lognormal spread, per-image cost and injected error rate
+FAKE_OCR_LATENCY_MS = float(os.getenv("FAKE_OCR_LATENCY_MS", "800"))
+FAKE_OCR_LATENCY_SIGMA = float(os.getenv("FAKE_OCR_LATENCY_SIGMA", "0.5"))
+FAKE_OCR_PER_IMAGE_MS = float(os.getenv("FAKE_OCR_PER_IMAGE_MS", "100"))
+FAKE_OCR_ERROR_RATE = float(os.getenv("FAKE_OCR_ERROR_RATE", "0"))
+FAKE_OCR_SEED = int(os.getenv("FAKE_OCR_SEED", "0"))
+
+# Local storage backend; the claim store that goes with it lives in its own directory, since
+# LOCAL_STORAGE_DIR is served over HTTP
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "local_storage")
+LOCAL_CLAIM_STORE_DIR = os.getenv("LOCAL_CLAIM_STORE_DIR", "local_claims")
+LOCAL_STORAGE_LATENCY_MS = float(os.getenv("LOCAL_STORAGE_LATENCY_MS", "0"))
+
+# Direct browser uploads: bills go to storage via signed URLs (needs bucket CORS for PUT), the
+# upload URL lifetime and how long its upload token stays valid for /process-bill and /submit-claim
+DIRECT_UPLOADS = os.getenv("DIRECT_UPLOADS", "False").lower() in ("true", "1", "yes")
+UPLOAD_URL_TTL = int(os.getenv("UPLOAD_URL_TTL", "900"))
+UPLOAD_TOKEN_TTL = int(os.getenv("UPLOAD_TOKEN_TTL", "21600"))
+
+# Request trace capture for replay benchmarks (e.g. traces/requests.jsonl); empty disables it
+TRACE_CAPTURE_PATH = os.getenv("TRACE_CAPTURE_PATH", "")
+
+# Logging: level (DEBUG shows per-request pipeline detail) and format ("text" or "json")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+# Bearer token required to scrape /metrics; empty leaves it open (restrict at the proxy)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Comma separated emails allowed to use the admin endpoints (e.g. /admin/profiles)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+# Request profiling: fraction of requests sampled, latency above which a sampled profile is kept,
+# "sample" (stack sampler only) or "cprofile" (plus cProfile of the request thread), sampler
+# interval, and how many profiles the on-disk ring keeps
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_THRESHOLD_MS = float(os.getenv("PROFILE_THRESHOLD_MS", "5000"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_PROFILES = int(os.getenv("PROFILE_MAX_PROFILES", "50"))
+
+# Employee directory: email domains treated as the same mailbox (first one is canonical)
+# and how often (seconds) employee_data.csv is checked for changes
+EMPLOYEE_EMAIL_DOMAINS = [domain.strip().lower() for domain in os.getenv(
+    "EMPLOYEE_EMAIL_DOMAINS", "nxtwave.tech,nxtwave.co.in,nxtwave.in"
+).split(",") if domain.strip()]
+EMPLOYEE_DIRECTORY_CHECK_INTERVAL = float(os.getenv("EMPLOYEE_DIRECTORY_CHECK_INTERVAL", "5"))
@@ -0,0 +1,91 @@
+import logging
+import mimetypes
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class DirectUploads:
+    """Bill uploads that go from the browser straight to the storage backend.
+
+    `issue` reserves a claims/<uuid>.<ext> path and returns a signed upload
+    URL for it plus an upload token. The client PUTs the file to the URL
+    and sends only the token to /process-bill or /submit-claim, which
+    `resolve` it back to the object path. Tokens are signed with the app
+    secret and bound to the uploading user, so a client can't point the
+    server at another user's object; they outlive the upload URL
+    (`token_ttl` vs `url_ttl`) so a slow form can still be submitted.
+    """
+
+    def __init__(self, storage, secret_key, allowed_file, max_bytes, url_ttl=900, token_ttl=21600):
+        self.storage = storage
+        self.allowed_file = allowed_file
+        self.max_bytes = max_bytes
+        self.url_ttl = url_ttl
+        self.token_ttl = token_ttl
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='direct-upload')
+
+    def issue(self, owner, filename, content_type=None, size=None):
+        """Signed upload URL and token for one bill; raises ValueError if the file is refused"""
+        if not self.storage:
+            raise ValueError("Storage is not available")
+        if not self.allowed_file(filename):
+            raise ValueError("Invalid file type")
+        if size is not None and size > self.max_bytes:
+            raise ValueError(f"File exceeds the {self.max_bytes // (1024 * 1024)}MB limit")
+
+        content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        file_path = self.storage.make_path(filename)
+        upload = self.storage.create_upload_url(file_path, content_type, self.max_bytes, self.url_ttl)
+        upload.update({
+            'file_path': file_path,
+            'expires_in': self.url_ttl,
+            'upload_token': self._serializer.dumps({
+                'path': file_path,
+                'owner': owner,
+                'filename': filename,
+                'content_type': content_type
+            })
+        })
+        return upload
+
+    def resolve(self, token, owner):
+        """The upload a token refers to, as {'file_path', 'filename', 'content_type'}"""
+        try:
+            data = self._serializer.loads(token, max_age=self.token_ttl)
+        except SignatureExpired:
+            raise ValueError("Upload has expired, please upload the file again")
+        except BadSignature:
+            raise ValueError("Invalid upload token")
+        if data.get('owner') != owner:
+            raise ValueError("Upload belongs to another user")
+        return {'file_path': data['path'], 'filename': data['filename'], 'content_type': data['content_type']}
+
+    def read(self, upload):
+        """Bytes of an uploaded bill, read back from storage for OCR"""
+        file_data = self.storage.download(upload['file_path'], max_bytes=self.max_bytes)
+        if len(file_data) > self.max_bytes:
+            raise ValueError(f"File exceeds the {self.max_bytes // (1024 * 1024)}MB limit")
+        return file_data
+
+    def confirm(self, upload):
+        """Check an upload arrived; returns the same result dict as upload_file_to_storage"""
+        try:
+            info = self.storage.stat(upload['file_path'])
+            if info is None:
+                raise ValueError("File was not uploaded")
+            if info['size'] > self.max_bytes:
+                raise ValueError(f"File exceeds the {self.max_bytes // (1024 * 1024)}MB limit")
+            return {
+                'success': True,
+                'file_url': self.storage.file_url(upload['file_path']),
+                'file_path': upload['file_path'],
+                'file_size': info['size']
+            }
+        except Exception as e:
+            logger.error("Direct upload check failed for %s: %s", upload['file_path'], e)
+            return {
+                'success': False,
+                'error': str(e)
+            }
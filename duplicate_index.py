@@ -0,0 +1,196 @@
+import re
+import bisect
+import threading
+from datetime import date
+
+
+_NON_ALNUM = re.compile(r'[^0-9A-Za-z]+')
+_VENDOR_SEPARATORS = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize_bill_number(bill_number):
+    """Upper-case the bill number and drop separators ("inv-0012 " -> "INV0012")"""
+    if bill_number is None:
+        return None
+    normalized = _NON_ALNUM.sub('', str(bill_number)).upper()
+    return normalized or None
+
+
+def normalize_vendor(vendor_name):
+    """Lower-case the vendor and collapse punctuation/whitespace"""
+    if vendor_name is None:
+        return None
+    normalized = ' '.join(_VENDOR_SEPARATORS.sub(' ', str(vendor_name)).lower().split())
+    return normalized or None
+
+
+# Legal-form words dropped from vendor keys, so "Mehfil" and "Mehfil Pvt Ltd" are one vendor. Trade words
+# ("Bar", "Cafe", "Stores") stay: they tell "Mehfil Bar" from "Mehfil Cafe"
+_VENDOR_LEGAL_WORDS = frozenset({
+    'pvt', 'private', 'ltd', 'limited', 'llp', 'llc', 'inc', 'corp', 'corporation', 'plc', 'gmbh'
+})
+
+
+def vendor_key(vendor_name):
+    """Normalized vendor without its legal form ("M/s Mehfil Pvt. Ltd." -> "mehfil")"""
+    normalized = normalize_vendor(vendor_name)
+    if not normalized:
+        return None
+    words = normalized.split()
+    if words[:2] == ['m', 's']:
+        words = words[2:]
+    core = [word for word in words if word not in _VENDOR_LEGAL_WORDS]
+    # A name made only of legal words ("Private Limited") keeps them
+    return ' '.join(core or words) or normalized
+
+
+def amount_to_paise(amount):
+    """Convert a rupee amount to integer paise, or None if it is not a number"""
+    try:
+        return int(round(float(amount) * 100))
+    except (TypeError, ValueError):
+        return None
+
+
+def date_to_ordinal(bill_date):
+    """Convert a YYYY-MM-DD (or ISO timestamp) date to a day ordinal"""
+    if not bill_date:
+        return None
+    text = str(bill_date)
+    # Slicing is several times faster than strptime, which matters when indexing millions of bills
+    if len(text) < 10 or text[4] != '-' or text[7] != '-':
+        return None
+    try:
+        return date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal()
+    except ValueError:
+        return None
+
+
+def iter_claim_bills(claim):
+    """Yield (bill_number, vendor_name, amount, bill_date) for every bill in a claim.
+
+    Understands both the legacy `bills` schema written by
+    validate_and_process_claim and the `transactions` schema written by
+    submit_claim, where the vendor only exists in the OCR output.
+    """
+    for bill in claim.get('bills') or []:
+        yield bill.get('bill_number'), bill.get('vendor_name'), bill.get('amount'), bill.get('bill_date')
+    for transaction in claim.get('transactions') or []:
+        extracted = transaction.get('extracted_details') or {}
+        yield (
+            transaction.get('bill_number') or extracted.get('bill_number'),
+            transaction.get('vendor_name') or extracted.get('vendor_name'),
+            transaction.get('amount') or extracted.get('amount'),
+            transaction.get('bill_date') or extracted.get('bill_date')
+        )
+
+
+def claim_key(claim):
+    """Identifier of a claim in either schema"""
+    return claim.get('claim_id') or claim.get('id')
+
+
+class DuplicateIndex:
+    """Hash index over historical bills for O(1) duplicate checks.
+
+    Exact duplicates are keyed on normalized (bill_number, vendor, paise).
+    Near duplicates (same vendor and amount within a date window) use a
+    sorted list of bill dates per (vendor, paise), probed with bisect.
+    Both structures are multisets so deleting one of two identical bills
+    keeps the other detectable.
+    """
+
+    def __init__(self):
+        self._exact = {}
+        self._dates = {}
+        self._claim_entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries_for(claim):
+        entries = []
+        for bill_number, vendor_name, amount, bill_date in iter_claim_bills(claim):
+            vendor = normalize_vendor(vendor_name)
+            paise = amount_to_paise(amount)
+            if not vendor or not paise:
+                continue
+            entries.append((normalize_bill_number(bill_number), vendor, paise, date_to_ordinal(bill_date)))
+        return entries
+
+    def build(self, claims):
+        """(Re)build the index from a full list of claims"""
+        with self._lock:
+            self._exact = {}
+            self._dates = {}
+            self._claim_entries = {}
+        for claim in claims:
+            self.add_claim(claim)
+
+    def add_claim(self, claim):
+        """Index every bill of a newly stored claim"""
+        entries = self._entries_for(claim)
+        with self._lock:
+            key = claim_key(claim)
+            if key is not None and key in self._claim_entries:
+                self._remove_entries(self._claim_entries.pop(key))
+            for bill_number, vendor, paise, ordinal in entries:
+                if bill_number:
+                    exact_key = (bill_number, vendor, paise)
+                    self._exact[exact_key] = self._exact.get(exact_key, 0) + 1
+                if ordinal is not None:
+                    bisect.insort(self._dates.setdefault((vendor, paise), []), ordinal)
+            if key is not None:
+                self._claim_entries[key] = entries
+
+    def remove_claim(self, claim_id):
+        """Drop a deleted claim's bills from the index"""
+        with self._lock:
+            entries = self._claim_entries.pop(claim_id, None)
+            if entries:
+                self._remove_entries(entries)
+
+    def _remove_entries(self, entries):
+        for bill_number, vendor, paise, ordinal in entries:
+            if bill_number:
+                exact_key = (bill_number, vendor, paise)
+                count = self._exact.get(exact_key, 0) - 1
+                if count > 0:
+                    self._exact[exact_key] = count
+                else:
+                    self._exact.pop(exact_key, None)
+            if ordinal is not None:
+                dates = self._dates.get((vendor, paise))
+                if dates:
+                    position = bisect.bisect_left(dates, ordinal)
+                    if position < len(dates) and dates[position] == ordinal:
+                        dates.pop(position)
+                    if not dates:
+                        del self._dates[(vendor, paise)]
+
+    def contains(self, bill_number, vendor_name, amount):
+        """True if a bill with the same number, vendor and amount was seen before"""
+        bill_number = normalize_bill_number(bill_number)
+        vendor = normalize_vendor(vendor_name)
+        paise = amount_to_paise(amount)
+        if not bill_number or not vendor or not paise:
+            return False
+        with self._lock:
+            return (bill_number, vendor, paise) in self._exact
+
+    def has_near_duplicate(self, vendor_name, amount, bill_date, window_days):
+        """True if the same vendor billed the same amount within window_days of bill_date"""
+        vendor = normalize_vendor(vendor_name)
+        paise = amount_to_paise(amount)
+        ordinal = date_to_ordinal(bill_date)
+        if not vendor or not paise or ordinal is None:
+            return False
+        with self._lock:
+            dates = self._dates.get((vendor, paise))
+            if not dates:
+                return False
+            position = bisect.bisect_left(dates, ordinal - window_days)
+            return position < len(dates) and dates[position] <= ordinal + window_days
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._exact.values())
@@ -0,0 +1,282 @@
+import csv
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+REPORTING_LEVELS = (1, 2, 3)
+
+_EmployeeFields = namedtuple('Employee', [
+    'employee_id', 'name', 'email', 'department', 'team', 'reporting', 'phone'
+])
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    return email if '@' in email else None
+
+
+class Employee(_EmployeeFields):
+    """One directory row; `reporting` holds (name, email) for Reporting Person 1-3"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        def field(key):
+            return (row.get(key) or '').strip()
+        return cls(
+            employee_id=field('Employee ID'),
+            name=field('Employee Name'),
+            email=field('Employee Email ID'),
+            department=field('Department Name'),
+            team=field('Team Name'),
+            reporting=tuple(
+                (field(f'Reporting Person - {level} Name'), field(f'Reporting Person - {level} Email'))
+                for level in REPORTING_LEVELS
+            ),
+            phone=field('Phone Number of Employee')
+        )
+
+    def approver(self, level):
+        """(name, email) of Reporting Person `level`"""
+        return self.reporting[level - 1]
+
+    def to_session(self):
+        """The employee_details dict kept in the login session"""
+        (hod_name, hod_email), (name_2, email_2), (name_3, email_3) = self.reporting
+        return {
+            "employee_id": self.employee_id,
+            "employee_name": self.name,
+            "employee_email": self.email,
+            "department": self.department,
+            "team": self.team,
+            "hod_name": hod_name,
+            "hod_email": hod_email,
+            "reporting_2_name": name_2,
+            "reporting_2_email": email_2,
+            "reporting_3_name": name_3,
+            "reporting_3_email": email_3,
+            "phone": self.phone
+        }
+
+
+class DirectorySnapshot:
+    """Immutable indexes over one version of the employee CSV.
+
+    Employees are keyed by lowercased email. `by_alias` folds the
+    `domain_aliases` (e.g. nxtwave.tech / nxtwave.co.in / nxtwave.in) onto
+    one key so a login from another domain variant still resolves when
+    that is unambiguous. The reporting indexes are keyed by
+    `canonical_email`, so an approver named as anusha@nxtwave.in in one
+    row and anusha@nxtwave.tech in another has one set of reports, found
+    from either variant.
+    """
+
+    def __init__(self, employees, domain_aliases=(), mtime=None):
+        self.domain_aliases = tuple(domain_aliases)
+        self.mtime = mtime
+        self.loaded_at = time.time()
+        self.by_email = {}
+        self.by_id = {}
+        self.by_alias = {}
+        # {level: {canonical approver email: (employee_email, ...)}}
+        self.by_reporting = {level: {} for level in REPORTING_LEVELS}
+
+        for employee in employees:
+            email = normalize_email(employee.email)
+            if not email:
+                continue
+            self.by_email[email] = employee
+            if employee.employee_id:
+                self.by_id[employee.employee_id] = employee
+
+        for email in self.by_email:
+            self.by_alias.setdefault(self.alias_key(email), []).append(email)
+        self.by_alias = {alias: tuple(emails) for alias, emails in self.by_alias.items()}
+
+        for email, employee in self.by_email.items():
+            for level in REPORTING_LEVELS:
+                approver = self.canonical_email(employee.approver(level)[1])
+                if approver and approver != email:
+                    self.by_reporting[level].setdefault(approver, []).append(email)
+        for level in REPORTING_LEVELS:
+            self.by_reporting[level] = {
+                approver: tuple(reports) for approver, reports in self.by_reporting[level].items()
+            }
+
+        self.transitive_reports = self._build_transitive_reports()
+
+    def alias_key(self, email):
+        """Email with aliased domains folded onto the first alias"""
+        local, _at, domain = email.rpartition('@')
+        if domain in self.domain_aliases:
+            domain = self.domain_aliases[0]
+        return f"{local}@{domain}"
+
+    def canonical_email(self, email):
+        """The one key an email is known by: its employee's own email, else its alias key.
+
+        Every domain variant of an employee's address maps to that
+        employee's row; an address without an unambiguous row folds onto
+        its alias key, which every variant shares too.
+        """
+        email = normalize_email(email)
+        if not email:
+            return None
+        employee = self.lookup(email)
+        return normalize_email(employee.email) if employee else self.alias_key(email)
+
+    def lookup(self, email):
+        """Employee by exact email, else by a unique match on a domain alias"""
+        email = normalize_email(email)
+        if not email:
+            return None
+        employee = self.by_email.get(email)
+        if employee is None:
+            matches = self.by_alias.get(self.alias_key(email), ())
+            if len(matches) == 1:
+                employee = self.by_email[matches[0]]
+        return employee
+
+    def _build_transitive_reports(self):
+        direct = {}
+        for level in REPORTING_LEVELS:
+            for approver, reports in self.by_reporting[level].items():
+                direct.setdefault(approver, set()).update(reports)
+
+        # Breadth-first walk per approver; a cycle in the CSV simply stops expanding
+        closure = {}
+        for approver in direct:
+            found = set()
+            frontier = [approver]
+            while frontier:
+                next_frontier = []
+                for node in frontier:
+                    for report in direct.get(node, ()):
+                        if report not in found:
+                            found.add(report)
+                            next_frontier.append(report)
+                frontier = next_frontier
+            found.discard(approver)
+            closure[approver] = frozenset(found)
+        return closure
+
+
+class EmployeeDirectory:
+    """Employee lookups backed by employee_data.csv, reloaded when the file changes.
+
+    Lookups read the current snapshot without locking. At most every
+    `check_interval` seconds a lookup stats the CSV; if its mtime moved,
+    one background thread parses it and swaps in the new snapshot, so
+    requests never wait on a reload and never see a half-built index.
+    """
+
+    def __init__(self, path, domain_aliases=(), check_interval=5.0):
+        self.path = path
+        self.domain_aliases = tuple(alias.strip().lower() for alias in domain_aliases if alias.strip())
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._snapshot = self._load()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, newline='', encoding='utf-8') as csvfile:
+                employees = [Employee.from_row(row) for row in csv.DictReader(csvfile)]
+            snapshot = DirectorySnapshot(employees, self.domain_aliases, mtime)
+            logger.info("Loaded %d employee records", len(snapshot.by_email))
+            return snapshot
+        except Exception as e:
+            logger.error("Error loading employee data: %s", e)
+            return DirectorySnapshot([], self.domain_aliases)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._snapshot.mtime and self._reload_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload, name='employee-directory-reload', daemon=True).start()
+
+    def _reload(self):
+        try:
+            snapshot = self._load()
+            # Keep serving the old directory if the new file could not be read
+            if snapshot.mtime is not None:
+                self._snapshot = snapshot
+                self.reloads += 1
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        """Reload synchronously (e.g. from a management command)"""
+        with self._reload_lock:
+            snapshot = self._load()
+            if snapshot.mtime is not None:
+                self._snapshot = snapshot
+                self.reloads += 1
+
+    @property
+    def snapshot(self):
+        self._maybe_reload()
+        return self._snapshot
+
+    def get(self, email):
+        """Employee by email, falling back to an unambiguous domain alias match"""
+        return self.snapshot.lookup(email)
+
+    def get_by_id(self, employee_id):
+        return self.snapshot.by_id.get(str(employee_id).strip())
+
+    def canonical_email(self, email):
+        """Key shared by every domain variant of an email (see DirectorySnapshot.canonical_email)"""
+        return self.snapshot.canonical_email(email)
+
+    def direct_reports(self, approver_email, level=None):
+        """Employees naming approver_email (in any domain variant) as Reporting Person `level` (any level when None)"""
+        snapshot = self.snapshot
+        approver = snapshot.canonical_email(approver_email)
+        levels = REPORTING_LEVELS if level is None else (level,)
+        emails = []
+        for each in levels:
+            for email in snapshot.by_reporting[each].get(approver, ()):
+                if email not in emails:
+                    emails.append(email)
+        return [snapshot.by_email[email] for email in emails]
+
+    def report_emails(self, approver_email):
+        """Lowercased emails of everyone reporting to approver_email, directly or transitively"""
+        snapshot = self.snapshot
+        return snapshot.transitive_reports.get(snapshot.canonical_email(approver_email), frozenset())
+
+    def all_reports(self, approver_email):
+        """Employees reporting to approver_email directly or through their reports"""
+        snapshot = self.snapshot
+        return [snapshot.by_email[email] for email in sorted(self.report_emails(approver_email))]
+
+    def is_approver(self, email):
+        snapshot = self.snapshot
+        return snapshot.canonical_email(email) in snapshot.transitive_reports
+
+    def __len__(self):
+        return len(self.snapshot.by_email)
+
+    def get_stats(self):
+        snapshot = self._snapshot
+        return {
+            'employees': len(snapshot.by_email),
+            'approvers': len(snapshot.transitive_reports),
+            'loaded_at': snapshot.loaded_at,
+            'file_mtime': snapshot.mtime,
+            'reloads': self.reloads
+        }
@@ -0,0 +1,97 @@
+import io
+import math
+import time
+
+from PIL import Image, ImageChops, ImageOps
+
+
+def _decoded_bytes(image):
+    """Approximate memory held by a decoded image"""
+    return image.width * image.height * len(image.getbands())
+
+
+def _crop_uniform_borders(image, threshold=24, margin=8):
+    """Trim flat margins (scanner beds, table tops) around the bill"""
+    gray = image.convert('L')
+    background = gray.getpixel((0, 0))
+    diff = ImageChops.difference(gray, Image.new('L', gray.size, background))
+    bbox = diff.point(lambda value: 255 if value > threshold else 0).getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    bbox = (
+        max(left - margin, 0),
+        max(top - margin, 0),
+        min(right + margin, image.width),
+        min(bottom + margin, image.height)
+    )
+    # Only crop when it actually removes something meaningful
+    if (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) > 0.95 * image.width * image.height:
+        return image
+    return image.crop(bbox)
+
+
+def normalize_image(source, max_edge=1600, grayscale=False, crop_borders=False, jpeg_quality=80):
+    """Shrink a bill image to what the vision model needs and re-encode it as JPEG.
+
+    `source` is either raw file bytes or an already decoded PIL image (e.g.
+    a rasterized PDF page). For JPEGs, Pillow's draft mode lets the decoder
+    downscale by 1/2..1/8 during decoding, and other formats are shrunk
+    with the integer `reduce()` box filter before the final resample, so a
+    20MP phone photo is never held fully decoded.
+
+    Returns (jpeg_bytes, stats).
+    """
+    start = time.perf_counter()
+    stats = {'source_bytes': len(source) if isinstance(source, (bytes, bytearray)) else None}
+
+    if isinstance(source, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(source))
+        stats['source_format'] = image.format
+        stats['source_size'] = image.size
+        stats['full_decode_bytes'] = image.width * image.height * len(image.getbands())
+        if image.format == 'JPEG':
+            # Decode directly at a reduced scale (still >= max_edge on the long side);
+            # draft keeps both sides >= the requested box, so it must follow the aspect ratio
+            long_edge = max(image.size)
+            image.draft('RGB', (
+                math.ceil(max_edge * image.width / long_edge),
+                math.ceil(max_edge * image.height / long_edge)
+            ))
+        image.load()
+    else:
+        image = source
+        stats['source_format'] = 'raster'
+        stats['source_size'] = image.size
+        stats['full_decode_bytes'] = _decoded_bytes(image)
+
+    stats['decoded_bytes'] = _decoded_bytes(image)
+
+    # Phone photos are often stored sideways with an EXIF orientation tag
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    long_edge = max(image.size)
+    if long_edge > max_edge:
+        factor = long_edge // max_edge
+        if factor >= 2:
+            image = image.reduce(factor)
+        if max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+    if crop_borders:
+        image = _crop_uniform_borders(image)
+
+    if grayscale and image.mode != 'L':
+        image = image.convert('L')
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=jpeg_quality)
+    payload = buffer.getvalue()
+
+    stats['output_size'] = image.size
+    stats['upload_bytes'] = len(payload)
+    stats['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return payload, stats
@@ -0,0 +1,54 @@
+import json
+import logging
+import sys
+import time
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Single-line log records with the `extra=` fields attached.
+
+    `text` renders `time level logger message key=value ...`; `json` renders
+    one JSON object per line for log shippers.
+    """
+
+    def __init__(self, fmt='text'):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RESERVED}
+        message = record.getMessage()
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}'
+
+        if self.fmt == 'json':
+            entry = {'ts': timestamp, 'level': record.levelname, 'logger': record.name, 'msg': message}
+            entry.update(fields)
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name} {message}"
+        if fields:
+            line += ' ' + ' '.join(f"{key}={self._text_value(value)}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+    @staticmethod
+    def _text_value(value):
+        value = str(value)
+        return json.dumps(value) if not value or ' ' in value or '=' in value else value
+
+
+def configure_logging(level='INFO', fmt='text'):
+    """Send all application logs to stderr through the structured formatter"""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(StructuredFormatter(fmt))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(str(level).upper())
@@ -0,0 +1,228 @@
+"""Maintenance commands for ReimburseFlow.
+
+Usage:
+    python manage.py migrate-sqlite [--json claims_data.json] [--db claims.db]
+    python manage.py rebuild-inbox
+    python manage.py check-approvers
+    python manage.py rebuild-rollups
+    python manage.py rebuild-blob-refs
+    python manage.py backfill-claims [--json claims_data.json] [--checkpoint FILE] [--workers 4] [--dry-run]
+    python manage.py reextract-ocr [--checkpoint FILE] [--department D] [--date-from D] [--date-to D] [--dry-run]
+"""
+import argparse
+import json
+
+import config
+
+
+def migrate_sqlite(args):
+    """Copy the local JSON claim store into SQLite"""
+    from claim_repository import migrate_json_to_sqlite
+
+    result = migrate_json_to_sqlite(args.json, args.db)
+    print(json.dumps(result, indent=2))
+    print(f"Set CLAIM_STORE_BACKEND=sqlite and CLAIM_STORE_SQLITE_PATH={args.db} to use it")
+
+
+def rebuild_inbox(args):
+    """Refile every claim in the approver inboxes (after a schema change or directory fix)"""
+    import app
+
+    app.approval_inbox.build(app.claim_repository.iter_claims())
+    print(f"Rebuilt {app.approval_inbox.name} approval inbox from the {app.claim_repository.name} claim store")
+
+
+def check_approvers(args):
+    """Check every domain variant of each approver's address reaches the claims of their reports.
+
+    For each reporting-person email in the directory, a pending claim from
+    the employee naming it is filed in a scratch inbox; every
+    EMPLOYEE_EMAIL_DOMAINS variant of that email which belongs to the same
+    person (e.g. a .tech login for a row naming the .in address) must see
+    it in the inbox, count as its approver and list the employee as a
+    report.
+    """
+    import app
+    from approval_inbox import InMemoryApprovalInbox
+    from employee_directory import REPORTING_LEVELS, normalize_email
+
+    directory = app.employee_directory
+    snapshot = directory.snapshot
+    inbox = InMemoryApprovalInbox(app.claim_approvers, directory.canonical_email)
+    checked, failures = 0, []
+    for email, employee in snapshot.by_email.items():
+        claim = {
+            'claim_id': f'CHECK_{email}',
+            'employee_details': {'employee_email': email},
+            'status': {'current_status': 'pending', 'submission_date': ''}
+        }
+        inbox.add_claim(claim)
+        approvers = dict(app.claim_approvers(claim))
+        for level in REPORTING_LEVELS:
+            reference = normalize_email(employee.approver(level)[1])
+            # Nobody approves their own claims, whichever variant of their address the row uses
+            if not reference or directory.canonical_email(reference) == directory.canonical_email(email):
+                continue
+            local, _at, domain = reference.rpartition('@')
+            for domain in directory.domain_aliases if domain in directory.domain_aliases else (domain,):
+                login = f'{local}@{domain}'
+                # Another employee's address that happens to share the local part is a different person
+                if snapshot.lookup(login) is not snapshot.lookup(reference):
+                    continue
+                checked += 1
+                inboxed = any(entry['claim_id'] == claim['claim_id']
+                              for entry in inbox.query(login, limit=len(snapshot.by_email))[0])
+                if (directory.canonical_email(login) not in approvers or not inboxed
+                        or email not in directory.report_emails(login)):
+                    failures.append(f"{login} cannot see {email} (Reporting Person {level}: {reference})")
+
+    for failure in failures[:20]:
+        print(failure)
+    print(f"Checked {checked} approver logins across {len(directory.domain_aliases)} domain variants: "
+          f"{len(failures)} failed")
+    if failures:
+        raise SystemExit(1)
+
+
+def rebuild_rollups(args):
+    """Recompute the spend rollups from every stored claim (backfill, or after a schema change)"""
+    import app
+
+    app.spend_rollups.build(app.claim_repository.iter_claims())
+    stats = app.spend_rollups.summary()
+    print(f"Rebuilt {app.spend_rollups.name} spend rollups: {stats['count']} claims, {stats['total_amount']:.2f} total")
+
+
+def rebuild_blob_refs(args):
+    """Recount which claims reference each stored bill file (backfill, or claims saved before counting)"""
+    import app
+
+    app.bill_blob_refs.build(app.claim_repository.iter_claims())
+    print(f"Rebuilt {app.bill_blob_refs.name} bill file references from the {app.claim_repository.name} claim store")
+
+
+def backfill_claims(args):
+    """Upgrade claims_data.json (either schema) and bulk-write it into the claim store"""
+    import os
+
+    import app
+    from backfill import Checkpoint, backfill_claims as run_backfill
+    from claim_log import ClaimLog
+
+    checkpoint = Checkpoint(args.checkpoint, {
+        'command': 'backfill-claims',
+        'source': os.path.abspath(args.json),
+        'target': app.claim_repository.name
+    })
+    if checkpoint.resumed:
+        print(f"Resuming from record {checkpoint.position} ({args.checkpoint})")
+    claims = ClaimLog(args.json).load()
+    print(f"Writing {len(claims)} claims to the {app.claim_repository.name} claim store"
+          f"{' (dry run)' if args.dry_run else ''}")
+    stats = run_backfill(
+        claims, app.claim_repository, checkpoint,
+        workers=args.workers, batch_size=args.batch_size, dry_run=args.dry_run
+    )
+    print(json.dumps(stats, indent=2))
+    if checkpoint.state['failed']:
+        print(f"{len(checkpoint.state['failed'])} batches failed; see {args.checkpoint}")
+    print("Run rebuild-inbox, rebuild-rollups and rebuild-blob-refs to index the imported claims")
+
+
+def reextract_ocr(args):
+    """Re-run OCR over the bill files of stored claims"""
+    import app
+    from backfill import Checkpoint, reextract_claims
+    from duplicate_index import claim_key
+
+    if not app.firebase_service or not app.firebase_service.storage:
+        raise SystemExit("No storage backend is configured to read bill files from")
+    filters = {'department': args.department, 'date_from': args.date_from, 'date_to': args.date_to}
+    checkpoint = Checkpoint(args.checkpoint, dict(filters, command='reextract-ocr', target=app.claim_repository.name))
+    if checkpoint.resumed:
+        print(f"Resuming run {checkpoint.run_id}; claims it already rewrote are skipped")
+
+    def reindex(claims):
+        for claim in claims:
+            # Firestore claims carry their document id, which the views are keyed by
+            app.refresh_claim_views(claim, claim.get('id') or claim_key(claim))
+            if app.claim_repository is app.processor.repository:
+                app.processor.duplicate_index.add_claim(claim)
+                app.processor.vendor_index.add_claim(claim)
+            else:
+                # Keep the local mirror (and the indexes built from it) in step with the claim store
+                try:
+                    app.processor.add_claim(claim)
+                except Exception as e:
+                    print(f"Could not update the local copy of claim {claim_key(claim)}: {e}")
+
+    stats = reextract_claims(
+        app.claim_repository.stream_claims(**filters),
+        app.claim_repository,
+        app.firebase_service.storage,
+        app.processor.extract_bills_batch,
+        checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        on_written=reindex
+    )
+    print(json.dumps(stats, indent=2))
+    if not args.dry_run:
+        print("Restart the web workers so their duplicate and vendor indexes and claim read caches "
+              "pick up the new details")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ReimburseFlow maintenance commands")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate-sqlite', help="Migrate claims_data.json into the SQLite claim store")
+    migrate.add_argument('--json', default='claims_data.json', help="Path of the JSON claim snapshot")
+    migrate.add_argument('--db', default=config.CLAIM_STORE_SQLITE_PATH, help="Path of the SQLite database")
+    migrate.set_defaults(handler=migrate_sqlite)
+
+    inbox = subparsers.add_parser('rebuild-inbox', help="Rebuild the approver inboxes from all stored claims")
+    inbox.set_defaults(handler=rebuild_inbox)
+
+    approvers = subparsers.add_parser(
+        'check-approvers', help="Check every domain variant of an approver's email reaches their reports' claims"
+    )
+    approvers.set_defaults(handler=check_approvers)
+
+    rollups = subparsers.add_parser('rebuild-rollups', help="Recompute the spend rollups from all stored claims")
+    rollups.set_defaults(handler=rebuild_rollups)
+
+    blob_refs = subparsers.add_parser('rebuild-blob-refs', help="Recount bill file references from all stored claims")
+    blob_refs.set_defaults(handler=rebuild_blob_refs)
+
+    backfill = subparsers.add_parser(
+        'backfill-claims', help="Upgrade and bulk-write claims_data.json into the claim store (Firestore when configured)"
+    )
+    backfill.add_argument('--json', default='claims_data.json', help="Path of the JSON claim snapshot")
+    backfill.add_argument('--checkpoint', default='backfill_claims.checkpoint.json',
+                          help="Progress file; rerun with the same file to resume")
+    backfill.add_argument('--batch-size', type=int, default=400, help="Claims per batched write")
+    backfill.add_argument('--workers', type=int, default=4, help="Batches written in parallel")
+    backfill.add_argument('--dry-run', action='store_true', help="Upgrade and count without writing")
+    backfill.set_defaults(handler=backfill_claims)
+
+    reextract = subparsers.add_parser(
+        'reextract-ocr', help="Re-run OCR over stored bill files (after a model or prompt change)"
+    )
+    reextract.add_argument('--checkpoint', default='reextract_ocr.checkpoint.json',
+                           help="Progress file; rerun with the same file to resume")
+    reextract.add_argument('--department', help="Only claims from this department")
+    reextract.add_argument('--date-from', help="Only claims submitted on or after YYYY-MM-DD")
+    reextract.add_argument('--date-to', help="Only claims submitted on or before YYYY-MM-DD")
+    reextract.add_argument('--batch-size', type=int, default=20, help="Claims per OCR batch")
+    reextract.add_argument('--workers', type=int, default=2, help="Batches processed in parallel")
+    reextract.add_argument('--dry-run', action='store_true', help="Run OCR without writing results back")
+    reextract.set_defaults(handler=reextract_ocr)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+import bisect
+import contextvars
+import math
+import threading
+
+# Route label for metrics recorded outside the request thread (worker pools copy it in)
+current_route = contextvars.ContextVar('current_route', default='background')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry['buckets'][index] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def _render_samples(self, items):
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['buckets']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+            lines.append(f"{self.name}_bucket{labels} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {entry['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text exposition format.
+
+    Counters, gauges and histograms are updated on the request path;
+    collectors are callables run at scrape time that turn existing stats
+    dicts (OCR cache, job queue, Gemini client) into gauge/counter samples
+    as (name, kind, help, [(labels_dict, value), ...]) tuples.
+    """
+
+    def __init__(self, namespace='reimburse'):
+        self.namespace = namespace
+        self._metrics = []
+        self._collectors = []
+
+    def _name(self, name):
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self._name(name), documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(self._name(name), documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self._name(name), documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                name = self._name(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    labels = sorted(labels.items())
+                    lines.append(f"{name}{_format_labels([k for k, _v in labels], [v for _k, v in labels])} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    'stage_duration_seconds',
+    'Duration of bill processing pipeline stages',
+    ('stage', 'route', 'outcome', 'method', 'backend')
+)
+http_requests = registry.counter(
+    'http_requests_total',
+    'HTTP requests by route, method and status code',
+    ('route', 'method', 'status')
+)
+http_seconds = registry.histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route and outcome',
+    ('route', 'method', 'outcome')
+)
+pdf_methods = registry.counter(
+    'pdf_extraction_method_total',
+    'Which PDF extraction method produced the OCR input',
+    ('method',)
+)
+pdf_text_outcomes = registry.counter(
+    'pdf_text_fast_path_total',
+    'PDF text-layer fast path outcomes (absorbed, no_text, missing_fields, low_confidence, error)',
+    ('outcome',)
+)
+pdf_text_shadow = registry.counter(
+    'pdf_text_shadow_fields_total',
+    'Fields of sampled fast-path extractions compared with Gemini (match or mismatch)',
+    ('field', 'result')
+)
+vendor_matches = registry.counter(
+    'vendor_match_total',
+    'Extracted vendor names looked up in the vendor knowledge base (exact, fuzzy, none)',
+    ('result',)
+)
+gemini_parse_results = registry.counter(
+    'gemini_parse_total',
+    'Gemini response parsing results (json, text_fallback, error)',
+    ('result', 'mode')
+)
+
+
+def observe_stage(stage, seconds, fields):
+    """StageStats observer: every recorded stage duration also lands in the histogram"""
+    stage_seconds.observe(
+        seconds,
+        stage=stage,
+        route=current_route.get(),
+        outcome=fields.get('outcome', 'success'),
+        method=fields.get('method', ''),
+        backend=fields.get('backend', '')
+    )
+
+
+def http_outcome(status_code):
+    if status_code >= 500:
+        return 'server_error'
+    if status_code >= 400:
+        return 'client_error'
+    return 'success'
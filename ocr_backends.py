@@ -0,0 +1,156 @@
+import hashlib
+import json
+import random
+import threading
+import time
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:  # pragma: no cover - api_core ships with google-generativeai
+    api_exceptions = None
+
+
+class OCRBackend:
+    """Interface of the vision model used for bill extraction.
+
+    `generate_content(contents)` takes the same content list the Gemini SDK
+    does (prompt strings plus {'mime_type', 'data'} image parts) and returns
+    an object with a `.text` attribute holding the model output.
+    """
+
+    name = None
+
+    def generate_content(self, contents, **kwargs):
+        raise NotImplementedError
+
+    def count_tokens(self, contents):
+        raise NotImplementedError
+
+
+class GeminiOCRBackend(OCRBackend):
+    """Google Gemini through the google-generativeai SDK"""
+
+    name = 'gemini'
+
+    def __init__(self, model_name, api_key):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, contents, **kwargs):
+        return self.model.generate_content(contents, **kwargs)
+
+    def count_tokens(self, contents):
+        return self.model.count_tokens(contents)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeTokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class FakeOCRBackend(OCRBackend):
+    """Deterministic offline stand-in for Gemini, for load tests and benchmarks.
+
+    The extraction returned for an image is derived from a hash of its
+    bytes, so the same bill always yields the same result. Latency is
+    lognormal around `latency_ms` (plus `per_image_ms` per image), and a
+    fraction `error_rate` of calls fail with a retryable upstream error.
+    """
+
+    name = 'fake'
+
+    VENDORS = [
+        'Uber India', 'Ola Cabs', 'IndiGo Airlines', 'Taj Hotels', 'Swiggy',
+        'Zomato', 'Amazon Business', 'Croma', 'Reliance Digital', 'IRCTC'
+    ]
+    CATEGORIES = ['Travel', 'Travel', 'Travel', 'Accommodation', 'Food', 'Food',
+                  'Office Supplies', 'Electronics', 'Electronics', 'Travel']
+
+    def __init__(self, latency_ms=800, latency_sigma=0.5, per_image_ms=100, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.per_image_ms = per_image_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            latency = self._random.lognormvariate(0, self.latency_sigma) if self.latency_sigma else 1.0
+            failed = self._random.random() < self.error_rate
+        return latency, failed
+
+    @staticmethod
+    def _parts(contents):
+        """Split contents into (image bytes list, labelled?)"""
+        images, labelled = [], False
+        for part in contents:
+            if isinstance(part, dict):
+                images.append(part['data'])
+            elif hasattr(part, 'read'):
+                # Direct PDF upload path passes a file-like object
+                images.append(part.getvalue() if hasattr(part, 'getvalue') else part.read())
+            elif isinstance(part, str) and part.startswith('Image '):
+                labelled = True
+        return images, labelled
+
+    def extraction_for(self, data):
+        """Canned extraction for one bill, stable for the same bytes"""
+        digest = hashlib.sha256(data).hexdigest()
+        seed = int(digest[:12], 16)
+        vendor = seed % len(self.VENDORS)
+        return {
+            'bill_number': f"FAKE-{digest[:8].upper()}",
+            'bill_date': f"2025-{seed % 12 + 1:02d}-{seed % 28 + 1:02d}",
+            'vendor_name': self.VENDORS[vendor],
+            'transaction_category': self.CATEGORIES[vendor],
+            'purpose': 'Business expense',
+            'amount': round(100 + (seed % 990000) / 100, 2),
+            'currency': 'INR',
+            'product': 'General',
+            'cluster_location': None,
+            'confidence_score': 80 + seed % 20
+        }
+
+    def generate_content(self, contents, **kwargs):
+        images, labelled = self._parts(contents)
+        latency, failed = self._draw()
+        time.sleep((self.latency_ms * latency + self.per_image_ms * len(images)) / 1000)
+
+        if failed:
+            if api_exceptions is not None:
+                raise api_exceptions.ServiceUnavailable("Fake OCR backend injected failure")
+            raise ConnectionError("Fake OCR backend injected failure")
+
+        if labelled:
+            payload = [dict(self.extraction_for(data), index=index) for index, data in enumerate(images)]
+        else:
+            # Multi-page documents are one bill; key it on the first page
+            payload = self.extraction_for(images[0] if images else b'')
+        return FakeResponse(json.dumps(payload))
+
+    def count_tokens(self, contents):
+        if isinstance(contents, str):
+            return FakeTokenCount(len(contents) // 4)
+        images, _labelled = self._parts(contents)
+        text = sum(len(part) for part in contents if isinstance(part, str))
+        # Gemini bills a fixed 258 tokens per image
+        return FakeTokenCount(text // 4 + 258 * len(images))
+
+
+def create_ocr_backend(backend, model_name=None, api_key=None, latency_ms=800, latency_sigma=0.5,
+                       per_image_ms=100, error_rate=0.0, seed=0):
+    """Build the OCR backend named by config.OCR_BACKEND"""
+    if backend == 'fake':
+        return FakeOCRBackend(latency_ms, latency_sigma, per_image_ms, error_rate, seed)
+    if backend == 'gemini':
+        return GeminiOCRBackend(model_name, api_key)
+    raise ValueError(f"Unknown OCR backend: {backend}")
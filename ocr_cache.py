@@ -0,0 +1,157 @@
+import os
+import json
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """Two-tier (memory LRU + on-disk) cache for OCR extraction results.
+
+    Entries are content addressed: the key is a hash of the bill bytes plus
+    a fingerprint of everything that influences the extraction (model name,
+    prompt text, pipeline version), so a prompt or model change never serves
+    stale results.
+    """
+
+    def __init__(self, cache_dir, memory_entries=512, disk_max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()
+        self._disk_index = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0
+        }
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def make_key(file_data, fingerprint):
+        """Build the cache key for a file and an extraction fingerprint"""
+        digest = hashlib.sha256(file_data).hexdigest()
+        variant = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]
+        return f"{digest}-{variant}"
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _scan_disk(self):
+        """Rebuild the disk index (oldest first) from files already on disk"""
+        entries = []
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name[:-5], st.st_size))
+        entries.sort()
+        for _mtime, key, size in entries:
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return dict(self._memory[key])
+
+        result = self._read_disk(key)
+
+        with self._lock:
+            if result is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['disk_hits'] += 1
+            self._remember(key, result)
+            return dict(result)
+
+    def put(self, key, result):
+        """Store a result in both tiers"""
+        with self._lock:
+            self._remember(key, result)
+            self.stats['stores'] += 1
+        self._write_disk(key, result)
+
+    def _remember(self, key, result):
+        self._memory[key] = dict(result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['memory_evictions'] += 1
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Refresh mtime so eviction after a restart stays roughly LRU
+            os.utime(path, None)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+        return result
+
+    def _write_disk(self, key, result):
+        if not self.cache_dir:
+            return
+        path = self._path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("OCR cache write failed: %s", e)
+            return
+
+        with self._lock:
+            previous = self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(payload)
+            self._disk_bytes += len(payload) - previous
+            victims = []
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+                victim, size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= size
+                victims.append(victim)
+            self.stats['disk_evictions'] += len(victims)
+
+        for victim in victims:
+            try:
+                os.remove(self._path_for(victim))
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Return hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = len(self._disk_index)
+            stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,228 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+try:
+    from google.api_core import exceptions as api_exceptions
+except ImportError:  # pragma: no cover - api_core ships with google-generativeai
+    api_exceptions = None
+
+logger = logging.getLogger(__name__)
+
+
+class OCRUnavailableError(Exception):
+    """Gemini could not be reached in time (breaker open, rate limited or retries exhausted)"""
+
+
+def _retryable_exceptions():
+    retryable = [TimeoutError, ConnectionError, FutureTimeoutError]
+    if api_exceptions is not None:
+        retryable.extend([
+            api_exceptions.TooManyRequests,
+            api_exceptions.ResourceExhausted,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.InternalServerError,
+            api_exceptions.DeadlineExceeded,
+            api_exceptions.GatewayTimeout,
+            api_exceptions.BadGateway
+        ])
+    return tuple(retryable)
+
+
+RETRYABLE_EXCEPTIONS = _retryable_exceptions()
+
+
+class TokenBucket:
+    """Process-wide request rate limiter: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Take one token, waiting at most timeout seconds; returns False if none came free"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive upstream failures and fails fast for `reset_timeout` seconds.
+
+    After the timeout one probe call is let through (half-open); its
+    outcome closes the breaker again or restarts the open period.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning("Gemini circuit breaker opened", extra={'failures': self.failures})
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """Resilient wrapper around `model.generate_content`.
+
+    Every call gets a per-attempt timeout and an overall deadline, waits
+    for a rate limiter token, and is retried with jittered exponential
+    backoff on retryable errors only. Repeated upstream failures open a
+    circuit breaker so callers fail fast with OCRUnavailableError instead
+    of pinning request threads on an unhealthy upstream.
+    """
+
+    def __init__(self, model, timeout=30, deadline=60, max_attempts=3, backoff_base=0.5,
+                 backoff_max=8, rate_per_minute=60, burst=10, breaker_threshold=5,
+                 breaker_reset=30, workers=16):
+        self.model = model
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(rate_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        # The SDK call itself has no timeout; run it on a worker so we can stop waiting. A call we
+        # stopped waiting for keeps its worker until the SDK returns, so in-flight calls are capped
+        # at the worker count and a slot is only given back when the call really finishes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini-call')
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stats = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'attempts': 0,
+            'retries': 0,
+            'timeouts': 0,
+            'rate_limited': 0,
+            'saturated': 0,
+            'breaker_rejections': 0
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def generate_content(self, contents, **kwargs):
+        """Call Gemini with deadline, rate limiting, retries and the circuit breaker"""
+        self._count('calls')
+        deadline = time.monotonic() + self.deadline
+        last_error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            if not self.breaker.allow():
+                self._count('breaker_rejections')
+                raise OCRUnavailableError("Gemini circuit breaker is open") from last_error
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.limiter.acquire(remaining):
+                self._count('rate_limited')
+                # We never called upstream, so give a half-open probe slot back
+                self.breaker.release_probe()
+                raise OCRUnavailableError("Gemini rate limit wait exceeded the deadline") from last_error
+
+            if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                # Every worker is stuck on a call we already gave up on; queueing behind them won't help
+                self._count('saturated')
+                self.breaker.release_probe()
+                raise OCRUnavailableError("All Gemini call slots are busy") from last_error
+
+            self._count('attempts')
+            if attempt > 1:
+                self._count('retries')
+            try:
+                future = self._executor.submit(self.model.generate_content, contents, **kwargs)
+                future.add_done_callback(lambda _future: self._slots.release())
+                response = future.result(timeout=min(self.timeout, max(deadline - time.monotonic(), 0.001)))
+                # Accessing .text raises for blocked/empty responses; surface that here
+                response.text
+            except RETRYABLE_EXCEPTIONS as e:
+                if isinstance(e, FutureTimeoutError):
+                    self._count('timeouts')
+                    e = TimeoutError(f"Gemini call exceeded {self.timeout}s")
+                last_error = e
+                self.breaker.record_failure()
+                logger.warning("Gemini attempt %d/%d failed: %s", attempt, self.max_attempts, e)
+            except Exception:
+                # Not an upstream health problem (bad request, blocked content): do not retry, and
+                # leave the breaker as it was rather than counting it as proof Gemini is healthy
+                self.breaker.release_probe()
+                self._count('failures')
+                raise
+            else:
+                self.breaker.record_success()
+                self._count('successes')
+                return response
+
+            if attempt < self.max_attempts:
+                backoff = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                sleep = random.uniform(0, backoff)
+                if time.monotonic() + sleep >= deadline:
+                    break
+                time.sleep(sleep)
+
+        self._count('failures')
+        raise OCRUnavailableError(f"Gemini unavailable: {last_error}") from last_error
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['breaker_state'] = self.breaker.state
+        stats['breaker_failures'] = self.breaker.failures
+        stats['breaker_times_opened'] = self.breaker.times_opened
+        return stats
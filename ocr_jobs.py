@@ -0,0 +1,125 @@
+import time
+import uuid
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the OCR job queue is at its maximum depth"""
+
+
+class OCRJobQueue:
+    """Bounded background worker pool for bill OCR jobs.
+
+    Jobs are submitted with the raw bill bytes, or a callable returning them
+    (e.g. a read from storage, so it happens on the worker), and run
+    `handler(file_data, filename)` on one of `workers` daemon threads. Finished jobs are kept for
+    `result_ttl` seconds so clients can poll or stream their status.
+    """
+
+    FINISHED_STATES = ('done', 'failed')
+
+    def __init__(self, handler, workers=4, max_depth=64, result_ttl=600):
+        self.handler = handler
+        self.max_depth = max_depth
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._queue = queue.Queue()
+        self._active = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        for n in range(workers):
+            thread = threading.Thread(target=self._worker, name=f'ocr-job-worker-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, file_data, filename, owner=None):
+        """Enqueue a bill for OCR and return its job id"""
+        with self._condition:
+            self._purge_expired()
+            if self._active >= self.max_depth:
+                raise QueueFullError(f"OCR queue is full ({self.max_depth} jobs in flight)")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'filename': filename,
+                'owner': owner,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._active += 1
+        self._queue.put((job_id, file_data, filename))
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of the job, or None if unknown or expired"""
+        with self._condition:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, last_status=None, timeout=15):
+        """Block until the job's status differs from last_status or timeout expires"""
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] != last_status:
+                    return dict(job) if job else None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return dict(job)
+                self._condition.wait(remaining)
+
+    def get_stats(self):
+        """Return queue depth and job counts by status"""
+        with self._condition:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {
+                'in_flight': self._active,
+                'max_depth': self.max_depth,
+                'workers': len(self._threads),
+                'jobs_by_status': counts
+            }
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['status'] in self.FINISHED_STATES and job['finished_at'] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _set(self, job_id, **fields):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+            self._condition.notify_all()
+
+    def _worker(self):
+        while True:
+            job_id, file_data, filename = self._queue.get()
+            self._set(job_id, status='running', started_at=time.time())
+            try:
+                if callable(file_data):
+                    file_data = file_data()
+                result = self.handler(file_data, filename)
+                self._set(job_id, status='done', result=result, finished_at=time.time())
+            except Exception as e:
+                logger.error("OCR job %s failed: %s", job_id, e)
+                self._set(job_id, status='failed', error=str(e), finished_at=time.time())
+            finally:
+                with self._condition:
+                    self._active -= 1
+                self._queue.task_done()
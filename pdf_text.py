@@ -0,0 +1,331 @@
+import re
+import time
+from datetime import datetime
+
+# Bump when parsing changes so cached fast-path results are recomputed
+PARSER_VERSION = '2'
+
+# Fields a text-layer extraction must find before it can stand in for Gemini
+REQUIRED_FIELDS = ('amount', 'bill_date', 'vendor_name')
+
+# Confidence contributed by each field, by how it was found; sums to 100 at best
+FIELD_WEIGHTS = {
+    'amount': {'labelled': 35, 'currency': 20},
+    'bill_date': {'labelled': 20, 'unlabelled': 12},
+    'vendor_name': {'known': 20, 'labelled': 18, 'header': 10},
+    'bill_number': {'labelled': 15},
+    'currency': {'explicit': 10, 'default': 5}
+}
+
+_NUMBER = r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)'
+_CURRENCY_MARK = r'(?:₹|rs\.?|inr|\$|usd|€|eur|£|gbp)'
+
+# Total labels, most specific first; the rank of the label found feeds the choice between candidates
+_TOTAL_LABELS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'grand\s+total',
+        r'(?:total\s+)?amount\s+(?:payable|paid|due|charged)|net\s+(?:payable|amount)',
+        r'(?:invoice|bill|order|booking)\s+(?:total|amount|value)|total\s+(?:fare|paid|payable|amount|charged|value)',
+        r'(?<!sub)(?<!sub\s)(?<!sub-)\btotal\b(?!\s*(?:items?|qty|quantity|savings|discount|tax|gst|weight))'
+    )
+]
+# A whole figure: not glued to a word, not a percentage (the guard spans the rest of the digits so
+# backtracking to "1" of "18%" can't pass it), not part of a time, range or longer number
+_AMOUNT_ON_LINE = re.compile(
+    rf'(?<![\w.,/-])(?<!\d:)(?:{_CURRENCY_MARK}\s*)?{_NUMBER}(?![\d.,]*(?:\d|\s*%))(?![/:-]\d|\w)', re.IGNORECASE
+)
+_CURRENCY_AMOUNT = re.compile(rf'(?:{_CURRENCY_MARK}\s*{_NUMBER}|{_NUMBER}\s*(?:₹|inr|rs\b))', re.IGNORECASE)
+
+_CURRENCIES = [
+    (re.compile(r'₹|\brs\.?(?=\s*\d)|\binr\b', re.IGNORECASE), 'INR'),
+    (re.compile(r'\$|\busd\b', re.IGNORECASE), 'USD'),
+    (re.compile(r'€|\beur\b', re.IGNORECASE), 'EUR'),
+    (re.compile(r'£|\bgbp\b', re.IGNORECASE), 'GBP')
+]
+
+_MONTHS = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?'
+# (regex, strptime formats tried in order); day-first is the Indian convention for numeric dates
+_DATE_FORMATS = [
+    (re.compile(r'\b(\d{4}-\d{2}-\d{2})\b'), ('%Y-%m-%d',)),
+    (re.compile(r'\b(\d{1,2}[/.-]\d{1,2}[/.-]\d{4})\b'), ('%d/%m/%Y', '%m/%d/%Y')),
+    (re.compile(r'\b(\d{1,2}[/.-]\d{1,2}[/.-]\d{2})\b'), ('%d/%m/%y',)),
+    (re.compile(rf'\b(\d{{1,2}}(?:st|nd|rd|th)?[\s-]+{_MONTHS},?[\s-]+\d{{2,4}})\b', re.IGNORECASE),
+     ('%d %b %Y', '%d %B %Y', '%d %b %y', '%d %B %y')),
+    (re.compile(rf'\b({_MONTHS}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}})\b', re.IGNORECASE), ('%b %d %Y', '%B %d %Y'))
+]
+_DATE_LABEL = re.compile(
+    r'\b(?:(?:invoice|bill|order|booking|receipt|transaction|txn|issue|journey|travel)\s*)?dated?\b', re.IGNORECASE
+)
+
+_BILL_NUMBER = re.compile(
+    r'(?:invoice|bill|receipt|order|booking|ticket|trip|txn|transaction|folio)\s*'
+    r'(?:no\.?|number|num\.?|#|id)\s*[:#.\-]?\s*([A-Z0-9][A-Z0-9/_-]{2,39})',
+    re.IGNORECASE
+)
+_PNR = re.compile(r'\bpnr\s*(?:no\.?|number)?\s*[:#\-]?\s*([A-Z0-9]{6})\b', re.IGNORECASE)
+
+_VENDOR_LABEL = re.compile(
+    r'^\s*(?:sold\s+by|seller|restaurant(?:\s+name)?|merchant(?:\s+name)?|vendor(?:\s+name)?|'
+    r'billed\s+by|hotel(?:\s+name)?|outlet|store(?:\s+name)?)\s*[:\-]\s*(.+)$',
+    re.IGNORECASE | re.MULTILINE
+)
+# Lines that head an invoice without naming the vendor
+_GENERIC_HEADER = re.compile(
+    r'^(?:tax\s+invoice|invoice|receipt|bill(?:\s+of\s+supply)?|cash\s+memo|original|duplicate|'
+    r'original\s+for\s+recipient|e-?ticket|booking\s+confirmation|order\s+summary|page\s+\d+)\b',
+    re.IGNORECASE
+)
+
+# Born-digital invoices we see most, with the category their bills belong to
+KNOWN_VENDORS = [
+    (re.compile(pattern, re.IGNORECASE), name, category)
+    for pattern, name, category in (
+        (r'\bswiggy\b', 'Swiggy', 'Food'),
+        (r'\bzomato\b', 'Zomato', 'Food'),
+        (r'\buber\s+eats\b', 'Uber Eats', 'Food'),
+        (r'\buber\b', 'Uber', 'Travel'),
+        (r'\bola\s+(?:cabs|money|electric)\b|\bani\s+technologies\b', 'Ola', 'Travel'),
+        (r'\brapido\b', 'Rapido', 'Travel'),
+        (r'\bindigo\b|\binterglobe\s+aviation\b', 'IndiGo', 'Travel'),
+        (r'\bair\s+india\b', 'Air India', 'Travel'),
+        (r'\bakasa\s+air\b', 'Akasa Air', 'Travel'),
+        (r'\bspicejet\b', 'SpiceJet', 'Travel'),
+        (r'\birctc\b', 'IRCTC', 'Travel'),
+        (r'\bredbus\b', 'redBus', 'Travel'),
+        (r'\bmakemytrip\b', 'MakeMyTrip', 'Travel'),
+        (r'\boyo\b', 'OYO', 'Accommodation'),
+        (r'\bamazon\b', 'Amazon', 'Others'),
+        (r'\bflipkart\b', 'Flipkart', 'Others'),
+        (r'\b(?:indian\s+oil|bharat\s+petroleum|hindustan\s+petroleum|hpcl|bpcl|iocl)\b', None, 'Fuel')
+    )
+]
+_CATEGORY_KEYWORDS = [
+    (re.compile(r'\b(?:restaurant|cafe|food|meal|dine|dining|kitchen|biryani)\b', re.IGNORECASE), 'Food'),
+    (re.compile(r'\b(?:flight|airline|boarding|pnr|train|bus|cab|taxi|ride|trip\s+fare)\b', re.IGNORECASE), 'Travel'),
+    (re.compile(r'\b(?:hotel|room\s+charges|check-?in|check-?out|lodging|stay)\b', re.IGNORECASE), 'Accommodation'),
+    (re.compile(r'\b(?:petrol|diesel|fuel|litres?)\b', re.IGNORECASE), 'Fuel')
+]
+
+
+def extract_text_layer(file_data, max_pages=5):
+    """Text of the first max_pages pages of a PDF, and timings; empty text for scanned PDFs"""
+    import fitz  # PyMuPDF
+
+    start = time.perf_counter()
+    with fitz.open(stream=file_data, filetype="pdf") as document:
+        pages = [document.load_page(number).get_text() for number in range(min(document.page_count, max_pages))]
+        timings = {'page_count': document.page_count, 'pages': len(pages)}
+    timings['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return '\n'.join(pages), timings
+
+
+_WORD_GAP = re.compile(r'\s{2,}')
+
+
+def _collapse_spacing(line):
+    """Undo per-glyph spacing ("G r a n d  T o t a l") that some PDF fonts produce in the text layer"""
+    tokens = line.split()
+    if len(tokens) < 6 or sum(len(token) == 1 for token in tokens) < 0.8 * len(tokens):
+        return line
+    return ' '.join(word.replace(' ', '') for word in _WORD_GAP.split(line))
+
+
+def _to_amount(text):
+    try:
+        return float(text.replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _blank_dates(text):
+    """text with every date spaced out, so none of its numbers reads as an amount"""
+    for pattern, _formats in _DATE_FORMATS:
+        text = pattern.sub(lambda match: ' ' * len(match.group(0)), text)
+    return text
+
+
+def _find_amount(lines):
+    """(amount, how) from the most specific total label, else the largest currency-marked amount"""
+    best = None
+    for index, line in enumerate(lines):
+        for rank, label in enumerate(_TOTAL_LABELS):
+            match = label.search(line)
+            if not match:
+                continue
+            # The first figure after the label on the same line, or alone on the next one;
+            # later figures are item counts, tax rates or dates ("for 2 items", "on 12/03/2025")
+            candidates = _AMOUNT_ON_LINE.findall(_blank_dates(line[match.end():]))
+            if not candidates and index + 1 < len(lines):
+                candidates = _AMOUNT_ON_LINE.findall(_blank_dates(lines[index + 1]))
+            amounts = [amount for amount in (_to_amount(value) for value in candidates) if amount]
+            if amounts:
+                candidate = (rank, -amounts[0])
+                if best is None or candidate < best:
+                    best = candidate
+            break
+    if best is not None:
+        return -best[1], 'labelled'
+
+    amounts = [
+        _to_amount(first or second)
+        for line in lines
+        for first, second in _CURRENCY_AMOUNT.findall(line)
+    ]
+    amounts = [amount for amount in amounts if amount]
+    if amounts:
+        return max(amounts), 'currency'
+    return None, None
+
+
+def _parse_date(text, formats):
+    cleaned = re.sub(r'(\d)(?:st|nd|rd|th)\b', r'\1', text)
+    cleaned = re.sub(r'[/.\-,\s]+', ' ', cleaned).strip()
+    for date_format in formats:
+        try:
+            parsed = datetime.strptime(cleaned, date_format.replace('/', ' ').replace('-', ' '))
+        except ValueError:
+            continue
+        if 2000 <= parsed.year <= datetime.now().year + 1:
+            return parsed.strftime('%Y-%m-%d')
+    return None
+
+
+def _find_date(lines):
+    """(YYYY-MM-DD, how): a date on a date-labelled line wins over the first date anywhere"""
+    first = None
+    for line in lines:
+        for pattern, formats in _DATE_FORMATS:
+            for value in pattern.findall(line):
+                parsed = _parse_date(value, formats)
+                if not parsed:
+                    continue
+                if _DATE_LABEL.search(line):
+                    return parsed, 'labelled'
+                first = first or parsed
+    return (first, 'unlabelled') if first else (None, None)
+
+
+def _find_bill_number(text):
+    for pattern in (_BILL_NUMBER, _PNR):
+        for value in pattern.findall(text):
+            # A label followed by another word ("Invoice No Date") is not a number
+            if any(char.isdigit() for char in value):
+                return value.strip('-/_')
+    return None
+
+
+def _find_vendor(text, lines):
+    """(vendor, category, how) from a known brand, a vendor label, or the first meaningful line"""
+    for pattern, name, category in KNOWN_VENDORS:
+        if pattern.search(text):
+            if name:
+                return name, category, 'known'
+            labelled = _VENDOR_LABEL.search(text)
+            return (labelled.group(1).strip() if labelled else None), category, 'labelled'
+
+    labelled = _VENDOR_LABEL.search(text)
+    if labelled:
+        return labelled.group(1).strip()[:80], None, 'labelled'
+
+    for line in lines[:8]:
+        if len(line) < 3 or not re.search(r'[A-Za-z]{3}', line) or _GENERIC_HEADER.match(line):
+            continue
+        if _DATE_LABEL.search(line) or _BILL_NUMBER.search(line) or _CURRENCY_AMOUNT.search(line):
+            continue
+        return line[:80], None, 'header'
+    return None, None, None
+
+
+def _find_currency(text):
+    for pattern, code in _CURRENCIES:
+        if pattern.search(text):
+            return code, 'explicit'
+    return 'INR', 'default'
+
+
+def _infer_category(text, vendor_category):
+    if vendor_category:
+        return vendor_category
+    for pattern, category in _CATEGORY_KEYWORDS:
+        if pattern.search(text):
+            return category
+    return 'Others'
+
+
+def parse_bill_text(text):
+    """Structured bill fields from a PDF text layer, in the shape Gemini extractions take.
+
+    Adds `extraction_method: 'pdf_text'` and `missing_fields` (required
+    fields it could not find); `confidence_score` is the sum of
+    FIELD_WEIGHTS for the fields found, by how reliably each was found.
+    """
+    lines = [_collapse_spacing(line.strip()) for line in text.splitlines() if line.strip()]
+    text = '\n'.join(lines)
+    amount, amount_how = _find_amount(lines)
+    bill_date, date_how = _find_date(lines)
+    vendor_name, vendor_category, vendor_how = _find_vendor(text, lines)
+    bill_number = _find_bill_number(text)
+    currency, currency_how = _find_currency(text)
+    category = _infer_category(text, vendor_category)
+
+    found = {
+        'amount': amount_how,
+        'bill_date': date_how,
+        'vendor_name': vendor_how if vendor_name else None,
+        'bill_number': 'labelled' if bill_number else None,
+        'currency': currency_how
+    }
+    confidence = sum(FIELD_WEIGHTS[field][how] for field, how in found.items() if how)
+
+    result = {
+        "bill_number": bill_number,
+        "bill_date": bill_date,
+        "vendor_name": vendor_name,
+        "transaction_category": category,
+        "purpose": f"{category} expense" if category != 'Others' else 'Bill processing',
+        "amount": amount or 0,
+        "currency": currency,
+        "product": "General",
+        "cluster_location": None,
+        "confidence_score": confidence,
+        "extraction_method": "pdf_text"
+    }
+    result['missing_fields'] = [field for field in REQUIRED_FIELDS if not result[field]]
+    return result
+
+
+def extract_bill_from_pdf(file_data, max_pages=5, min_chars=40, min_confidence=80):
+    """Run the fast path over a PDF: (outcome, result, timings).
+
+    outcome is 'absorbed' when the result can replace a Gemini extraction,
+    otherwise why not: 'no_text' (scanned, or too little text),
+    'missing_fields' or 'low_confidence'. Raises if the PDF can't be read.
+    """
+    text, timings = extract_text_layer(file_data, max_pages=max_pages)
+    timings['chars'] = len(text)
+    if len(text.strip()) < min_chars:
+        return 'no_text', None, timings
+    result = parse_bill_text(text)
+    if result['missing_fields']:
+        return 'missing_fields', result, timings
+    if result['confidence_score'] < min_confidence:
+        return 'low_confidence', result, timings
+    return 'absorbed', result, timings
+
+
+def _normalized(value):
+    return re.sub(r'[^a-z0-9]', '', str(value or '').lower())
+
+
+def compare_extractions(fast, reference):
+    """{field: matched} for a fast-path extraction against a Gemini one of the same bill"""
+    amount, reference_amount = fast.get('amount') or 0, reference.get('amount') or 0
+    vendor, reference_vendor = _normalized(fast.get('vendor_name')), _normalized(reference.get('vendor_name'))
+    return {
+        'amount': abs(float(amount) - float(reference_amount)) <= 0.01,
+        'bill_date': fast.get('bill_date') == reference.get('bill_date'),
+        # "Swiggy" and "Swiggy Limited" name the same vendor
+        'vendor_name': bool(vendor and reference_vendor and (vendor in reference_vendor or reference_vendor in vendor)),
+        'bill_number': _normalized(fast.get('bill_number')) == _normalized(reference.get('bill_number')),
+        'currency': (fast.get('currency') or 'INR') == (reference.get('currency') or 'INR')
+    }
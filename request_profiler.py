@@ -0,0 +1,247 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(code):
+    # ';' separates frames in the collapsed format and ' ' precedes the count
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name.replace(';', ':')
+
+
+class StackSampler:
+    """Background thread that periodically samples Python stacks.
+
+    The request thread is always sampled; threads whose name starts with one
+    of `thread_prefixes` (the submit, Gemini call and OCR job pools) are
+    sampled too, since /submit-claim does most of its work there. Pool
+    threads are shared, so their stacks can include concurrent requests'
+    work; each stack is rooted at its thread name to keep them apart.
+    """
+
+    def __init__(self, thread_ident, interval=0.005, thread_prefixes=()):
+        self.thread_ident = thread_ident
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _targets(self):
+        targets = {self.thread_ident: 'request'}
+        if self.thread_prefixes:
+            for thread in threading.enumerate():
+                if thread.name.startswith(self.thread_prefixes):
+                    targets[thread.ident] = thread.name
+        return targets
+
+    @staticmethod
+    def _idle(labels):
+        # Parked pool threads: ThreadPoolExecutor blocked in its C queue get, or a queue.Queue wait
+        if not labels:
+            return True
+        return labels[0].startswith('_worker (thread.py') or (
+            len(labels) > 1 and labels[1].startswith('get (queue.py')
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            targets = self._targets()
+            for ident, frame in sys._current_frames().items():
+                root = targets.get(ident)
+                if root is None:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if root != 'request' and self._idle(labels):
+                    continue
+                labels.append(root)
+                self.stacks[';'.join(reversed(labels))] += 1
+            self.samples += 1
+
+
+class ProfileStore:
+    """Bounded on-disk ring of request profiles.
+
+    Each profile is a `<id>.json` metadata file plus `<id>.collapsed`
+    (flamegraph.pl / speedscope input) and, for cProfile runs, `<id>.pstats`
+    and a `<id>.txt` summary. The oldest profiles are deleted once more
+    than `max_profiles` are kept.
+    """
+
+    KINDS = ('collapsed', 'pstats', 'txt')
+    ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}_[0-9a-f]{8}$')
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def save(self, meta, stacks=None, profile=None):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = time.strftime('%Y%m%dT%H%M%S') + '_' + uuid.uuid4().hex[:8]
+        files = []
+        if stacks:
+            self._write(profile_id, 'collapsed', ''.join(
+                f"{stack} {count}\n" for stack, count in stacks.most_common()
+            ))
+            files.append('collapsed')
+        if profile is not None:
+            profile.dump_stats(self.path(profile_id, 'pstats'))
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(40)
+            self._write(profile_id, 'txt', summary.getvalue())
+            files.extend(['pstats', 'txt'])
+        meta = dict(meta, id=profile_id, files=files)
+        self._write(profile_id, 'json', json.dumps(meta))
+        self._trim()
+        return profile_id
+
+    def path(self, profile_id, kind):
+        return os.path.join(self.directory, f"{profile_id}.{kind}")
+
+    def get(self, profile_id):
+        if not self.ID_PATTERN.match(profile_id or ''):
+            return None
+        try:
+            with open(self.path(profile_id, 'json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self):
+        """Metadata of the kept profiles, newest first"""
+        profiles = []
+        for profile_id in self._ids():
+            meta = self.get(profile_id)
+            if meta:
+                profiles.append(meta)
+        return profiles[::-1]
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.json') and self.ID_PATTERN.match(name[:-5]))
+
+    def _write(self, profile_id, kind, text):
+        with open(self.path(profile_id, kind), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _trim(self):
+        with self._lock:
+            ids = self._ids()
+            for profile_id in ids[:max(len(ids) - self.max_profiles, 0)]:
+                for kind in self.KINDS + ('json',):
+                    try:
+                        os.remove(self.path(profile_id, kind))
+                    except FileNotFoundError:
+                        pass
+
+
+class RequestProfiler:
+    """Opt-in profiling of whole requests without touching the routes.
+
+    A `sample_rate` fraction of requests, plus any request carrying the
+    `X-Profile` header from a user `is_admin` accepts, runs under the
+    stack sampler (`mode='sample'`) or additionally cProfile on the
+    request thread (`mode='cprofile'`). Sampled requests slower than
+    `threshold_ms` are saved to the store; header-forced ones always are.
+    """
+
+    HEADER = 'X-Profile'
+    THREAD_PREFIXES = ('submit-worker', 'gemini-call', 'ocr-job-worker')
+
+    def __init__(self, store, sample_rate=0.0, threshold_ms=5000, mode='sample', interval_ms=5,
+                 is_admin=None, skip_prefixes=('/static/', '/admin/profiles', '/metrics')):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.is_admin = is_admin or (lambda: False)
+        self.skip_prefixes = skip_prefixes
+        self.stats = {'profiled': 0, 'saved': 0}
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        if request.path.startswith(self.skip_prefixes):
+            return
+        forced = self.HEADER in request.headers and self.is_admin()
+        if not forced and not (self.sample_rate and random.random() < self.sample_rate):
+            return
+
+        sampler = StackSampler(threading.get_ident(), self.interval, self.THREAD_PREFIXES)
+        profile = cProfile.Profile() if self.mode == 'cprofile' else None
+        g.profiling = {'forced': forced, 'sampler': sampler, 'profile': profile, 'start': time.perf_counter()}
+        sampler.start()
+        if profile is not None:
+            profile.enable()
+
+    def _after_request(self, response):
+        profiling = g.get('profiling')
+        if profiling is not None:
+            profiling['status'] = response.status_code
+        return response
+
+    def _teardown_request(self, _error=None):
+        profiling = g.pop('profiling', None)
+        if profiling is None:
+            return
+        if profiling['profile'] is not None:
+            profiling['profile'].disable()
+        stacks = profiling['sampler'].stop()
+        duration_ms = (time.perf_counter() - profiling['start']) * 1000
+        self.stats['profiled'] += 1
+        if not profiling['forced'] and duration_ms < self.threshold_ms:
+            return
+
+        meta = {
+            'ts': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': profiling.get('status', 500),
+            'duration_ms': round(duration_ms, 2),
+            'forced': profiling['forced'],
+            'mode': self.mode,
+            'samples': profiling['sampler'].samples
+        }
+        try:
+            profile_id = self.store.save(meta, stacks, profiling['profile'])
+            self.stats['saved'] += 1
+            logger.info("Saved request profile", extra={
+                'profile_id': profile_id, 'path': request.path, 'duration_ms': meta['duration_ms']
+            })
+        except Exception as e:
+            logger.warning("Request profile save failed: %s", e)
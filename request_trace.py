@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import g, request, session
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTracer:
+    """Append one JSON line per request to a trace file for later replay.
+
+    Only the traffic shape is recorded: arrival time, method, endpoint,
+    path, filter query parameters, response status and duration, the
+    uploaded files' types and sizes, and a hash of the user's email so
+    per-user sessions can be reconstructed. Form values, file contents and
+    pagination cursors are never written.
+    """
+
+    # Query parameters kept verbatim; anything else is dropped
+    QUERY_KEYS = ('limit', 'status', 'department', 'date_from', 'date_to', 'mode')
+    # Form fields kept verbatim; transaction field values are never recorded
+    FORM_KEYS = ('transaction_count', 'mode', 'bill_type')
+
+    def __init__(self, path, skip_prefixes=('/static/',)):
+        self.path = path
+        self.skip_prefixes = skip_prefixes
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        logger.info("Capturing request traces to %s", self.path)
+
+    def _before_request(self):
+        g.trace_start = time.perf_counter()
+        g.trace_ts = time.time()
+
+    def _after_request(self, response):
+        if request.path.startswith(self.skip_prefixes) or not hasattr(g, 'trace_start'):
+            return response
+        try:
+            self._write(self._record(response))
+        except Exception as e:
+            logger.warning("Request trace error: %s", e)
+        return response
+
+    def _record(self, response):
+        email = (session.get('user') or {}).get('email') or ''
+        files = []
+        for field, storage in request.files.items(multi=True):
+            # Seek to the end to size the upload without reading it again
+            stream = storage.stream
+            position = stream.tell()
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            stream.seek(position)
+            files.append({
+                'field': field,
+                'ext': os.path.splitext(storage.filename or '')[1].lower(),
+                'content_type': storage.content_type,
+                'size': size
+            })
+
+        return {
+            'ts': round(g.trace_ts, 6),
+            'method': request.method,
+            'endpoint': request.endpoint,
+            'path': request.path,
+            'query': {key: request.args[key] for key in self.QUERY_KEYS if key in request.args},
+            'form': {key: request.form[key] for key in self.FORM_KEYS if key in request.form},
+            'files': files,
+            'user': hashlib.sha256(email.encode('utf-8')).hexdigest()[:12] if email else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - g.trace_start) * 1000, 2),
+            'response_bytes': response.calculate_content_length()
+        }
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def load_trace(path):
+    """Read a trace file into a list of records sorted by arrival time"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping damaged trace record")
+    records.sort(key=lambda record: record['ts'])
+    return records
@@ -0,0 +1,388 @@
+import json
+import os
+import sqlite3
+import threading
+
+from claim_repository import claim_department, claim_status, claim_submission_date
+from duplicate_index import amount_to_paise, claim_key
+
+# Breakdowns kept per month; 'total' has the single value 'all'
+DIMENSIONS = ('total', 'status', 'department', 'category', 'cluster')
+UNSPECIFIED = 'Unspecified'
+UNKNOWN_MONTH = 'unknown'
+
+
+def _label(value):
+    value = str(value or '').strip()
+    return value or UNSPECIFIED
+
+
+def claim_month(claim):
+    """YYYY-MM bucket of the claim's submission date"""
+    submitted = claim_submission_date(claim) or ''
+    return submitted[:7] if len(submitted) >= 7 else UNKNOWN_MONTH
+
+
+def _claim_lines(claim):
+    """(category, cluster, amount) for every bill in either claim schema"""
+    for bill in claim.get('bills') or []:
+        yield bill.get('transaction_category'), bill.get('cluster_location'), bill.get('amount')
+    for transaction in claim.get('transactions') or []:
+        extracted = transaction.get('extracted_details') or {}
+        yield (
+            transaction.get('transaction_category') or extracted.get('transaction_category'),
+            transaction.get('cluster') or extracted.get('cluster_location'),
+            transaction.get('amount') or extracted.get('amount')
+        )
+
+
+def claim_contribution(claim):
+    """Counters a claim adds to the rollups: {(month, dimension, value): [count, amount_paise]}.
+
+    Claim-level buckets (total, status, department) count the claim once at
+    form_details.total_amount; category and cluster buckets count each bill
+    at its own amount.
+    """
+    month = claim_month(claim)
+    form_details = claim.get('form_details') or {}
+    lines = list(_claim_lines(claim))
+    if form_details.get('total_amount') is not None:
+        total = amount_to_paise(form_details['total_amount']) or 0
+    else:
+        total = sum(amount_to_paise(amount) or 0 for _category, _cluster, amount in lines)
+
+    contribution = {}
+
+    def add(dimension, value, count, amount):
+        counter = contribution.setdefault((month, dimension, _label(value)), [0, 0])
+        counter[0] += count
+        counter[1] += amount
+
+    add('total', 'all', 1, total)
+    add('status', claim_status(claim), 1, total)
+    add('department', claim_department(claim), 1, total)
+    for category, cluster, amount in lines:
+        amount = amount_to_paise(amount) or 0
+        add('category', category, 1, amount)
+        add('cluster', cluster, 1, amount)
+    return contribution
+
+
+def contribution_delta(old, new):
+    """Counter changes that turn the `old` contribution into `new`"""
+    delta = {}
+    for key in set(old) | set(new):
+        old_count, old_amount = old.get(key, (0, 0))
+        new_count, new_amount = new.get(key, (0, 0))
+        if old_count != new_count or old_amount != new_amount:
+            delta[key] = (new_count - old_count, new_amount - old_amount)
+    return delta
+
+
+def _encode_contribution(contribution):
+    return [[month, dimension, value, count, amount] for (month, dimension, value), (count, amount) in contribution.items()]
+
+
+def _decode_contribution(rows):
+    return {(month, dimension, value): (count, amount) for month, dimension, value, count, amount in rows or []}
+
+
+def month_range(date_from=None, date_to=None):
+    """(first, last) YYYY-MM buckets covering YYYY-MM or YYYY-MM-DD bounds; None when unbounded"""
+    return (date_from[:7] if date_from else None), (date_to[:7] if date_to else None)
+
+
+class SpendRollups:
+    """Month-bucketed spend counters maintained on every claim write.
+
+    Each claim's last contribution (see claim_contribution) is stored next
+    to the counters, so `add_claim` on submit or status change and
+    `remove_claim` on delete apply only the difference, atomically with
+    recording the new contribution. Reading a summary touches one row or
+    document per month and breakdown value, never the claims.
+    """
+
+    name = 'base'
+
+    def add_claim(self, claim, ref=None):
+        """Insert or refresh a claim's counters; ref is the id the claim store knows it by"""
+        ref = ref or claim_key(claim)
+        if ref:
+            self._replace(ref, claim_contribution(claim))
+
+    def remove_claim(self, ref):
+        self._replace(ref, {})
+
+    def build(self, claims):
+        """Recompute every counter from a full claim scan"""
+        self._reset()
+        for claim in claims:
+            self.add_claim(claim, self._build_ref(claim))
+
+    def _build_ref(self, claim):
+        return claim_key(claim)
+
+    def summary(self, date_from=None, date_to=None):
+        """Totals and per-status/department/category/cluster/month breakdowns.
+
+        Bounds are applied per month bucket: a YYYY-MM-DD bound includes its
+        whole month. Claims without a submission date are only counted when
+        no range is given.
+        """
+        first, last = month_range(date_from, date_to)
+        result = {
+            'count': 0,
+            'total_amount': 0,
+            'by_status': {},
+            'by_department': {},
+            'by_category': {},
+            'by_cluster': {},
+            'by_month': {},
+            'months': {'from': first, 'to': last}
+        }
+        for month, dimension, value, count, amount in self._rows(first, last):
+            if not count and not amount:
+                continue
+            if dimension == 'total':
+                result['count'] += count
+                result['total_amount'] += amount
+                bucket = result['by_month'].setdefault(month, {'count': 0, 'total_amount': 0})
+            else:
+                bucket = result[f'by_{dimension}'].setdefault(value, {'count': 0, 'total_amount': 0})
+            bucket['count'] += count
+            bucket['total_amount'] += amount
+
+        result['total_amount'] = result['total_amount'] / 100
+        for key in ('by_status', 'by_department', 'by_category', 'by_cluster', 'by_month'):
+            for bucket in result[key].values():
+                bucket['total_amount'] = bucket['total_amount'] / 100
+        result['by_month'] = dict(sorted(result['by_month'].items()))
+        return result
+
+    def _replace(self, ref, contribution):
+        raise NotImplementedError
+
+    def _rows(self, first_month, last_month):
+        """Yield (month, dimension, value, count, amount_paise) for months in the range"""
+        raise NotImplementedError
+
+    def _reset(self):
+        raise NotImplementedError
+
+
+def _in_range(month, first, last):
+    if first is None and last is None:
+        return True
+    if month == UNKNOWN_MONTH:
+        return False
+    return (first is None or month >= first) and (last is None or month <= last)
+
+
+class InMemorySpendRollups(SpendRollups):
+    """Process-local counters for the JSON and in-memory claim stores"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._counters = {}
+        self._contributions = {}
+        self._lock = threading.Lock()
+
+    def _replace(self, ref, contribution):
+        with self._lock:
+            old = self._contributions.pop(ref, {})
+            for key, (count, amount) in contribution_delta(old, contribution).items():
+                counter = self._counters.setdefault(key, [0, 0])
+                counter[0] += count
+                counter[1] += amount
+                if counter == [0, 0]:
+                    del self._counters[key]
+            if contribution:
+                self._contributions[ref] = contribution
+
+    def _rows(self, first_month, last_month):
+        with self._lock:
+            items = list(self._counters.items())
+        for (month, dimension, value), (count, amount) in items:
+            if _in_range(month, first_month, last_month):
+                yield month, dimension, value, count, amount
+
+    def _reset(self):
+        with self._lock:
+            self._counters = {}
+            self._contributions = {}
+
+
+class SQLiteSpendRollups(SpendRollups):
+    """Counter table next to the SQLite claim store, keyed by (month, dimension, value)"""
+
+    name = 'sqlite'
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS spend_rollups (
+            month TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            amount_paise INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, dimension, value)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS spend_rollup_claims (
+            claim_ref TEXT PRIMARY KEY,
+            contribution TEXT NOT NULL
+        )
+        """
+    ]
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _replace(self, ref, contribution):
+        conn = self._connection()
+        with conn:
+            # Take the write lock before reading the old contribution so concurrent writers serialize
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT contribution FROM spend_rollup_claims WHERE claim_ref = ?", (ref,)).fetchone()
+            old = _decode_contribution(json.loads(row[0])) if row else {}
+            conn.executemany(
+                "INSERT INTO spend_rollups (month, dimension, value, count, amount_paise) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (month, dimension, value) DO UPDATE SET "
+                "count = count + excluded.count, amount_paise = amount_paise + excluded.amount_paise",
+                [key + delta for key, delta in contribution_delta(old, contribution).items()]
+            )
+            if contribution:
+                conn.execute(
+                    "INSERT OR REPLACE INTO spend_rollup_claims (claim_ref, contribution) VALUES (?, ?)",
+                    (ref, json.dumps(_encode_contribution(contribution)))
+                )
+            else:
+                conn.execute("DELETE FROM spend_rollup_claims WHERE claim_ref = ?", (ref,))
+
+    def _rows(self, first_month, last_month):
+        clauses, params = ['count != 0 OR amount_paise != 0'], []
+        if first_month is not None or last_month is not None:
+            clauses.append('month != ?')
+            params.append(UNKNOWN_MONTH)
+        if first_month is not None:
+            clauses.append('month >= ?')
+            params.append(first_month)
+        if last_month is not None:
+            clauses.append('month <= ?')
+            params.append(last_month)
+        where = ' AND '.join(f'({clause})' for clause in clauses)
+        return self._connection().execute(
+            f"SELECT month, dimension, value, count, amount_paise FROM spend_rollups WHERE {where}", params
+        ).fetchall()
+
+    def _reset(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM spend_rollups")
+            conn.execute("DELETE FROM spend_rollup_claims")
+
+
+class FirestoreSpendRollups(SpendRollups):
+    """One spend_rollups/{YYYY-MM} document per month, updated with transactional increments.
+
+    A month document holds {'total': {'all': {count, amount_paise}},
+    'status': {value: {...}}, ...}; spend_rollup_claims/{claim_ref} keeps
+    each claim's last contribution so a change can be reversed exactly.
+    """
+
+    name = 'firebase'
+    COLLECTION = 'spend_rollups'
+    CLAIMS_COLLECTION = 'spend_rollup_claims'
+
+    def __init__(self, db):
+        self.db = db
+
+    def _replace(self, ref, contribution):
+        from firebase_admin import firestore
+
+        claim_ref = self.db.collection(self.CLAIMS_COLLECTION).document(ref)
+
+        @firestore.transactional
+        def apply(transaction):
+            snapshot = claim_ref.get(transaction=transaction)
+            old = _decode_contribution((snapshot.to_dict() or {}).get('contribution')) if snapshot.exists else {}
+            months = {}
+            for (month, dimension, value), (count, amount) in contribution_delta(old, contribution).items():
+                months.setdefault(month, {'month': month}).setdefault(dimension, {})[value] = {
+                    'count': firestore.Increment(count),
+                    'amount_paise': firestore.Increment(amount)
+                }
+            for month, update in months.items():
+                # Nested map keys in a merge set are literal, so department or category names need no escaping
+                transaction.set(self.db.collection(self.COLLECTION).document(month), update, merge=True)
+            if contribution:
+                transaction.set(claim_ref, {
+                    'contribution': [
+                        {'month': m, 'dimension': d, 'value': v, 'count': c, 'amount_paise': a}
+                        for m, d, v, c, a in _encode_contribution(contribution)
+                    ]
+                })
+            elif snapshot.exists:
+                transaction.delete(claim_ref)
+
+        apply(self.db.transaction())
+
+    def _rows(self, first_month, last_month):
+        query = self.db.collection(self.COLLECTION)
+        if first_month is not None:
+            query = query.where('month', '>=', first_month)
+        if last_month is not None:
+            query = query.where('month', '<=', last_month)
+        for doc in query.stream():
+            data = doc.to_dict() or {}
+            month = data.get('month', doc.id)
+            if not _in_range(month, first_month, last_month):
+                continue
+            for dimension in DIMENSIONS:
+                for value, counter in (data.get(dimension) or {}).items():
+                    yield month, dimension, value, counter.get('count', 0), counter.get('amount_paise', 0)
+
+    def _reset(self):
+        for collection in (self.COLLECTION, self.CLAIMS_COLLECTION):
+            batch, pending = self.db.batch(), 0
+            for doc in self.db.collection(collection).stream():
+                batch.delete(doc.reference)
+                pending += 1
+                if pending == 400:
+                    batch.commit()
+                    batch, pending = self.db.batch(), 0
+            if pending:
+                batch.commit()
+
+    def _build_ref(self, claim):
+        # Claims read back from Firestore carry their document id, which is what the API addresses
+        return claim.get('id') or claim_key(claim)
+
+
+def create_spend_rollups(repository):
+    """Rollups stored alongside the given claim repository"""
+    if repository.name == 'firebase':
+        return FirestoreSpendRollups(repository.db)
+    if repository.name == 'sqlite':
+        return SQLiteSpendRollups(repository.db_path)
+    rollups = InMemorySpendRollups()
+    rollups.build(repository.iter_claims())
+    # Claims written by other workers reach the JSON store's in-memory mirror through its listeners
+    if hasattr(repository, 'listeners'):
+        repository.listeners.append(rollups)
+    return rollups
@@ -0,0 +1,102 @@
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class StageStats:
+    """Process-wide timing aggregates for the bill processing pipeline.
+
+    Each stage (e.g. `pdf_rasterize`, `gemini_call`) keeps a count, total
+    and max duration plus a window of recent durations for percentiles,
+    and the most recent samples are retained with any extra fields (page
+    count, bytes, method) for inspection.
+    """
+
+    def __init__(self, recent=200, window=2048):
+        self.window = window
+        self._stages = {}
+        self._durations = {}
+        self._counters = {}
+        self._recent = deque(maxlen=recent)
+        self._observers = []
+        self._lock = threading.Lock()
+
+    def add_observer(self, observer):
+        """Call observer(stage, seconds, fields) for every recorded sample (e.g. to export metrics)"""
+        self._observers.append(observer)
+
+    def record(self, stage, seconds, **fields):
+        """Record one duration for a stage"""
+        with self._lock:
+            entry = self._stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            self._durations.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            sample = {'stage': stage, 'ms': round(seconds * 1000, 2), 'at': time.time()}
+            sample.update(fields)
+            self._recent.append(sample)
+        for observer in self._observers:
+            observer(stage, seconds, fields)
+
+    def increment(self, counter, amount=1):
+        """Add to a running total (e.g. bytes sent to Gemini)"""
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    @contextmanager
+    def time(self, stage, **fields):
+        """Context manager timing the enclosed block as one sample of stage"""
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException:
+            fields.setdefault('outcome', 'error')
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def counters(self):
+        """Copy of the running totals"""
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        """Forget all samples and counters (e.g. between benchmark runs)"""
+        with self._lock:
+            self._stages.clear()
+            self._durations.clear()
+            self._counters.clear()
+            self._recent.clear()
+
+    @staticmethod
+    def percentile(sorted_values, fraction):
+        """Nearest-rank percentile of an already sorted list"""
+        if not sorted_values:
+            return 0.0
+        rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+        return sorted_values[min(rank, len(sorted_values) - 1)]
+
+    def snapshot(self, recent=20):
+        """Per-stage aggregates and percentiles (in milliseconds) plus the latest samples"""
+        with self._lock:
+            stages = {}
+            for stage, entry in self._stages.items():
+                durations = sorted(self._durations[stage])
+                stages[stage] = {
+                    'count': entry['count'],
+                    'avg_ms': round(entry['total'] / entry['count'] * 1000, 2),
+                    'p50_ms': round(self.percentile(durations, 0.50) * 1000, 2),
+                    'p95_ms': round(self.percentile(durations, 0.95) * 1000, 2),
+                    'p99_ms': round(self.percentile(durations, 0.99) * 1000, 2),
+                    'max_ms': round(entry['max'] * 1000, 2),
+                    'total_ms': round(entry['total'] * 1000, 2)
+                }
+            counters = dict(self._counters)
+            samples = list(self._recent)[-recent:]
+        return {'stages': stages, 'counters': counters, 'recent': samples}
+
+
+stage_stats = StageStats()
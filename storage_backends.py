@@ -0,0 +1,305 @@
+import os
+import hmac
+import time
+import uuid
+import hashlib
+import logging
+import mimetypes
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from stage_stats import stage_stats
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend:
+    """Interface for where uploaded bill files are kept.
+
+    `upload(file_data, filename, content_type)` stores the bytes under their
+    content address (see content_path) and returns {'file_url', 'file_path',
+    'file_size', 'sha256', 'deduplicated'}, skipping the write when that
+    blob already exists; `download(file_path, max_bytes)` reads a stored
+    file back, at most `max_bytes + 1` bytes of it so callers can tell an
+    oversized file apart, and `delete(file_path)` removes one (a missing
+    file is not an error). All raise on failure.
+
+    For direct browser uploads, `create_upload_url` signs a PUT of one
+    object that expires after `expires_in` seconds, `stat(file_path)` returns
+    {'size', 'content_type'} (None if nothing was uploaded) and
+    `file_url(file_path)` is the URL recorded on the claim.
+    """
+
+    name = None
+
+    def upload(self, file_data, filename, content_type):
+        raise NotImplementedError
+
+    def download(self, file_path, max_bytes=None):
+        raise NotImplementedError
+
+    def delete(self, file_path):
+        raise NotImplementedError
+
+    def create_upload_url(self, file_path, content_type, max_bytes, expires_in):
+        raise NotImplementedError
+
+    def stat(self, file_path):
+        raise NotImplementedError
+
+    def file_url(self, file_path):
+        raise NotImplementedError
+
+    # Every bill file lives under this prefix
+    BILL_PREFIX = 'claims/'
+
+    @classmethod
+    def make_path(cls, filename):
+        file_extension = filename.split('.')[-1] if '.' in filename else 'bin'
+        return f"{cls.BILL_PREFIX}{uuid.uuid4()}.{file_extension}"
+
+    @classmethod
+    def content_path(cls, digest, filename):
+        """Path of a bill stored by content: identical bytes with the same extension share a blob"""
+        file_extension = filename.split('.')[-1].lower() if '.' in filename else 'bin'
+        return f"{cls.BILL_PREFIX}{digest}.{file_extension}"
+
+
+class FirebaseStorageBackend(StorageBackend):
+    """Firebase Storage bucket with publicly readable blobs"""
+
+    name = 'firebase'
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def upload(self, file_data, filename, content_type):
+        from google.api_core.exceptions import PreconditionFailed
+
+        digest = hashlib.sha256(file_data).hexdigest()
+        file_path = self.content_path(digest, filename)
+        blob = self.bucket.blob(file_path)
+
+        with stage_stats.time('storage_exists', backend=self.name):
+            deduplicated = blob.exists()
+
+        if not deduplicated:
+            logger.debug("Uploading file to bucket", extra={
+                'bucket': self.bucket.name,
+                'file_path': file_path,
+                'bytes': len(file_data),
+                'content_type': content_type
+            })
+            try:
+                # Create-only, so a concurrent upload of the same bytes is never overwritten;
+                # publicly readable from creation (adjust based on your security requirements)
+                blob.upload_from_string(
+                    file_data,
+                    content_type=content_type,
+                    predefined_acl='publicRead',
+                    if_generation_match=0
+                )
+            except PreconditionFailed:
+                deduplicated = True
+
+        logger.debug("File stored", extra={'file_path': file_path, 'deduplicated': deduplicated})
+
+        return {
+            'file_url': blob.public_url,
+            'file_path': file_path,
+            'file_size': len(file_data),
+            'sha256': digest,
+            'deduplicated': deduplicated
+        }
+
+    def download(self, file_path, max_bytes=None):
+        # A ranged read stops a blob larger than the limit from being pulled in whole
+        with stage_stats.time('storage_download', backend=self.name) as fields:
+            data = self.bucket.blob(file_path).download_as_bytes(end=max_bytes)
+            fields['bytes'] = len(data)
+        return data
+
+    def delete(self, file_path):
+        from google.api_core.exceptions import NotFound
+
+        with stage_stats.time('storage_delete', backend=self.name):
+            try:
+                self.bucket.blob(file_path).delete()
+            except NotFound:
+                pass
+
+    def create_upload_url(self, file_path, content_type, max_bytes, expires_in):
+        # Signed headers: the object is created publicly readable (no make_public
+        # round trip) and GCS rejects bodies over max_bytes
+        headers = {
+            'x-goog-acl': 'public-read',
+            'x-goog-content-length-range': f'0,{max_bytes}'
+        }
+        url = self.bucket.blob(file_path).generate_signed_url(
+            version='v4',
+            expiration=timedelta(seconds=expires_in),
+            method='PUT',
+            content_type=content_type,
+            headers=headers
+        )
+        return {
+            'upload_url': url,
+            'method': 'PUT',
+            'headers': dict(headers, **{'Content-Type': content_type})
+        }
+
+    def stat(self, file_path):
+        with stage_stats.time('storage_stat', backend=self.name):
+            blob = self.bucket.get_blob(file_path)
+        if blob is None:
+            return None
+        return {'size': blob.size, 'content_type': blob.content_type}
+
+    def file_url(self, file_path):
+        return self.bucket.blob(file_path).public_url
+
+
+class LocalStorageBackend(StorageBackend):
+    """Bill files on local disk, served by the app under base_url.
+
+    Used for offline development and benchmarks; `latency_ms` simulates
+    the round trip to a remote bucket. Signed upload URLs point at the
+    app's own PUT route under base_url/upload and are HMAC-signed with
+    `secret`, standing in for bucket signed URLs.
+    """
+
+    name = 'local'
+
+    def __init__(self, root, base_url='/local-storage', latency_ms=0, secret=''):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+        self.latency_ms = latency_ms
+        self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+
+    def _path(self, file_path):
+        root = os.path.abspath(self.root)
+        path = os.path.abspath(os.path.join(root, file_path))
+        if not path.startswith(root + os.sep):
+            raise ValueError(f"Invalid file path: {file_path}")
+        return path
+
+    def upload(self, file_data, filename, content_type):
+        digest = hashlib.sha256(file_data).hexdigest()
+        file_path = self.content_path(digest, filename)
+        path = self._path(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        deduplicated = os.path.exists(path)
+        if not deduplicated:
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(file_data)
+            # Same content under the same name, so a concurrent writer winning the race is harmless
+            os.replace(tmp_path, path)
+
+        return {
+            'file_url': f"{self.base_url}/{file_path}",
+            'file_path': file_path,
+            'file_size': len(file_data),
+            'sha256': digest,
+            'deduplicated': deduplicated
+        }
+
+    def download(self, file_path, max_bytes=None):
+        path = self._path(file_path)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with open(path, 'rb') as f:
+            return f.read(max_bytes + 1 if max_bytes is not None else -1)
+
+    def delete(self, file_path):
+        path = self._path(file_path)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _signature(self, file_path, content_type, max_bytes, expires):
+        message = f"PUT\n{file_path}\n{content_type}\n{max_bytes}\n{expires}".encode('utf-8')
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def create_upload_url(self, file_path, content_type, max_bytes, expires_in):
+        expires = int(time.time() + expires_in)
+        query = urlencode({
+            'content_type': content_type,
+            'max_bytes': max_bytes,
+            'expires': expires,
+            'signature': self._signature(file_path, content_type, max_bytes, expires)
+        })
+        return {
+            'upload_url': f"{self.base_url}/upload/{file_path}?{query}",
+            'method': 'PUT',
+            'headers': {'Content-Type': content_type}
+        }
+
+    def verify_upload(self, file_path, content_type, max_bytes, expires, signature):
+        """Check a signed upload URL's parameters; raises ValueError if they don't hold"""
+        try:
+            max_bytes, expires = int(max_bytes), int(expires)
+        except (TypeError, ValueError):
+            raise ValueError("Malformed upload URL")
+        expected = self._signature(file_path, content_type, max_bytes, expires)
+        if not hmac.compare_digest(expected, signature or ''):
+            raise ValueError("Invalid upload signature")
+        if expires < time.time():
+            raise ValueError("Upload URL has expired")
+        return max_bytes
+
+    def write_stream(self, file_path, stream, max_bytes, chunk_size=65536):
+        """Copy an upload body to disk in chunks, refusing more than max_bytes; returns the size"""
+        path = self._path(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        size = 0
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"Upload exceeds {max_bytes} bytes")
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return size
+
+    def stat(self, file_path):
+        path = self._path(file_path)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if not os.path.isfile(path):
+            return None
+        return {
+            'size': os.path.getsize(path),
+            'content_type': mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        }
+
+    def file_url(self, file_path):
+        return f"{self.base_url}/{file_path}"
+
+
+def create_storage_backend(backend, bucket=None, root='local_storage', base_url='/local-storage', latency_ms=0,
+                           secret=''):
+    """Build the storage backend named by config.STORAGE_BACKEND; None if it is unavailable"""
+    if backend == 'local':
+        return LocalStorageBackend(root, base_url, latency_ms, secret)
+    if backend == 'firebase':
+        return FirebaseStorageBackend(bucket) if bucket else None
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,287 @@
+import math
+import threading
+from collections import Counter
+from itertools import chain
+from operator import itemgetter
+
+from duplicate_index import claim_key, vendor_key
+
+
+def iter_claim_vendors(claim):
+    """Yield (vendor_name, transaction_category, product) for every bill in a claim.
+
+    The category and product a submitter chose on the form win over the
+    OCR guesses stored in `extracted_details`, so the knowledge base
+    learns the values people actually file a vendor under.
+    """
+    for bill in claim.get('bills') or []:
+        yield bill.get('vendor_name'), bill.get('transaction_category'), bill.get('product')
+    for transaction in claim.get('transactions') or []:
+        extracted = transaction.get('extracted_details') or {}
+        yield (
+            transaction.get('vendor_name') or extracted.get('vendor_name'),
+            transaction.get('transaction_category') or extracted.get('transaction_category'),
+            transaction.get('product') or extracted.get('product')
+        )
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one inserted, deleted or replaced character, or one adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    start = 0
+    while start < len(a) and a[start] == b[start]:
+        start += 1
+    if len(a) < len(b):
+        return a[start:] == b[start + 1:]
+    if a[start + 1:] == b[start + 1:]:
+        return True
+    return a[start] == b[start + 1] and a[start + 1] == b[start] and a[start + 2:] == b[start + 2:]
+
+
+def vendor_trigrams(key):
+    """Character trigrams of a vendor key, padded so word edges count"""
+    padded = f' {key} '
+    return frozenset({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class VendorMatch:
+    """A lookup result: the canonical vendor plus what its history says about it"""
+
+    __slots__ = ('name', 'key', 'score', 'bills', 'category', 'product')
+
+    def __init__(self, name, key, score, bills, category, product):
+        self.name = name
+        self.key = key
+        self.score = score
+        self.bills = bills
+        self.category = category
+        self.product = product
+
+
+class VendorIndex:
+    """Vendor knowledge base learned from historical claims.
+
+    Bills are grouped by `vendor_key`, which folds case, punctuation and
+    legal suffixes (trade words like "Bar" or "Cafe" stay). Each vendor keeps
+    counts of the display names, categories and products it was filed
+    under: the most common display name is its canonical name, and a
+    category or product is inferred once it covers `min_share` of at least
+    `min_bills` bills.
+
+    Names whose key isn't known are matched fuzzily through an inverted
+    trigram index, partitioned by key length. A match either has trigram
+    Jaccard similarity of at least `threshold` with a key length within
+    that ratio, or (for keys of `min_edit_length` or more characters) is a
+    single-character typo, so its key length is within one. Either way it
+    shares at least k of the query's |q| trigrams (ceil(threshold * |q|),
+    or |q| - 4 since one edit touches at most four trigrams), so only the
+    postings of the query's rarest |q| - k + 1 trigrams, in the allowed
+    key lengths, can hold one (prefix filtering). Candidates are then
+    checked exactly. That keeps a lookup under a millisecond with 100k+
+    vendors.
+    Vendor ids are never reused, so postings only grow; vendors whose
+    bills were all deleted stay indexed but never match.
+    """
+
+    # Postings counted beyond the prefix, so candidates must appear in more than this many
+    EXTRA_POSTINGS = 2
+
+    def __init__(self, threshold=0.7, min_bills=3, min_share=0.6, min_fuzzy_length=4, min_edit_length=6):
+        self.threshold = threshold
+        self.min_bills = min_bills
+        self.min_share = min_share
+        self.min_fuzzy_length = min_fuzzy_length
+        self.min_edit_length = min_edit_length
+        self._ids = {}
+        self._keys = []
+        self._grams = []
+        self._names = []
+        self._categories = []
+        self._products = []
+        self._bills = []
+        self._postings = {}
+        self._claim_entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries_for(claim):
+        entries = []
+        for vendor_name, category, product in iter_claim_vendors(claim):
+            key = vendor_key(vendor_name)
+            if not key:
+                continue
+            entries.append((key, ' '.join(str(vendor_name).split()), category or None, product or None))
+        return entries
+
+    def build(self, claims):
+        """(Re)build the knowledge base from a full list of claims"""
+        with self._lock:
+            self._ids = {}
+            self._keys = []
+            self._grams = []
+            self._names = []
+            self._categories = []
+            self._products = []
+            self._bills = []
+            self._postings = {}
+            self._claim_entries = {}
+        for claim in claims:
+            self.add_claim(claim)
+
+    def add_claim(self, claim):
+        """Learn the vendors of a newly stored claim"""
+        entries = self._entries_for(claim)
+        with self._lock:
+            key = claim_key(claim)
+            if key is not None and key in self._claim_entries:
+                self._apply(self._claim_entries.pop(key), -1)
+            self._apply(entries, 1)
+            if key is not None:
+                self._claim_entries[key] = entries
+
+    def remove_claim(self, claim_id):
+        """Forget a deleted claim's vendors"""
+        with self._lock:
+            entries = self._claim_entries.pop(claim_id, None)
+            if entries:
+                self._apply(entries, -1)
+
+    def _apply(self, entries, delta):
+        for key, name, category, product in entries:
+            vendor_id = self._ids.get(key)
+            if vendor_id is None:
+                if delta < 0:
+                    continue
+                vendor_id = self._add_vendor(key)
+            self._bills[vendor_id] += delta
+            for counts, value in ((self._names[vendor_id], name),
+                                  (self._categories[vendor_id], category),
+                                  (self._products[vendor_id], product)):
+                if value is None:
+                    continue
+                count = counts.get(value, 0) + delta
+                if count > 0:
+                    counts[value] = count
+                else:
+                    counts.pop(value, None)
+
+    def _add_vendor(self, key):
+        vendor_id = len(self._keys)
+        grams = vendor_trigrams(key)
+        self._ids[key] = vendor_id
+        self._keys.append(key)
+        self._grams.append(grams)
+        self._names.append({})
+        self._categories.append({})
+        self._products.append({})
+        self._bills.append(0)
+        length = len(key)
+        for gram in grams:
+            buckets = self._postings.get(gram)
+            if buckets is None:
+                buckets = self._postings[gram] = {}
+            posting = buckets.get(length)
+            if posting is None:
+                buckets[length] = [vendor_id]
+            else:
+                posting.append(vendor_id)
+        return vendor_id
+
+    def lookup(self, vendor_name):
+        """Best matching known vendor for a name as a VendorMatch, or None"""
+        key = vendor_key(vendor_name)
+        if not key:
+            return None
+        with self._lock:
+            vendor_id = self._ids.get(key)
+            if vendor_id is not None and self._bills[vendor_id] > 0:
+                return self._match(vendor_id, 1.0)
+            if len(key) < self.min_fuzzy_length:
+                return None
+            vendor_id, score = self._fuzzy(key)
+            return self._match(vendor_id, score) if vendor_id is not None else None
+
+    def _fuzzy(self, key):
+        grams = vendor_trigrams(key)
+        size, length = len(grams), len(key)
+        edits = length >= self.min_edit_length
+        best_id, best_score, best_bills = None, 0.0, 0
+        for vendor_id in self._candidates(grams, length, edits):
+            bills = self._bills[vendor_id]
+            if bills <= 0:
+                continue
+            other = self._grams[vendor_id]
+            shared = len(grams & other)
+            score = shared / (size + len(other) - shared)
+            if score < self.threshold or not self.threshold * length <= len(self._keys[vendor_id]) <= length / self.threshold:
+                # A one-character typo in a short name breaks too many trigrams for Jaccard to catch
+                if not edits or not within_one_edit(key, self._keys[vendor_id]):
+                    continue
+                score = max(score, 1 - 1 / length)
+            if score > best_score or (score == best_score and bills > best_bills):
+                best_id, best_score, best_bills = vendor_id, score, bills
+        return best_id, best_score
+
+    def _candidates(self, grams, length, edits):
+        """Ids of vendors that may match: prefix filtering over the length-partitioned postings.
+
+        A vendor needing `overlap` of the query's trigrams misses at most
+        |grams| - overlap of them, so it appears in at least
+        chosen - (|grams| - overlap) of the `chosen` rarest ones' postings.
+        Keys within one character of the query's length may be typos and
+        need fewer.
+        """
+        size = len(grams)
+        overlap = math.ceil(self.threshold * size)
+        lengths = set(range(math.ceil(self.threshold * length), math.floor(length / self.threshold) + 1))
+        near = set(range(length - 1, length + 2)) if edits else set()
+        # One edit touches at most four trigrams
+        near_overlap = min(overlap, max(1, size - 4))
+        postings = []
+        for gram in grams:
+            buckets = self._postings.get(gram) or {}
+            lists = [(n in near, buckets[n]) for n in lengths | near if n in buckets]
+            postings.append((sum(len(posting) for _near, posting in lists), lists))
+        postings.sort(key=itemgetter(0))
+
+        chosen = min(size, size - (near_overlap if near else overlap) + 1 + self.EXTRA_POSTINGS)
+        selected = [entry for _total, lists in postings[:chosen] for entry in lists]
+        hits = Counter(chain.from_iterable(posting for is_near, posting in selected if not is_near))
+        near_hits = Counter(chain.from_iterable(posting for is_near, posting in selected if is_near))
+        far_min = chosen - (size - overlap)
+        near_min = chosen - (size - near_overlap)
+        return ([vendor_id for vendor_id, count in hits.items() if count >= far_min]
+                + [vendor_id for vendor_id, count in near_hits.items() if count >= near_min])
+
+    def _match(self, vendor_id, score):
+        bills = self._bills[vendor_id]
+        return VendorMatch(
+            name=self._canonical_name(self._names[vendor_id]) or self._keys[vendor_id],
+            key=self._keys[vendor_id],
+            score=round(score, 3),
+            bills=bills,
+            category=self._dominant(self._categories[vendor_id], bills),
+            product=self._dominant(self._products[vendor_id], bills)
+        )
+
+    @staticmethod
+    def _canonical_name(names):
+        # Most used spelling; ties prefer mixed case ("Mehfil" over "MEHFIL"), then the shorter name
+        if not names:
+            return None
+        return min(names, key=lambda name: (-names[name], name.isupper(), len(name), name))
+
+    def _dominant(self, counts, bills):
+        if bills < self.min_bills or not counts:
+            return None
+        value, count = max(counts.items(), key=itemgetter(1))
+        return value if count >= self.min_share * bills else None
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for bills in self._bills if bills > 0)